@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Response
 from pydantic import BaseModel
 from typing import List, Optional
 import asyncpg
-from app.libs.database import get_db_connection
+from app.libs.catalog_cache import catalog_cache
+from app.libs.database import get_db_connection, get_read_connection, pool_stats, request_connection
+from app.libs.export import EXPORT_FORMAT_QUERY, ExportFormat, export_response
 from app.libs.models import Company, Plan, CompanySubscription
+from app.libs.pagination import Pagination, paginate
+from app.libs.row_response import rows_response
+from app.libs.principals import load_principal, principal_cache, resolve_principal
+from app.libs.profile_views import view_buffer
 from app.auth import AuthorizedUser
 from datetime import datetime
 
@@ -39,56 +45,75 @@ class CreatePlanRequest(BaseModel):
 
 async def verify_admin_role(user: AuthorizedUser, db: asyncpg.Connection):
     """Verify that the user has admin role."""
-    user_role = await db.fetchval(
-        """
-        SELECT ur.role_name 
-        FROM users u 
-        JOIN user_roles ur ON u.role_id = ur.id 
-        WHERE u.id = $1
-        """, 
-        user.sub
-    )
+    principal = await resolve_principal(db, user.sub)
     
-    if user_role != 'admin':
+    if not principal or principal.role != 'admin':
         raise HTTPException(status_code=403, detail="Admin access required")
 
+async def require_admin(user: AuthorizedUser) -> None:
+    """Admin check that does not hold a connection for the rest of the request.
+
+    Used by the metrics endpoints, which matter most when the pool is
+    saturated, and by exports, which stream on a connection of their own.  A
+    cached principal needs no connection at all; otherwise one is borrowed for
+    the lookup only and given back before the handler runs.
+    """
+    principal = principal_cache.get(user.sub)
+    if principal is None:
+        async with request_connection() as db:
+            principal = await load_principal(db, user.sub)
+
+    if not principal or principal.role != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+COMPANIES_WITH_SUBSCRIPTIONS_QUERY = """
+    SELECT 
+        c.id, c.name, c.description, c.address, c.city, c.state, 
+        c.phone, c.email, c.website,
+        p.name as current_plan,
+        cs.status as plan_status,
+        cs.start_date as subscription_start,
+        cs.end_date as subscription_end
+    FROM companies c
+    LEFT JOIN company_subscriptions cs ON c.id = cs.company_id AND cs.status = 'active'
+    LEFT JOIN plans p ON cs.plan_id = p.id
+"""
+
 @router.get("/companies", response_model=List[CompanyWithSubscription])
 async def list_companies_with_subscriptions(
     user: AuthorizedUser,
-    db: asyncpg.Connection = Depends(get_db_connection),
-    page: int = Query(1, ge=1),
-    limit: int = Query(50, ge=1, le=100)
+    response: Response,
+    page: Pagination,
+    db: asyncpg.Connection = Depends(get_read_connection)
 ):
     """Get all companies with their subscription information."""
     await verify_admin_role(user, db)
     
-    offset = (page - 1) * limit
+    params = []
+    after = page.keyset([("c.name", str), ("c.id", int)], params)
     
-    query = """
-        SELECT 
-            c.id, c.name, c.description, c.address, c.city, c.state, 
-            c.phone, c.email, c.website,
-            p.name as current_plan,
-            cs.status as plan_status,
-            cs.start_date as subscription_start,
-            cs.end_date as subscription_end
-        FROM companies c
-        LEFT JOIN company_subscriptions cs ON c.id = cs.company_id AND cs.status = 'active'
-        LEFT JOIN plans p ON cs.plan_id = p.id
-        ORDER BY c.name
-        LIMIT $1 OFFSET $2
-    """
+    query = COMPANIES_WITH_SUBSCRIPTIONS_QUERY
+    if after:
+        query += " WHERE " + after
+    query += " ORDER BY c.name, c.id " + page.limit_clause(params)
     
     try:
-        companies = await db.fetch(query, limit, offset)
-        return [CompanyWithSubscription(**dict(company)) for company in companies]
+        companies = await db.fetch(query, *params)
+        companies = paginate(companies, page, response, lambda c: (c["name"], c["id"]))
+        return rows_response(companies, CompanyWithSubscription, response)
     except asyncpg.exceptions.PostgresError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
+@router.get("/companies/export", dependencies=[Depends(require_admin)])
+async def export_companies_with_subscriptions(format: ExportFormat = EXPORT_FORMAT_QUERY):
+    """Stream all companies with their subscription information as NDJSON or CSV."""
+    query = COMPANIES_WITH_SUBSCRIPTIONS_QUERY + " ORDER BY c.name, c.id"
+    return export_response(query, [], CompanyWithSubscription, format, "companies")
+
 @router.get("/plans", response_model=List[Plan])
 async def list_plans(
     user: AuthorizedUser,
-    db: asyncpg.Connection = Depends(get_db_connection)
+    db: asyncpg.Connection = Depends(get_read_connection)
 ):
     """Get all available subscription plans."""
     await verify_admin_role(user, db)
@@ -175,7 +200,7 @@ async def update_company_subscription(
 async def get_company_subscription_history(
     company_id: int,
     user: AuthorizedUser,
-    db: asyncpg.Connection = Depends(get_db_connection)
+    db: asyncpg.Connection = Depends(get_read_connection)
 ):
     """Get subscription history for a specific company."""
     await verify_admin_role(user, db)
@@ -213,3 +238,21 @@ async def cancel_company_subscription(
         return {"message": "Subscription cancelled successfully"}
     except asyncpg.exceptions.PostgresError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+
+@router.get("/metrics/profile-views", response_model=dict, dependencies=[Depends(require_admin)])
+async def get_profile_view_buffer_stats():
+    """Get counters of the in-process profile view buffer."""
+    return view_buffer.stats()
+
+
+@router.get("/metrics/db-pool", response_model=dict, dependencies=[Depends(require_admin)])
+async def get_db_pool_stats():
+    """Get connection pool size, idle connections, waiters and acquire waits."""
+    return pool_stats()
+
+
+@router.get("/metrics/catalog-cache", response_model=dict, dependencies=[Depends(require_admin)])
+async def get_catalog_cache_stats():
+    """Get hit rate, evictions and invalidations of this worker's catalog cache."""
+    return catalog_cache.stats()
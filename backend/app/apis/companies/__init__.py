@@ -1,22 +1,135 @@
-from fastapi import APIRouter, Depends, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException, Response
 from typing import List
 import asyncpg
-from app.libs.database import get_db_connection
-from app.libs.models import Company, Product
-from pydantic import BaseModel
+from app.auth import AuthorizedUser
+from app.libs.catalog_cache import catalog_cache
+from app.libs.conditional import Conditional
+from app.libs.database import get_db_connection, get_read_connection
+from app.libs.geo import DISTANCE_KM_SQL, bounding_box, min_distance_km, planar_degrees
+from app.libs.profile_views import record_profile_view
+from app.libs.models import COMPANY_COLUMNS, PRODUCT_COLUMNS, Company, Product
+from app.libs.pagination import PageParams, Pagination, paginate
+from app.libs.principals import resolve_principal
+from app.libs.row_response import rows_response
+from pydantic import BaseModel, Field
 
 class CompanyProfile(Company):
     products: List[Product] = []
 
+class NearbyCompany(Company):
+    distance_km: float
+
+class CompanyLocation(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
 router = APIRouter(prefix="/companies", tags=["companies"])
 
+DEFAULT_RADIUS_KM = 50
+MAX_RADIUS_KM = 500
+# Companies read per query, as a multiple of the page size; multiplied by
+# NEARBY_CANDIDATES_GROWTH when they are not enough to rank a page
+NEARBY_CANDIDATES_FACTOR = 2
+NEARBY_CANDIDATES_GROWTH = 4
+NEARBY_KEYSET = [("distance_km", float), ("id", int)]
+
+
+def nearby_companies_query(
+    latitude: float, longitude: float, radius_km: float, page: PageParams,
+    candidates: int | None, min_planar: float = 0.0,
+) -> tuple[str, list]:
+    """The page (plus one row) of companies within ``radius_km``, nearest first, among ``candidates``.
+
+    The candidates are the ``candidates`` companies nearest to the center in
+    planar degrees, at least ``min_planar`` away, read in that order from
+    idx_companies_location by a KNN scan.  With ``candidates=None`` they are
+    every company in the radius' bounding box instead.  Only candidates get
+    their exact distance computed.  Every row also carries ``scanned``, the
+    number of candidates read, and ``reach``, the planar distance of the
+    farthest; when no candidate makes the page a single row with NULL company
+    columns carries them.
+    """
+    params = [latitude, longitude, radius_km, min_planar]
+    if candidates is None:
+        # A box condition makes the planner read the whole box and sort it
+        params += bounding_box(latitude, longitude, radius_km)
+        candidates_filter = "AND location <@ box(point($5, $6), point($7, $8))"
+    else:
+        params.append(candidates)
+        candidates_filter = f"ORDER BY location <-> point($2, $1) LIMIT ${len(params)}"
+    after = page.keyset(NEARBY_KEYSET, params)
+    query = f"""
+        WITH candidates AS (
+            SELECT {COMPANY_COLUMNS}, {DISTANCE_KM_SQL} AS distance_km,
+                   location <-> point($2, $1) AS planar_distance
+            FROM companies
+            WHERE location <-> point($2, $1) >= $4
+            {candidates_filter}
+        )
+        SELECT nearby.*, scan.scanned, scan.reach
+        FROM (SELECT count(*) AS scanned, max(planar_distance) AS reach FROM candidates) scan
+        LEFT JOIN LATERAL (
+            SELECT * FROM candidates
+            WHERE distance_km <= $3{" AND " + after if after else ""}
+            ORDER BY distance_km, id {page.limit_clause(params)}
+        ) nearby ON true
+    """
+    return query, params
+
+
+async def fetch_nearby_companies(
+    db: asyncpg.Connection, latitude: float, longitude: float, radius_km: float, page: PageParams
+) -> list[asyncpg.Record]:
+    """Rows of the page (plus one) of companies within ``radius_km``, nearest first.
+
+    The index returns companies by planar distance in degrees, which is not
+    the great-circle order but bounds it both ways (see ``app.libs.geo``).
+    Candidates are read until the last row of the page is nearer than any
+    company not read yet can be, or until the unread ones are all beyond the
+    radius.  Twice the page size is usually enough, so one query answers the
+    page, dense city or empty countryside; when it is not, four times as many
+    are read.  Companies before the cursor are skipped in the index walk
+    without computing their distance: a deep page still walks past every
+    earlier company, but the cost depends on the page number rather than on
+    how many companies the radius holds.
+
+    Beyond about 60 degrees of latitude or across the antimeridian planar
+    distances bound too little and the whole bounding box is ranked instead.
+    """
+    cursor = page.cursor_values([kind for _, kind in NEARBY_KEYSET])
+    start = cursor[0] if cursor else 0.0
+    if start < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Slightly below the exact bound so that rounding never skips a row
+    min_planar = planar_degrees(start) * (1 - 1e-9)
+    min_lng, _, max_lng, _ = bounding_box(latitude, longitude, radius_km)
+    if max_lng - min_lng >= 360 or min_distance_km(latitude, planar_degrees(radius_km)) == 0:
+        query, params = nearby_companies_query(latitude, longitude, radius_km, page, None, min_planar)
+        return [record for record in await db.fetch(query, *params) if record["id"] is not None]
+
+    candidates = NEARBY_CANDIDATES_FACTOR * (page.limit + 1)
+    while True:
+        query, params = nearby_companies_query(latitude, longitude, radius_km, page, candidates, min_planar)
+        records = await db.fetch(query, *params)
+        rows = [record for record in records if record["id"] is not None]
+        scanned, reach = records[0]["scanned"], records[0]["reach"]
+        if scanned < candidates:
+            # Every company was read
+            return rows
+        unread_from = min_distance_km(latitude, reach)
+        if unread_from > radius_km or (len(rows) > page.limit and rows[page.limit]["distance_km"] < unread_from):
+            return rows
+        candidates *= NEARBY_CANDIDATES_GROWTH
+
 @router.get("/", response_model=List[Company])
 async def search_companies(
+    response: Response,
+    page: Pagination,
     state: str = Query(None, description="Filter by state (e.g., 'SP')"),
     city: str = Query(None, description="Filter by city"),
-    db: asyncpg.Connection = Depends(get_db_connection)
+    db: asyncpg.Connection = Depends(get_read_connection)
 ):
-    query = "SELECT * FROM companies"
+    query = f"SELECT {COMPANY_COLUMNS} FROM companies"
     conditions = []
     params = []
     
@@ -28,40 +141,82 @@ async def search_companies(
         params.append(city)
         conditions.append(f"city ILIKE ${len(params)}")
 
+    after = page.keyset([("name", str), ("id", int)], params)
+    if after:
+        conditions.append(after)
+
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
         
-    query += " ORDER BY name"
+    query += " ORDER BY name, id " + page.limit_clause(params)
 
     try:
-        companies = await db.fetch(query, *params)
-        return [Company(**dict(c)) for c in companies]
+        companies = await catalog_cache.fetch(db, ("companies",), query, *params)
+        companies = paginate(companies, page, response, lambda c: (c["name"], c["id"]))
+        return rows_response(companies, Company, response)
     except asyncpg.exceptions.PostgresError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
+@router.get("/nearby", response_model=List[NearbyCompany])
+async def search_nearby_companies(
+    response: Response,
+    page: Pagination,
+    lat: float = Query(..., ge=-90, le=90, description="Latitude of the search center"),
+    lng: float = Query(..., ge=-180, le=180, description="Longitude of the search center"),
+    radius_km: float = Query(DEFAULT_RADIUS_KM, gt=0, le=MAX_RADIUS_KM, description="Search radius in km"),
+    db: asyncpg.Connection = Depends(get_read_connection)
+):
+    """Companies with coordinates within ``radius_km``, nearest first."""
+    try:
+        companies = await fetch_nearby_companies(db, lat, lng, radius_km, page)
+    except asyncpg.exceptions.PostgresError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    companies = paginate(companies, page, response, lambda c: (c["distance_km"], c["id"]))
+    return rows_response(companies, NearbyCompany, response)
+
+@router.put("/location", response_model=Company)
+async def update_company_location(
+    body: CompanyLocation,
+    user: AuthorizedUser,
+    db: asyncpg.Connection = Depends(get_db_connection)
+):
+    """Set the coordinates of the current user's company."""
+    principal = await resolve_principal(db, user.sub)
+    if not principal or not principal.company_id:
+        raise HTTPException(status_code=403, detail="Only company members can set its location")
+
+    company = await db.fetchrow(
+        f"UPDATE companies SET latitude = $2, longitude = $3 WHERE id = $1 RETURNING {COMPANY_COLUMNS}",
+        principal.company_id, body.latitude, body.longitude
+    )
+    if not company:
+        raise HTTPException(status_code=404, detail="Company not found")
+    return Company(**dict(company))
+
 @router.get("/{company_id}", response_model=CompanyProfile)
 async def get_company_profile(
     company_id: int,
-    db: asyncpg.Connection = Depends(get_db_connection)
+    response: Response,
+    conditional: Conditional,
+    db: asyncpg.Connection = Depends(get_read_connection)
 ):
     # Fetch company details
-    company_query = "SELECT * FROM companies WHERE id = $1"
+    company_query = f"SELECT {COMPANY_COLUMNS} FROM companies WHERE id = $1"
     company_record = await db.fetchrow(company_query, company_id)
     if not company_record:
         raise HTTPException(status_code=404, detail="Company not found")
 
-    # Record the profile view in the background
-    try:
-        view_query = "INSERT INTO profile_views (company_id) VALUES ($1)"
-        await db.execute(view_query, company_id)
-    except asyncpg.exceptions.PostgresError as e:
-        # Log the error, but don't prevent the profile from loading
-        print(f"Error recording profile view for company {company_id}: {e}")
+    # Buffered in memory and written in batches by the profile view flusher
+    record_profile_view(company_id)
 
     # Fetch products for the company
-    products_query = "SELECT * FROM products WHERE supplier_id = $1 ORDER BY name"
+    products_query = f"SELECT {PRODUCT_COLUMNS} FROM products WHERE supplier_id = $1 ORDER BY name"
     product_records = await db.fetch(products_query, company_id)
 
+    not_modified = conditional.evaluate(response, "company_profile", [company_record, *product_records])
+    if not_modified:
+        return not_modified
+
     company_data = dict(company_record)
     company_data['products'] = [Product(**dict(p)) for p in product_records]
 
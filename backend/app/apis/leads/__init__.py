@@ -1,19 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel, EmailStr
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import BaseModel, EmailStr, Field
 from typing import List, Optional
 import asyncpg
-import os
-from email.message import EmailMessage
-import aiosmtplib
-from app.libs.database import get_db_connection
+from app.libs.database import get_db_connection, request_connection
+from app.libs.outbox import enqueue_email, enqueue_emails, lead_notification_email, wake_outbox_dispatcher
 from app.libs.models import Lead
+from app.libs.pagination import Pagination, paginate
+from app.libs.row_response import rows_response
+from app.libs.export import EXPORT_FORMAT_QUERY, ExportFormat, export_response
+from app.libs.principals import resolve_company_id, resolve_principal
 from app.auth import AuthorizedUser
 from datetime import datetime
 
 router = APIRouter(prefix="/leads", tags=["leads"])
 
-class CreateLeadRequest(BaseModel):
-    supplier_id: int
+# Suppliers a single quote request can be sent to
+MAX_LEAD_SUPPLIERS = 20
+
+class LeadDetails(BaseModel):
     project_description: str
     project_type: Optional[str] = None
     estimated_budget: Optional[float] = None
@@ -23,6 +27,12 @@ class CreateLeadRequest(BaseModel):
     preferred_contact_method: Optional[str] = 'email'
     timeline: Optional[str] = None
 
+class CreateLeadRequest(LeadDetails):
+    supplier_id: int
+
+class CreateLeadsRequest(LeadDetails):
+    supplier_ids: List[int] = Field(..., min_length=1, max_length=MAX_LEAD_SUPPLIERS)
+
 class UpdateLeadStatusRequest(BaseModel):
     lead_id: int
     status: str
@@ -47,41 +57,6 @@ class LeadWithSupplierInfo(BaseModel):
     updated_at: Optional[datetime] = None
 
 
-async def send_lead_notification_email(to_email: str, supplier_name: str, contact_email: str, project_description: str) -> None:
-    """Send an email notification to the supplier about the new lead."""
-    smtp_host = os.getenv("SMTP_HOST")
-    smtp_port = int(os.getenv("SMTP_PORT", "587"))
-    smtp_user = os.getenv("SMTP_USERNAME")
-    smtp_password = os.getenv("SMTP_PASSWORD")
-    from_email = os.getenv("EMAIL_FROM", smtp_user or "noreply@example.com")
-
-    if not smtp_host or not to_email:
-        # Missing configuration; log and exit silently
-        print("SMTP configuration missing; skipping email notification")
-        return
-
-    message = EmailMessage()
-    message["From"] = from_email
-    message["To"] = to_email
-    message["Subject"] = "New lead received"
-    message.set_content(
-        f"Hello {supplier_name},\n\n"
-        f"You have received a new lead from {contact_email}.\n\n"
-        f"Project description:\n{project_description}\n"
-    )
-
-    try:
-        await aiosmtplib.send(
-            message,
-            hostname=smtp_host,
-            port=smtp_port,
-            username=smtp_user,
-            password=smtp_password,
-            start_tls=True,
-        )
-    except Exception as e:
-        print(f"Error sending email: {e}")
-
 @router.post("/", response_model=Lead)
 async def create_lead(
     body: CreateLeadRequest,
@@ -91,12 +66,9 @@ async def create_lead(
     """Create a new lead (quote request) from installer to supplier."""
     
     # Verify that the user is an installer
-    user_role = await db.fetchval(
-        "SELECT ur.role_name FROM users u JOIN user_roles ur ON u.role_id = ur.id WHERE u.id = $1",
-        user.sub
-    )
+    principal = await resolve_principal(db, user.sub)
     
-    if user_role != 'installer':
+    if not principal or principal.role != 'installer':
         raise HTTPException(status_code=403, detail="Only installers can create leads")
     
     # Verify supplier exists and get contact email
@@ -118,33 +90,97 @@ async def create_lead(
     """
     
     try:
-        lead_record = await db.fetchrow(
-            query,
-            user.sub, body.supplier_id, body.project_description, body.project_type,
-            body.estimated_budget, body.location, body.contact_email, body.contact_phone,
-            body.preferred_contact_method, body.timeline
-        )
-        
-        # Send email notification in the background if SMTP is configured
-        if supplier.get("email"):
-            await send_lead_notification_email(
-                supplier["email"],
-                supplier["name"],
-                body.contact_email,
-                body.project_description,
+        # The lead and its notification email commit together; the email is
+        # delivered by the outbox dispatcher outside of this request.
+        async with db.transaction():
+            lead_record = await db.fetchrow(
+                query,
+                user.sub, body.supplier_id, body.project_description, body.project_type,
+                body.estimated_budget, body.location, body.contact_email, body.contact_phone,
+                body.preferred_contact_method, body.timeline
             )
-        
-        return Lead(**dict(lead_record))
+
+            if supplier.get("email"):
+                subject, message = lead_notification_email(
+                    supplier["name"], body.contact_email, body.project_description
+                )
+                await enqueue_email(db, supplier["email"], subject, message, lead_id=lead_record["id"])
+    except asyncpg.exceptions.PostgresError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+    wake_outbox_dispatcher()
+    return Lead(**dict(lead_record))
+
+# One lead per supplier, in the order the suppliers were given
+CREATE_LEADS_QUERY = """
+    INSERT INTO leads (
+        installer_id, supplier_id, project_description, project_type,
+        estimated_budget, location, contact_email, contact_phone,
+        preferred_contact_method, timeline, status
+    )
+    SELECT $1, s.supplier_id, $3, $4, $5, $6, $7, $8, $9, $10, 'pending'
+    FROM unnest($2::int[]) WITH ORDINALITY AS s(supplier_id, position)
+    ORDER BY s.position
+    RETURNING *
+"""
+
+@router.post("/bulk", response_model=List[Lead])
+async def create_leads(
+    body: CreateLeadsRequest,
+    user: AuthorizedUser,
+    db: asyncpg.Connection = Depends(get_db_connection)
+):
+    """Send the same quote request to several suppliers at once.
+
+    Either every lead is created or none is; the suppliers are checked and
+    the leads and their notification emails written with one query each.
+    """
+    principal = await resolve_principal(db, user.sub)
+    if not principal or principal.role != 'installer':
+        raise HTTPException(status_code=403, detail="Only installers can create leads")
+
+    supplier_ids = list(dict.fromkeys(body.supplier_ids))
+    suppliers = {
+        row["id"]: row
+        for row in await db.fetch("SELECT id, name, email FROM companies WHERE id = ANY($1::int[])", supplier_ids)
+    }
+    missing = [supplier_id for supplier_id in supplier_ids if supplier_id not in suppliers]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Suppliers not found: {', '.join(map(str, missing))}")
+
+    try:
+        async with db.transaction():
+            lead_records = await db.fetch(
+                CREATE_LEADS_QUERY,
+                user.sub, supplier_ids, body.project_description, body.project_type,
+                body.estimated_budget, body.location, body.contact_email, body.contact_phone,
+                body.preferred_contact_method, body.timeline
+            )
+            emails = []
+            for lead in lead_records:
+                supplier = suppliers[lead["supplier_id"]]
+                if supplier["email"]:
+                    subject, message = lead_notification_email(
+                        supplier["name"], body.contact_email, body.project_description
+                    )
+                    emails.append((lead["id"], supplier["email"], subject, message))
+            await enqueue_emails(db, emails)
     except asyncpg.exceptions.PostgresError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
+    wake_outbox_dispatcher()
+    return [Lead(**dict(lead)) for lead in lead_records]
+
 @router.get("/my-leads", response_model=List[LeadWithSupplierInfo])
 async def get_my_leads(
     user: AuthorizedUser,
+    response: Response,
+    page: Pagination,
     db: asyncpg.Connection = Depends(get_db_connection)
 ):
     """Get all leads created by the current installer."""
     
+    params = [user.sub]
     query = """
         SELECT 
             l.*,
@@ -152,43 +188,73 @@ async def get_my_leads(
         FROM leads l
         JOIN companies c ON l.supplier_id = c.id
         WHERE l.installer_id = $1
-        ORDER BY l.created_at DESC
     """
+    after = page.keyset([("l.created_at", datetime), ("l.id", int)], params, descending=True)
+    if after:
+        query += " AND " + after
+    query += " ORDER BY l.created_at DESC, l.id DESC " + page.limit_clause(params)
     
     try:
-        leads = await db.fetch(query, user.sub)
-        return [LeadWithSupplierInfo(**dict(lead)) for lead in leads]
+        leads = await db.fetch(query, *params)
+        leads = paginate(leads, page, response, lambda l: (l["created_at"], l["id"]))
+        return rows_response(leads, LeadWithSupplierInfo, response)
     except asyncpg.exceptions.PostgresError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 @router.get("/received", response_model=List[Lead])
 async def get_received_leads(
     user: AuthorizedUser,
+    response: Response,
+    page: Pagination,
     db: asyncpg.Connection = Depends(get_db_connection)
 ):
     """Get all leads received by the current supplier."""
     
     # Get the supplier's company ID
-    company_id = await db.fetchval(
-        "SELECT company_id FROM users WHERE id = $1",
-        user.sub
-    )
+    company_id = await resolve_company_id(db, user.sub)
     
     if not company_id:
         raise HTTPException(status_code=403, detail="User is not associated with a company")
     
+    params = [company_id]
     query = """
         SELECT l.* FROM leads l
         WHERE l.supplier_id = $1
-        ORDER BY l.created_at DESC
     """
+    after = page.keyset([("l.created_at", datetime), ("l.id", int)], params, descending=True)
+    if after:
+        query += " AND " + after
+    query += " ORDER BY l.created_at DESC, l.id DESC " + page.limit_clause(params)
     
     try:
-        leads = await db.fetch(query, company_id)
-        return [Lead(**dict(lead)) for lead in leads]
+        leads = await db.fetch(query, *params)
+        leads = paginate(leads, page, response, lambda l: (l["created_at"], l["id"]))
+        return rows_response(leads, Lead, response)
     except asyncpg.exceptions.PostgresError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
+@router.get("/received/export")
+async def export_received_leads(
+    user: AuthorizedUser,
+    format: ExportFormat = EXPORT_FORMAT_QUERY,
+):
+    """Stream all leads received by the current supplier as NDJSON or CSV."""
+    
+    # The export streams on a connection of its own; this one is given back
+    # before the response starts
+    async with request_connection() as db:
+        company_id = await resolve_company_id(db, user.sub)
+    
+    if not company_id:
+        raise HTTPException(status_code=403, detail="User is not associated with a company")
+    
+    query = """
+        SELECT l.* FROM leads l
+        WHERE l.supplier_id = $1
+        ORDER BY l.created_at DESC, l.id DESC
+    """
+    return export_response(query, [company_id], Lead, format, "leads")
+
 @router.put("/status", response_model=dict)
 async def update_lead_status(
     body: UpdateLeadStatusRequest,
@@ -198,10 +264,7 @@ async def update_lead_status(
     """Update the status of a lead (suppliers only)."""
     
     # Get the supplier's company ID
-    company_id = await db.fetchval(
-        "SELECT company_id FROM users WHERE id = $1",
-        user.sub
-    )
+    company_id = await resolve_company_id(db, user.sub)
     
     if not company_id:
         raise HTTPException(status_code=403, detail="User is not associated with a company")
@@ -239,7 +302,7 @@ async def get_lead_details(
     """Get details of a specific lead."""
     
     # Check if user is the installer who created the lead or the supplier who received it
-    company_id = await db.fetchval("SELECT company_id FROM users WHERE id = $1", user.sub)
+    company_id = await resolve_company_id(db, user.sub)
     
     query = """
         SELECT * FROM leads 
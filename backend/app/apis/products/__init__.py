@@ -1,18 +1,37 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Literal
+from decimal import Decimal
 import asyncpg
-from app.libs.database import get_db_connection
-from app.libs.models import Product
+from app.auth import AuthorizedUser
+from app.libs.catalog_cache import catalog_cache
+from app.libs.catalog_import import CatalogImportError, ImportReport, import_products
+from app.libs.conditional import Conditional
+from app.libs.database import get_db_connection, get_read_connection
+from app.libs.models import PRODUCT_COLUMNS, Product
+from app.libs.pagination import Pagination, paginate
+from app.libs.principals import resolve_principal
+from app.libs.row_response import rows_response
 
 router = APIRouter(prefix="/products", tags=["products"])
 
+# Sort key columns, whether they are descending, and the cursor of a row.
+# Unrated products sort last by rating (see idx_products_rating).
+PRODUCT_SORTS = {
+    "id": ([("p.id", int)], False, lambda p: (p["id"],)),
+    "rating": ([("COALESCE(p.rating_average, 0)", Decimal), ("p.id", int)], True, lambda p: (p["rating_average"] or 0, p["id"])),
+}
+
 @router.get("/", response_model=List[Product])
 async def list_products(
+    response: Response,
+    page: Pagination,
+    conditional: Conditional,
     category: str = Query(None, description="Filter by category name"),
     brand: str = Query(None, description="Filter by brand name"),
-    db: asyncpg.Connection = Depends(get_db_connection)
+    sort: Literal["id", "rating"] = Query("id", description="id, or rating for the best rated first"),
+    db: asyncpg.Connection = Depends(get_read_connection)
 ):
-    query = "SELECT p.* FROM products p"
+    query = f"SELECT {PRODUCT_COLUMNS} FROM products p"
     conditions = []
     params = []
 
@@ -26,22 +45,61 @@ async def list_products(
         conditions.append(f"p.brand ILIKE ${param_index}")
         params.append(f"%{brand}%")
 
+    sort_columns, descending, sort_key = PRODUCT_SORTS[sort]
+    after = page.keyset(sort_columns, params, descending=descending)
+    if after:
+        conditions.append(after)
+
     if conditions:
         query += " WHERE " + " AND ".join(conditions)
 
+    direction = " DESC" if descending else ""
+    query += " ORDER BY " + ", ".join(column + direction for column, _ in sort_columns) + " " + page.limit_clause(params)
+
     try:
-        products = await db.fetch(query, *params)
-        return [Product(**dict(p)) for p in products]
+        products = await catalog_cache.fetch(db, ("products",), query, *params)
+        not_modified = conditional.evaluate(response, "products", products)
+        if not_modified:
+            return not_modified
+        products = paginate(products, page, response, sort_key)
+        return rows_response(products, Product, response)
+    except asyncpg.exceptions.PostgresError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+
+@router.post("/import", response_model=ImportReport)
+async def import_catalog(
+    request: Request,
+    user: AuthorizedUser,
+    db: asyncpg.Connection = Depends(get_db_connection)
+):
+    """Create or update the current supplier's products from a CSV request body.
+
+    Columns: sku and name (required), description, price, category, brand.
+    Products are matched on sku; invalid rows are skipped and listed in the report.
+    """
+    principal = await resolve_principal(db, user.sub)
+    if not principal or principal.role != "supplier" or not principal.company_id:
+        raise HTTPException(status_code=403, detail="Only suppliers can import products")
+
+    try:
+        return await import_products(db, principal.company_id, request.stream())
+    except CatalogImportError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except asyncpg.exceptions.PostgresError as e:
         raise HTTPException(status_code=500, detail=f"Database error: {e}")
 
 @router.get("/{product_id}", response_model=Product)
 async def get_product(
     product_id: int,
-    db: asyncpg.Connection = Depends(get_db_connection)
+    response: Response,
+    conditional: Conditional,
+    db: asyncpg.Connection = Depends(get_read_connection)
 ):
-    query = "SELECT * FROM products WHERE id = $1"
-    product = await db.fetchrow(query, product_id)
+    query = f"SELECT {PRODUCT_COLUMNS} FROM products WHERE id = $1"
+    product = await catalog_cache.fetchrow(db, (f"products:{product_id}",), query, product_id)
     if not product:
         raise HTTPException(status_code=404, detail="Product not found")
+    not_modified = conditional.evaluate(response, "product", [product])
+    if not_modified:
+        return not_modified
     return Product(**dict(product))
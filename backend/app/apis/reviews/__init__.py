@@ -1,27 +1,44 @@
-from fastapi import APIRouter, Depends, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, Depends, HTTPException, Response
+from pydantic import BaseModel, Field
 from typing import List
 import asyncpg
-from app.libs.database import get_db_connection
+from app.libs.conditional import Conditional
+from app.libs.database import get_db_connection, get_read_connection
 from app.libs.models import Review
+from app.libs.pagination import Pagination, paginate
+from app.libs.row_response import rows_response
 from app.auth import AuthorizedUser
 from uuid import UUID
+from datetime import datetime
 
 router = APIRouter(prefix="/reviews", tags=["reviews"])
 
 class ReviewRequest(BaseModel):
     product_id: int
-    rating: int
+    rating: int = Field(..., ge=1, le=5)
     comment: str
 
 @router.get("/{product_id}", response_model=List[Review])
 async def list_reviews_for_product(
     product_id: int,
-    db: asyncpg.Connection = Depends(get_db_connection)
+    response: Response,
+    page: Pagination,
+    conditional: Conditional,
+    db: asyncpg.Connection = Depends(get_read_connection)
 ):
-    query = "SELECT * FROM reviews WHERE product_id = $1 ORDER BY created_at DESC"
-    reviews = await db.fetch(query, product_id)
-    return [Review(**dict(r)) for r in reviews]
+    params = [product_id]
+    query = "SELECT * FROM reviews WHERE product_id = $1"
+    after = page.keyset([("created_at", datetime), ("id", int)], params, descending=True)
+    if after:
+        query += " AND " + after
+    query += " ORDER BY created_at DESC, id DESC " + page.limit_clause(params)
+
+    reviews = await db.fetch(query, *params)
+    not_modified = conditional.evaluate(response, "reviews", reviews)
+    if not_modified:
+        return not_modified
+    reviews = paginate(reviews, page, response, lambda r: (r["created_at"], r["id"]))
+    return rows_response(reviews, Review, response)
 
 @router.post("/", response_model=Review)
 async def submit_review(
@@ -42,7 +59,7 @@ async def submit_review(
     query = """
         INSERT INTO reviews (product_id, user_id, rating, comment)
         VALUES ($1, $2, $3, $4)
-        RETURNING id, product_id, user_id, rating, comment, created_at
+        RETURNING id, product_id, user_id, reviewer_name, rating, comment, created_at
     """
     new_review = await db.fetchrow(
         query, body.product_id, user_id, body.rating, body.comment
@@ -0,0 +1,111 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel
+from typing import List, Literal, Optional
+import html
+import asyncpg
+from app.libs.database import get_read_connection
+
+router = APIRouter(prefix="/search", tags=["search"])
+
+# Must match the configuration of the search_vector columns (migration 009)
+SEARCH_CONFIG = "catalog_search"
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 50
+
+# ts_headline copies the source text verbatim, so matches are delimited with
+# control characters and the snippet is HTML-escaped before adding <mark> tags.
+_START, _STOP = "\x02", "\x03"
+PRODUCT_HEADLINE_OPTIONS = f"StartSel={_START}, StopSel={_STOP}, MaxWords=35, MinWords=15, MaxFragments=2"
+COMPANY_HEADLINE_OPTIONS = f"StartSel={_START}, StopSel={_STOP}, HighlightAll=true"
+
+# Candidates come from the GIN indexes (full-text match or trigram similarity
+# on the name); snippets are only generated for the rows that are returned.
+SEARCH_PRODUCTS_QUERY = f"""
+    WITH hits AS (
+        SELECT p.id, query,
+               greatest(ts_rank(p.search_vector, query), similarity(p.name, $1)) AS rank
+        FROM products p, websearch_to_tsquery('{SEARCH_CONFIG}', $1) AS query
+        WHERE p.search_vector @@ query OR p.name % $1
+        ORDER BY rank DESC, p.id
+        LIMIT $2
+    )
+    SELECT p.id, p.name, p.brand, p.price, p.category, p.supplier_id, hits.rank,
+           ts_headline('{SEARCH_CONFIG}', concat_ws(' - ', p.name, p.brand, p.description),
+                       hits.query, $3) AS highlight
+    FROM hits
+    JOIN products p ON p.id = hits.id
+    ORDER BY hits.rank DESC, p.id
+"""
+
+SEARCH_COMPANIES_QUERY = f"""
+    WITH hits AS (
+        SELECT c.id, query,
+               greatest(ts_rank(c.search_vector, query), similarity(c.name, $1)) AS rank
+        FROM companies c, websearch_to_tsquery('{SEARCH_CONFIG}', $1) AS query
+        WHERE c.search_vector @@ query OR c.name % $1
+        ORDER BY rank DESC, c.id
+        LIMIT $2
+    )
+    SELECT c.id, c.name, c.city, c.state, hits.rank,
+           ts_headline('{SEARCH_CONFIG}', concat_ws(' - ', c.name, c.city),
+                       hits.query, $3) AS highlight
+    FROM hits
+    JOIN companies c ON c.id = hits.id
+    ORDER BY hits.rank DESC, c.id
+"""
+
+
+class ProductHit(BaseModel):
+    id: int
+    name: str
+    brand: Optional[str] = None
+    price: Optional[float] = None
+    category: Optional[str] = None
+    supplier_id: int
+    rank: float
+    highlight: str
+
+
+class CompanyHit(BaseModel):
+    id: int
+    name: str
+    city: Optional[str] = None
+    state: Optional[str] = None
+    rank: float
+    highlight: str
+
+
+class SearchResults(BaseModel):
+    products: List[ProductHit] = []
+    companies: List[CompanyHit] = []
+
+
+def render_highlight(snippet: str) -> str:
+    """Escape a ts_headline snippet and mark the matched words with <mark>."""
+    return html.escape(snippet).replace(_START, "<mark>").replace(_STOP, "</mark>")
+
+
+@router.get("/", response_model=SearchResults)
+async def search(
+    q: str = Query(..., min_length=2, max_length=200, description="Search terms"),
+    scope: Literal["all", "products", "companies"] = Query("all", description="What to search"),
+    limit: int = Query(DEFAULT_LIMIT, ge=1, le=MAX_LIMIT, description="Maximum results per kind"),
+    db: asyncpg.Connection = Depends(get_read_connection)
+):
+    """Ranked search over product name, brand and description and company name and city."""
+    results = SearchResults()
+    try:
+        if scope in ("all", "products"):
+            rows = await db.fetch(SEARCH_PRODUCTS_QUERY, q, limit, PRODUCT_HEADLINE_OPTIONS)
+            results.products = [
+                ProductHit(**{**dict(r), "highlight": render_highlight(r["highlight"])}) for r in rows
+            ]
+        if scope in ("all", "companies"):
+            rows = await db.fetch(SEARCH_COMPANIES_QUERY, q, limit, COMPANY_HEADLINE_OPTIONS)
+            results.companies = [
+                CompanyHit(**{**dict(r), "highlight": render_highlight(r["highlight"])}) for r in rows
+            ]
+    except asyncpg.exceptions.PostgresError as e:
+        raise HTTPException(status_code=500, detail=f"Database error: {e}")
+    return results
@@ -1,22 +1,23 @@
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, EmailStr
 import asyncpg
-from passlib.context import CryptContext
 from app.libs.database import get_db_connection
+from app.libs.passwords import (
+    WorkerPoolSaturated,
+    hash_password_async,
+    verify_password_async,
+)
 
 router = APIRouter()
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
-
-def hash_password(password: str) -> str:
-    """Hash a plaintext password."""
-    return pwd_context.hash(password)
-
-
-def verify_password(password: str, hashed: str) -> bool:
-    """Verify a plaintext password against a hash."""
-    return pwd_context.verify(password, hashed)
+def password_pool_busy() -> HTTPException:
+    """Shed load quickly instead of queueing more bcrypt work."""
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy, please try again shortly",
+        headers={"Retry-After": "1"},
+    )
 
 class RegistrationRequest(BaseModel):
     email: EmailStr
@@ -34,8 +35,6 @@ class UserResponse(BaseModel):
 
 @router.post("/register", response_model=UserResponse)
 async def register_user(body: RegistrationRequest, db: asyncpg.Connection = Depends(get_db_connection)):
-    password_hash = hash_password(body.password)
-    
     # Check if user already exists
     user_exists = await db.fetchval("SELECT id FROM users WHERE email = $1", body.email)
     if user_exists:
@@ -46,6 +45,11 @@ async def register_user(body: RegistrationRequest, db: asyncpg.Connection = Depe
     if not role_id:
         raise HTTPException(status_code=400, detail="Invalid role specified")
 
+    try:
+        password_hash = await hash_password_async(body.password)
+    except WorkerPoolSaturated:
+        raise password_pool_busy()
+
     company_id = None
     if body.role == 'supplier':
         if not body.company_name:
@@ -86,7 +90,14 @@ async def login_user(body: LoginRequest, db: asyncpg.Connection = Depends(get_db
         "SELECT id, email, full_name, role_id, company_id, password_hash FROM users WHERE email = $1",
         body.email,
     )
-    if not user_record or not verify_password(body.password, user_record["password_hash"]):
+    if not user_record:
+        raise HTTPException(status_code=401, detail="Invalid email or password")
+
+    try:
+        password_ok = await verify_password_async(body.password, user_record["password_hash"])
+    except WorkerPoolSaturated:
+        raise password_pool_busy()
+    if not password_ok:
         raise HTTPException(status_code=401, detail="Invalid email or password")
 
     role_name = await db.fetchval(
@@ -0,0 +1,261 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Iterable
+import asyncpg
+from app.libs import database
+
+# Channel used by the notify_catalog_change trigger (migration 010)
+CATALOG_CHANNEL = "catalog_changes"
+
+
+class CatalogCache:
+    """Read-through LRU cache for catalog queries with a TTL.
+
+    Every entry carries tags such as ``"products"`` (any list of products) or
+    ``"products:42"`` (one product).  A change notification ``"products:42"``
+    drops both, so lists and the changed row are reloaded while other rows
+    stay cached.
+
+    The cache only serves entries while the change listener is connected
+    (``enabled``); without it notifications could be missed, so every lookup
+    goes to the database instead.
+
+    Rows read from a replica shortly after an invalidation may predate the
+    change, so they are returned but not stored until the replica has caught
+    up with it.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_size: int = 1000) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.enabled = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, float, tuple[str, ...]]] = OrderedDict()
+        self._keys_by_tag: dict[str, set[Hashable]] = {}
+        self._loading: dict[Hashable, asyncio.Future] = {}
+        # Bumped on every invalidation; a load that raced with one is not stored
+        self._generation = 0
+        self._invalidated_at = 0.0
+
+    def _remove(self, key: Hashable) -> None:
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        if entry[1] <= time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, entry[0]
+
+    def put(self, key: Hashable, value: Any, tags: Iterable[str]) -> None:
+        if self.max_size <= 0:
+            return
+        if key in self._entries:
+            self._remove(key)
+        tags = tuple(tags)
+        self._entries[key] = (value, time.monotonic() + self.ttl, tags)
+        for tag in tags:
+            self._keys_by_tag.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        tags: Iterable[str],
+        loader: Callable[[], Awaitable[Any]],
+        replica: bool = False,
+    ) -> Any:
+        """Return the cached value for ``key`` or load, cache and return it.
+
+        Concurrent misses for the same key share a single load.  ``replica``
+        tells that ``loader`` reads from the replica.
+        """
+        if not self.enabled:
+            return await loader()
+
+        found, value = self.get(key)
+        if found:
+            self.hits += 1
+            return value
+        self.misses += 1
+
+        pending = self._loading.get(key)
+        if pending is not None:
+            await asyncio.wait([pending])
+            if not pending.cancelled():
+                return pending.result()
+            # The request that was loading it went away; load it ourselves
+            return await loader()
+
+        future = asyncio.get_running_loop().create_future()
+        self._loading[key] = future
+        generation = self._generation
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters re-raise the error; mark it retrieved when there are none
+            future.exception()
+            raise
+        finally:
+            del self._loading[key]
+        future.set_result(value)
+        if generation == self._generation and self.enabled and not (
+            replica and not database.replica_monitor.caught_up(time.monotonic() - self._invalidated_at)
+        ):
+            self.put(key, value, tags)
+        return value
+
+    async def fetch(self, db: asyncpg.Connection, tags: Iterable[str], query: str, *args) -> list[asyncpg.Record]:
+        return await self.get_or_load(
+            ("fetch", query, args), tags, lambda: db.fetch(query, *args), getattr(db, "replica", False)
+        )
+
+    async def fetchrow(self, db: asyncpg.Connection, tags: Iterable[str], query: str, *args) -> asyncpg.Record | None:
+        return await self.get_or_load(
+            ("fetchrow", query, args), tags, lambda: db.fetchrow(query, *args), getattr(db, "replica", False)
+        )
+
+    def invalidate(self, tag: str) -> None:
+        self._generation += 1
+        self._invalidated_at = time.monotonic()
+        for key in list(self._keys_by_tag.get(tag, ())):
+            self._remove(key)
+            self.invalidations += 1
+
+    def handle_notification(self, payload: str) -> None:
+        """Apply a ``"<table>:<id>"`` change notification."""
+        table, _, row_id = payload.partition(":")
+        self.invalidate(table)
+        if row_id:
+            self.invalidate(payload)
+
+    def clear(self) -> None:
+        self._generation += 1
+        self._invalidated_at = time.monotonic()
+        self._entries.clear()
+        self._keys_by_tag.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+
+catalog_cache = CatalogCache(
+    ttl=float(os.getenv("CATALOG_CACHE_TTL", "300")),
+    max_size=int(os.getenv("CATALOG_CACHE_SIZE", "1000")),
+)
+
+
+class CatalogChangeListener:
+    """Keep a dedicated connection LISTENing for catalog changes.
+
+    The cache is enabled only while the connection is up.  When it is lost
+    the cache is disabled and cleared, and re-enabled after reconnecting.
+    """
+
+    def __init__(
+        self,
+        cache: CatalogCache,
+        channel: str = CATALOG_CHANNEL,
+        keepalive_interval: float = 30.0,
+        max_backoff: float = 30.0,
+    ) -> None:
+        self.cache = cache
+        self.channel = channel
+        self.keepalive_interval = keepalive_interval
+        self.max_backoff = max_backoff
+        self._task: asyncio.Task | None = None
+
+    def _on_notification(self, conn, pid, channel, payload) -> None:
+        self.cache.handle_notification(payload)
+
+    async def listen_once(self) -> None:
+        """Listen until the connection is lost."""
+        lost = asyncio.Event()
+        conn = await asyncpg.connect(database.DATABASE_URL)
+        try:
+            conn.add_termination_listener(lambda _: lost.set())
+            await conn.add_listener(self.channel, self._on_notification)
+            # Anything cached before LISTEN took effect may have missed changes
+            self.cache.clear()
+            self.cache.enabled = True
+            while not lost.is_set():
+                try:
+                    await asyncio.wait_for(lost.wait(), self.keepalive_interval)
+                except asyncio.TimeoutError:
+                    # Detects half-open connections that never report termination
+                    await conn.execute("SELECT 1", timeout=self.keepalive_interval)
+        finally:
+            self.cache.enabled = False
+            self.cache.clear()
+            if not conn.is_closed():
+                conn.terminate()
+
+    async def run(self) -> None:
+        backoff = 1.0
+        while True:
+            try:
+                await self.listen_once()
+                backoff = 1.0
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Catalog change listener failed: {e}")
+            await asyncio.sleep(backoff)
+            backoff = min(self.max_backoff, backoff * 2)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
+catalog_listener = CatalogChangeListener(catalog_cache)
+
+
+async def start_catalog_listener() -> None:
+    if catalog_cache.max_size > 0:
+        catalog_listener.start()
+
+
+async def stop_catalog_listener() -> None:
+    await catalog_listener.stop()
@@ -0,0 +1,272 @@
+"""Bulk product import from a streamed CSV body.
+
+Usage:
+
+    from app.libs.catalog_import import import_products
+
+    report = await import_products(db, supplier_id, request.stream())
+
+The first record is the header; ``sku`` and ``name`` are required, and
+``description``, ``price``, ``category`` and ``brand`` are optional.  Records
+are parsed and validated as the body arrives and the valid ones are copied
+``IMPORT_BATCH_ROWS`` at a time into a temporary staging table, so memory use
+does not depend on the size of the file.  Once the body is read, the staged
+rows are merged into ``products`` with a single upsert on
+``(supplier_id, sku)``; when a SKU appears more than once the last occurrence
+wins.  Invalid rows are skipped and reported with their line number.
+"""
+
+import codecs
+import csv
+import os
+from decimal import Decimal, InvalidOperation
+from typing import AsyncIterator, Iterable, List
+import asyncpg
+from pydantic import BaseModel
+
+IMPORT_BATCH_ROWS = int(os.getenv("IMPORT_BATCH_ROWS", "5000"))
+# Errors listed in the report; the rest are only counted
+IMPORT_MAX_ERRORS = int(os.getenv("IMPORT_MAX_ERRORS", "1000"))
+
+IMPORT_COLUMNS = ("sku", "name", "description", "price", "category", "brand")
+REQUIRED_COLUMNS = ("sku", "name")
+MAX_PRICE = Decimal("9999999999.99")  # NUMERIC(12, 2)
+# Longest record accepted; bounds what is buffered while waiting for a newline
+MAX_RECORD_CHARS = 1_000_000
+
+STAGING_COLUMNS = ["line", "sku", "name", "description", "price", "category", "category_id", "brand"]
+
+CREATE_STAGING_TABLE = """
+    CREATE TEMP TABLE product_import (
+        line INTEGER NOT NULL,
+        sku TEXT NOT NULL,
+        name TEXT NOT NULL,
+        description TEXT,
+        price NUMERIC(12, 2),
+        category TEXT,
+        category_id INTEGER,
+        brand TEXT
+    )
+"""
+
+# Rows identical to the stored product are filtered out before the upsert:
+# they are neither locked nor rewritten, keep their updated_at and send no
+# NOTIFY.  The conflict filter repeats the check for rows that appear
+# concurrently.
+MERGE_QUERY = """
+    WITH latest AS (
+        SELECT DISTINCT ON (sku) *
+        FROM product_import
+        ORDER BY sku, line DESC
+    ), changed AS (
+        SELECT l.*
+        FROM latest l
+        LEFT JOIN products p ON p.supplier_id = $1 AND p.sku = l.sku
+        WHERE p.id IS NULL
+           OR (p.name, p.description, p.price, p.category, p.category_id, p.brand)
+              IS DISTINCT FROM (l.name, l.description, l.price, l.category, l.category_id, l.brand)
+    ), merged AS (
+        INSERT INTO products AS p (supplier_id, sku, name, description, price, category, category_id, brand)
+        SELECT $1, sku, name, description, price, category, category_id, brand
+        FROM changed
+        ON CONFLICT (supplier_id, sku) DO UPDATE
+        SET name = EXCLUDED.name,
+            description = EXCLUDED.description,
+            price = EXCLUDED.price,
+            category = EXCLUDED.category,
+            category_id = EXCLUDED.category_id,
+            brand = EXCLUDED.brand
+        WHERE (p.name, p.description, p.price, p.category, p.category_id, p.brand)
+            IS DISTINCT FROM
+            (EXCLUDED.name, EXCLUDED.description, EXCLUDED.price, EXCLUDED.category, EXCLUDED.category_id, EXCLUDED.brand)
+        RETURNING xmax = 0 AS inserted
+    )
+    SELECT
+        (SELECT count(*) FROM product_import) AS staged,
+        (SELECT count(*) FROM latest) AS distinct_skus,
+        count(*) FILTER (WHERE inserted) AS inserted,
+        count(*) FILTER (WHERE NOT inserted) AS updated
+    FROM merged
+"""
+
+
+class CatalogImportError(Exception):
+    """The body cannot be imported at all (bad encoding or header)."""
+
+
+class RowError(BaseModel):
+    line: int
+    error: str
+
+
+class ImportReport(BaseModel):
+    rows: int = 0  # Data records read, valid or not
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    duplicates: int = 0  # Earlier occurrences of a repeated SKU
+    error_count: int = 0
+    errors: List[RowError] = []
+
+
+class CSVRecordSplitter:
+    """Split decoded text into whole CSV records, remembering the line each starts on.
+
+    A record ends at a newline outside quotes; since quotes inside a quoted
+    field are doubled, a newline is inside quotes exactly when the record so
+    far holds an odd number of them.
+    """
+
+    def __init__(self) -> None:
+        self.tail = ""  # Text after the last newline seen
+        self.pending: list[str] = []  # Lines of a record with an open quote
+        self.quotes = 0
+        self.size = 0
+        self.start = 1
+        self.line = 1  # Number of the next complete line
+
+    def feed(self, text: str) -> list[tuple[int, str]]:
+        lines = (self.tail + text).split("\n")
+        self.tail = lines.pop()
+        records = []
+        for line in lines:
+            if not self.pending:
+                self.start = self.line
+                self.size = 0
+            self.line += 1
+            self.pending.append(line)
+            self.size += len(line)
+            self.quotes += line.count('"')
+            if self.quotes % 2 == 0:
+                records.append((self.start, "\n".join(self.pending)))
+                self.pending = []
+                self.quotes = 0
+        if len(self.tail) + (self.size if self.pending else 0) > MAX_RECORD_CHARS:
+            line = self.start if self.pending else self.line
+            raise CatalogImportError(f"The record on line {line} is too long")
+        return records
+
+    def finish(self) -> list[tuple[int, str]]:
+        """Return the records left once the body ends without a final newline."""
+        records = self.feed("\n") if self.tail else []
+        if self.pending:
+            # Unterminated quote; parsed as is and most likely reported
+            records.append((self.start, "\n".join(self.pending)))
+            self.pending = []
+        return records
+
+
+def parse_record(record: str) -> list[str]:
+    return next(csv.reader([record.removesuffix("\r")]), [])
+
+
+async def read_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[list[tuple[int, str]]]:
+    """Yield the complete records of each chunk of the body."""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    splitter = CSVRecordSplitter()
+    try:
+        async for chunk in chunks:
+            yield splitter.feed(decoder.decode(chunk))
+        yield splitter.feed(decoder.decode(b"", final=True)) + splitter.finish()
+    except UnicodeDecodeError:
+        raise CatalogImportError(f"The file is not valid UTF-8 (line {splitter.line})")
+
+
+def read_header(record: str) -> dict[str, int]:
+    """Map each known column to its position; unknown columns are ignored."""
+    try:
+        names = [name.strip().lower() for name in parse_record(record)]
+    except csv.Error as e:
+        raise CatalogImportError(f"Invalid header: {e}")
+    missing = [column for column in REQUIRED_COLUMNS if column not in names]
+    if missing:
+        raise CatalogImportError(f"Missing required columns: {', '.join(missing)}")
+    return {column: names.index(column) for column in IMPORT_COLUMNS if column in names}
+
+
+def validate_row(line: int, fields: list[str], width: int, columns: dict[str, int], categories: dict[str, int]) -> tuple:
+    """Return the staging record of a data row; raise ``ValueError`` if it is invalid."""
+    if len(fields) != width:
+        raise ValueError(f"Expected {width} fields, found {len(fields)}")
+    values = {column: fields[index].strip() or None for column, index in columns.items()}
+    for column in REQUIRED_COLUMNS:
+        if values[column] is None:
+            raise ValueError(f"{column} is required")
+
+    price = values.get("price")
+    if price is not None:
+        try:
+            price = Decimal(price)
+        except InvalidOperation:
+            raise ValueError(f"Invalid price: {values['price']!r}")
+        if not price.is_finite() or not 0 <= price <= MAX_PRICE:
+            raise ValueError(f"Price must be between 0 and {MAX_PRICE}")
+
+    category = values.get("category")
+    category_id = None
+    if category is not None:
+        category_id = categories.get(category)
+        if category_id is None:
+            raise ValueError(f"Unknown category: {category!r}")
+
+    return (line, values["sku"], values["name"], values.get("description"), price, category, category_id, values.get("brand"))
+
+
+def add_error(report: ImportReport, line: int, error: str) -> None:
+    report.error_count += 1
+    if len(report.errors) < IMPORT_MAX_ERRORS:
+        report.errors.append(RowError(line=line, error=error))
+
+
+async def copy_batch(db: asyncpg.Connection, batch: Iterable[tuple]) -> None:
+    await db.copy_records_to_table("product_import", records=batch, columns=STAGING_COLUMNS)
+
+
+async def import_products(db: asyncpg.Connection, supplier_id: int, chunks: AsyncIterator[bytes]) -> ImportReport:
+    """Validate and stage the CSV in ``chunks``, then upsert it into ``supplier_id``'s products.
+
+    Raises ``CatalogImportError`` when nothing can be imported; no product is
+    changed in that case.
+    """
+    categories = {row["name"]: row["id"] for row in await db.fetch("SELECT id, name FROM product_categories")}
+    report = ImportReport()
+    columns = None
+    width = 0
+    batch = []
+
+    async with db.transaction():
+        await db.execute(CREATE_STAGING_TABLE)
+        async for records in read_records(chunks):
+            for line, record in records:
+                if columns is None:
+                    columns = read_header(record)
+                    width = len(parse_record(record))
+                    continue
+                if not record.strip():
+                    continue
+                report.rows += 1
+                if "\x00" in record:
+                    add_error(report, line, "NUL characters are not allowed")
+                    continue
+                try:
+                    batch.append(validate_row(line, parse_record(record), width, columns, categories))
+                except (ValueError, csv.Error) as e:
+                    add_error(report, line, str(e))
+            if len(batch) >= IMPORT_BATCH_ROWS:
+                await copy_batch(db, batch)
+                batch = []
+        if columns is None:
+            raise CatalogImportError("The file is empty")
+        if batch:
+            await copy_batch(db, batch)
+
+        counts = await db.fetchrow(MERGE_QUERY, supplier_id)
+        # Dropped with the transaction on errors; also needed when the caller's
+        # transaction is still open
+        await db.execute("DROP TABLE product_import")
+
+    report.inserted = counts["inserted"]
+    report.updated = counts["updated"]
+    report.duplicates = counts["staged"] - counts["distinct_skus"]
+    report.unchanged = counts["distinct_skus"] - report.inserted - report.updated
+    return report
@@ -0,0 +1,102 @@
+"""Conditional GET (ETag / Last-Modified) for the public catalog endpoints.
+
+Usage:
+
+    from app.libs.conditional import Conditional
+
+    @router.get("/things/{thing_id}", response_model=Thing)
+    async def get_thing(thing_id: int, response: Response, conditional: Conditional, db = Depends(get_db_connection)):
+        row = await db.fetchrow(...)
+        not_modified = conditional.evaluate(response, "thing", [row])
+        if not_modified:
+            return not_modified
+        return Thing(**dict(row))
+
+Validators are derived from the ``(id, updated_at)`` pairs of the rows behind
+the response, so a 304 is decided before the body is built or serialized.
+List endpoints pass every fetched row, including the look-ahead row of the
+pagination, so the ETag also changes when the next cursor does.
+"""
+
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Annotated, Any, Sequence
+from fastapi import Depends, Header, Response
+
+# Cache-Control per route, overridable with CACHE_CONTROL_<ROUTE>
+CACHE_CONTROL = {
+    route: os.getenv(f"CACHE_CONTROL_{route.upper()}", default)
+    for route, default in {
+        "product": "public, max-age=60",
+        "products": "public, max-age=60",
+        "reviews": "public, max-age=30",
+        # Revalidated on every request so each profile view is still counted
+        "company_profile": "public, no-cache",
+    }.items()
+}
+
+
+def _as_utc(value: datetime) -> datetime:
+    # TIMESTAMP columns come back naive; the database runs in UTC
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def compute_etag(rows: Sequence[Any], version: str = "updated_at") -> str:
+    versions = repr([(row["id"], row[version]) for row in rows])
+    return 'W/"%s"' % hashlib.blake2b(versions.encode(), digest_size=16).hexdigest()
+
+
+def last_modified(rows: Sequence[Any], version: str = "updated_at") -> datetime | None:
+    versions = [row[version] for row in rows if row[version] is not None]
+    return _as_utc(max(versions)) if versions else None
+
+
+def _etag_matches(header: str, etag: str) -> bool:
+    """Weak comparison, as required for If-None-Match."""
+    if header.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in header.split(","))
+
+
+class ConditionalRequest:
+    """Validators sent by the client with a GET."""
+
+    def __init__(
+        self,
+        if_none_match: str | None = Header(None, include_in_schema=False),
+        if_modified_since: str | None = Header(None, include_in_schema=False),
+    ) -> None:
+        self.if_none_match = if_none_match
+        self.if_modified_since = if_modified_since
+
+    def is_fresh(self, etag: str, modified: datetime | None) -> bool:
+        # If-Modified-Since is only considered without If-None-Match (RFC 9110)
+        if self.if_none_match is not None:
+            return _etag_matches(self.if_none_match, etag)
+        if self.if_modified_since is None or modified is None:
+            return False
+        try:
+            since = parsedate_to_datetime(self.if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return modified.replace(microsecond=0) <= _as_utc(since)
+
+    def evaluate(
+        self, response: Response, route: str, rows: Sequence[Any], version: str = "updated_at"
+    ) -> Response | None:
+        """Set the validators on ``response``; return a 304 if the client is up to date."""
+        etag = compute_etag(rows, version)
+        modified = last_modified(rows, version)
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL[route]}
+        if modified is not None:
+            headers["Last-Modified"] = format_datetime(modified, usegmt=True)
+        response.headers.update(headers)
+        if self.is_fresh(etag, modified):
+            return Response(status_code=304, headers=headers)
+        return None
+
+
+Conditional = Annotated[ConditionalRequest, Depends()]
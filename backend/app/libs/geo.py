@@ -0,0 +1,68 @@
+"""Great-circle helpers for the nearby company search.
+
+Coordinates are WGS84 degrees.  Distances use the haversine formula on a
+sphere of radius ``EARTH_RADIUS_KM``, within 0.5% of the ellipsoidal distance.
+"""
+
+import math
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Distance in km from ($1, $2) = (latitude, longitude) to the row's
+# coordinates.  least() guards asin against rounding just above 1.
+DISTANCE_KM_SQL = f"""
+    2 * {EARTH_RADIUS_KM} * asin(least(1, sqrt(
+        power(sin(radians(latitude - $1) / 2), 2)
+        + cos(radians($1)) * cos(radians(latitude)) * power(sin(radians(longitude - $2) / 2), 2)
+    )))
+"""
+
+
+def haversine_km(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """Same distance as ``DISTANCE_KM_SQL``."""
+    dlat = math.radians(lat2 - lat1)
+    dlng = math.radians(lng2 - lng1)
+    a = math.sin(dlat / 2) ** 2 + math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * math.sin(dlng / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def planar_degrees(distance_km: float) -> float:
+    """Smallest planar distance, in degrees of ``point <-> point``, of a point ``distance_km`` away.
+
+    Along any path ``ds^2 = R^2 (dlat^2 + cos^2(lat) dlng^2) <= R^2 (dlat^2 + dlng^2)``,
+    so the great-circle distance never exceeds ``R`` times the planar one.
+    """
+    return math.degrees(distance_km / EARTH_RADIUS_KM)
+
+
+def min_distance_km(lat: float, planar: float) -> float:
+    """Lower bound on the distance from latitude ``lat`` to points ``planar`` degrees away or more.
+
+    The shortest path between such points stays below latitude
+    ``|lat| + 1.5 * planar``, where a degree of longitude is shortest.  Past
+    60 degrees the bound is too loose to help and 0 is returned.
+    """
+    highest = abs(lat) + 1.5 * planar
+    if highest >= 60:
+        return 0.0
+    return EARTH_RADIUS_KM * math.radians(planar) * math.cos(math.radians(highest))
+
+
+def bounding_box(lat: float, lng: float, radius_km: float) -> tuple[float, float, float, float]:
+    """Smallest ``(min_lng, min_lat, max_lng, max_lat)`` box holding every point within ``radius_km``.
+
+    Near a pole or across the antimeridian the box spans every longitude,
+    which is less selective but still holds every match.
+    """
+    angular = radius_km / EARTH_RADIUS_KM
+    min_lat = lat - math.degrees(angular)
+    max_lat = lat + math.degrees(angular)
+    if min_lat <= -90 or max_lat >= 90:
+        return -180.0, max(min_lat, -90.0), 180.0, min(max_lat, 90.0)
+
+    # Longitude span at the latitude where the circle is widest
+    delta_lng = math.degrees(math.asin(math.sin(angular) / math.cos(math.radians(lat))))
+    min_lng, max_lng = lng - delta_lng, lng + delta_lng
+    if min_lng < -180 or max_lng > 180:
+        return -180.0, min_lat, 180.0, max_lat
+    return min_lng, min_lat, max_lng, max_lat
@@ -0,0 +1,75 @@
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Mapping, Sequence
+
+# Seconds; suits both pool acquire waits and request latencies
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram with Prometheus ``le`` (less-or-equal) semantics."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        # One slot per bucket plus the implicit +Inf bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> list[tuple[str, int]]:
+        """Return ``(le, count)`` pairs with cumulative counts, ending in +Inf."""
+        result = []
+        total = 0
+        for le, count in zip([*map(str, self.buckets), "+Inf"], self.counts):
+            total += count
+            result.append((le, total))
+        return result
+
+    def snapshot(self) -> dict:
+        return {"buckets": dict(self.cumulative()), "sum": self.sum, "count": self.count}
+
+
+class RequestStats:
+    """Database work done while handling the current request."""
+
+    __slots__ = ("db_time", "queries", "statements", "scope")
+
+    def __init__(self, scope: dict | None = None) -> None:
+        self.db_time = 0.0
+        self.queries = 0
+        self.statements: dict[str, int] = {}  # Normalized SQL -> times run
+        self.scope = scope
+
+
+# Set by the metrics middleware for the duration of each HTTP request
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels.items()) + "}"
+
+
+def metric_header(name: str, kind: str, help: str) -> list[str]:
+    return [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+
+
+def histogram_samples(name: str, labels: Mapping[str, str], histogram: Histogram) -> list[str]:
+    """Prometheus text exposition lines of one histogram series."""
+    lines = [
+        f"{name}_bucket{format_labels({**labels, 'le': le})} {count}"
+        for le, count in histogram.cumulative()
+    ]
+    lines.append(f"{name}_sum{format_labels(labels)} {histogram.sum}")
+    lines.append(f"{name}_count{format_labels(labels)} {histogram.count}")
+    return lines
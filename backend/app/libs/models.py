@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class Company(BaseModel):
@@ -12,7 +12,13 @@ class Company(BaseModel):
     phone: Optional[str] = None
     email: Optional[EmailStr] = None
     website: Optional[str] = None
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
     created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+# Explicit select lists keep wide columns such as search_vector out of reads
+COMPANY_COLUMNS = ", ".join(Company.model_fields)
 
 class Product(BaseModel):
     id: int
@@ -21,7 +27,15 @@ class Product(BaseModel):
     price: Optional[float] = None
     category: Optional[str] = None
     supplier_id: int
+    sku: Optional[str] = None  # Supplier's own code, unique per supplier
+    rating_count: int = 0
+    rating_sum: int = 0
+    rating_average: Optional[float] = None
+    rating_histogram: List[int] = []  # Reviews per rating, 1 to 5 stars
     created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+PRODUCT_COLUMNS = ", ".join(Product.model_fields)
 
 class Review(BaseModel):
     id: int
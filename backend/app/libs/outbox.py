@@ -0,0 +1,310 @@
+import asyncio
+import os
+from email.message import EmailMessage
+from typing import TYPE_CHECKING, Sequence
+import asyncpg
+from app.libs import database
+
+if TYPE_CHECKING:
+    import aiosmtplib
+
+
+async def enqueue_email(
+    db: asyncpg.Connection,
+    to_email: str,
+    subject: str,
+    body: str,
+    lead_id: int | None = None,
+) -> None:
+    """Store an email in the outbox.
+
+    Call this inside the transaction that creates the triggering row so the
+    email is persisted if and only if that row is.
+    """
+    await db.execute(
+        "INSERT INTO email_outbox (lead_id, to_email, subject, body) VALUES ($1, $2, $3, $4)",
+        lead_id, to_email, subject, body,
+    )
+
+
+ENQUEUE_EMAILS_QUERY = """
+    INSERT INTO email_outbox (lead_id, to_email, subject, body)
+    SELECT * FROM unnest($1::int[], $2::text[], $3::text[], $4::text[])
+"""
+
+
+async def enqueue_emails(db: asyncpg.Connection, emails: Sequence[tuple[int | None, str, str, str]]) -> None:
+    """Store ``(lead_id, to_email, subject, body)`` emails in the outbox with one statement.
+
+    Same transaction rules as :func:`enqueue_email`.
+    """
+    if emails:
+        await db.execute(ENQUEUE_EMAILS_QUERY, *(list(column) for column in zip(*emails)))
+
+
+def lead_notification_email(supplier_name: str, contact_email: str, project_description: str) -> tuple[str, str]:
+    """Return the subject and body of the new lead notification."""
+    return (
+        "New lead received",
+        f"Hello {supplier_name},\n\n"
+        f"You have received a new lead from {contact_email}.\n\n"
+        f"Project description:\n{project_description}\n",
+    )
+
+
+class SMTPSender:
+    """Deliver messages over a single reused SMTP connection.
+
+    The connection (including STARTTLS and login) is opened lazily and kept
+    for subsequent batches.  If the server dropped it in the meantime the
+    message is retried once on a fresh connection.
+    """
+
+    def __init__(
+        self,
+        hostname: str,
+        port: int = 587,
+        username: str | None = None,
+        password: str | None = None,
+        from_email: str = "noreply@example.com",
+        start_tls: bool = True,
+        timeout: float = 30,
+    ) -> None:
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.from_email = from_email
+        self.start_tls = start_tls
+        self.timeout = timeout
+        self.connections_opened = 0
+        self._client: "aiosmtplib.SMTP | None" = None
+
+    async def _get_client(self) -> "aiosmtplib.SMTP":
+        if self._client is not None and self._client.is_connected:
+            return self._client
+        # Imported on first send rather than at startup
+        import aiosmtplib
+
+        client = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            start_tls=self.start_tls,
+            timeout=self.timeout,
+        )
+        await client.connect()
+        self.connections_opened += 1
+        self._client = client
+        return client
+
+    def build_message(self, to_email: str, subject: str, body: str) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.from_email
+        message["To"] = to_email
+        message["Subject"] = subject
+        message.set_content(body)
+        return message
+
+    async def send(self, message: EmailMessage) -> None:
+        import aiosmtplib
+
+        for attempt in range(2):
+            client = await self._get_client()
+            try:
+                await client.send_message(message)
+                return
+            except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+                self._client = None
+                if attempt:
+                    raise
+
+    async def send_batch(self, messages: Sequence[EmailMessage]) -> list[Exception | None]:
+        """Send messages in order, returning ``None`` or the error for each."""
+        results: list[Exception | None] = []
+        for message in messages:
+            try:
+                await self.send(message)
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def close(self) -> None:
+        client, self._client = self._client, None
+        if client is not None and client.is_connected:
+            try:
+                await client.quit()
+            except Exception:
+                client.close()
+
+
+def smtp_sender_from_env() -> SMTPSender | None:
+    """Build a sender from the ``SMTP_*`` variables, or ``None`` if unconfigured."""
+    smtp_host = os.getenv("SMTP_HOST")
+    if not smtp_host:
+        return None
+    smtp_user = os.getenv("SMTP_USERNAME")
+    return SMTPSender(
+        hostname=smtp_host,
+        port=int(os.getenv("SMTP_PORT", "587")),
+        username=smtp_user,
+        password=os.getenv("SMTP_PASSWORD"),
+        from_email=os.getenv("EMAIL_FROM", smtp_user or "noreply@example.com"),
+        start_tls=os.getenv("SMTP_START_TLS", "true").lower() == "true",
+    )
+
+
+# Claims a batch by pushing its next_attempt_at forward (a lease), so several
+# workers can dispatch concurrently and a crashed worker's batch is retried.
+CLAIM_QUERY = """
+    UPDATE email_outbox
+    SET attempts = attempts + 1,
+        next_attempt_at = NOW() + make_interval(secs => $3)
+    WHERE id IN (
+        SELECT id FROM email_outbox
+        WHERE sent_at IS NULL AND attempts < $2 AND next_attempt_at <= NOW()
+        ORDER BY next_attempt_at
+        LIMIT $1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, to_email, subject, body, attempts
+"""
+
+MARK_SENT_QUERY = "UPDATE email_outbox SET sent_at = NOW(), last_error = NULL WHERE id = ANY($1::bigint[])"
+
+MARK_FAILED_QUERY = """
+    UPDATE email_outbox AS o
+    SET last_error = f.error,
+        next_attempt_at = NOW() + make_interval(secs => f.delay)
+    FROM unnest($1::bigint[], $2::text[], $3::float8[]) AS f(id, error, delay)
+    WHERE o.id = f.id
+"""
+
+
+class OutboxDispatcher:
+    """Background task that drains ``email_outbox`` through an :class:`SMTPSender`."""
+
+    def __init__(
+        self,
+        sender: SMTPSender,
+        batch_size: int = 50,
+        poll_interval: float = 5.0,
+        max_attempts: int = 8,
+        base_backoff: float = 30.0,
+        max_backoff: float = 3600.0,
+        lease_seconds: float = 300.0,
+    ) -> None:
+        self.sender = sender
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.lease_seconds = lease_seconds
+        self.sent = 0
+        self.failed = 0
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def backoff(self, attempts: int) -> float:
+        return min(self.max_backoff, self.base_backoff * 2 ** max(attempts - 1, 0))
+
+    def wake(self) -> None:
+        """Skip the rest of the poll interval, e.g. right after an enqueue."""
+        self._wakeup.set()
+
+    async def dispatch_once(self, conn: asyncpg.Connection) -> int:
+        """Send one batch and record the outcome. Returns the batch size."""
+        rows = await conn.fetch(CLAIM_QUERY, self.batch_size, self.max_attempts, self.lease_seconds)
+        if not rows:
+            return 0
+
+        messages = [self.sender.build_message(r["to_email"], r["subject"], r["body"]) for r in rows]
+        results = await self.sender.send_batch(messages)
+
+        sent_ids = [r["id"] for r, error in zip(rows, results) if error is None]
+        failed = [(r, error) for r, error in zip(rows, results) if error is not None]
+
+        if sent_ids:
+            await conn.execute(MARK_SENT_QUERY, sent_ids)
+        if failed:
+            await conn.execute(
+                MARK_FAILED_QUERY,
+                [r["id"] for r, _ in failed],
+                [str(error) for _, error in failed],
+                [self.backoff(r["attempts"]) for r, _ in failed],
+            )
+            for r, error in failed:
+                print(f"Error sending outbox email {r['id']} (attempt {r['attempts']}): {error}")
+
+        self.sent += len(sent_ids)
+        self.failed += len(failed)
+        return len(rows)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                async with database.connection() as conn:
+                    handled = await self.dispatch_once(conn)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Outbox dispatch failed: {e}")
+                handled = 0
+
+            if handled >= self.batch_size:
+                # A full batch means more is probably waiting
+                continue
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.sender.close()
+
+
+dispatcher: OutboxDispatcher | None = None
+
+
+async def start_outbox_dispatcher() -> None:
+    global dispatcher
+    sender = smtp_sender_from_env()
+    if sender is None:
+        print("SMTP configuration missing; outbox emails will be kept until it is set")
+        return
+    dispatcher = OutboxDispatcher(
+        sender,
+        batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", "50")),
+        poll_interval=float(os.getenv("OUTBOX_POLL_INTERVAL", "5")),
+        max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8")),
+    )
+    dispatcher.start()
+
+
+async def stop_outbox_dispatcher() -> None:
+    global dispatcher
+    if dispatcher is not None:
+        await dispatcher.stop()
+        dispatcher = None
+
+
+def wake_outbox_dispatcher() -> None:
+    """Let this worker's dispatcher pick up freshly committed emails immediately."""
+    if dispatcher is not None:
+        dispatcher.wake()
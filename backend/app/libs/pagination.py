@@ -0,0 +1,144 @@
+"""Keyset (cursor) pagination shared by the list endpoints.
+
+Usage:
+
+    from app.libs.pagination import Pagination, paginate
+
+    @router.get("/things", response_model=List[Thing])
+    async def list_things(response: Response, page: Pagination, db = Depends(get_db_connection)):
+        params = []
+        conditions = []
+        after = page.keyset([("name", str), ("id", int)], params)
+        if after:
+            conditions.append(after)
+        ...
+        query += " ORDER BY name, id " + page.limit_clause(params)
+        rows = await db.fetch(query, *params)
+        return paginate(rows, page, response, lambda r: (r["name"], r["id"]))
+
+Lists stay plain JSON arrays.  When more rows exist, the response carries an
+``X-Next-Cursor`` header; clients pass it back as ``?cursor=`` to get the next
+page.  Every page costs one index range scan no matter how deep it is.
+"""
+
+import base64
+import binascii
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Annotated, Any, Callable, Sequence
+from fastapi import Depends, HTTPException, Query, Response
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _encode_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"d": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"n": str(value)}
+    return value
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if "dt" in value:
+            return datetime.fromisoformat(value["dt"])
+        if "d" in value:
+            return date.fromisoformat(value["d"])
+        if "n" in value:
+            return Decimal(value["n"])
+    return value
+
+
+def encode_cursor(*values: Any) -> str:
+    """Build an opaque cursor from the sort key of the last row on a page."""
+    raw = json.dumps([_encode_value(v) for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> list:
+    """Decode a cursor made by :func:`encode_cursor` holding ``size`` values."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != size:
+            raise ValueError("wrong cursor shape")
+        return [_decode_value(v) for v in values]
+    except (ValueError, TypeError, binascii.Error):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _check_value(value: Any, kind: type) -> Any:
+    """Return the cursor value as ``kind``, or raise when it cannot be one.
+
+    Cursors come back from clients, so a value of the wrong type must be
+    rejected here rather than fail as a database error.
+    """
+    # JSON true/false decode as bool, which is an int subclass
+    if not isinstance(value, bool):
+        if kind is float and isinstance(value, (int, float)) and math.isfinite(value):
+            return float(value)
+        if kind is Decimal and isinstance(value, (int, Decimal)) and Decimal(value).is_finite():
+            return Decimal(value)
+        if kind in (int, str, datetime) and isinstance(value, kind):
+            return value
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class PageParams:
+    """Query parameters accepted by every paginated list endpoint."""
+
+    def __init__(
+        self,
+        cursor: str | None = Query(None, description="Value of the X-Next-Cursor header from the previous page"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum number of items to return"),
+    ) -> None:
+        self.cursor = cursor
+        self.limit = limit
+
+    def cursor_values(self, types: Sequence[type]) -> list | None:
+        """Decode the cursor, checking each value against ``types``."""
+        if not self.cursor:
+            return None
+        values = decode_cursor(self.cursor, len(types))
+        return [_check_value(value, kind) for value, kind in zip(values, types)]
+
+    def keyset(self, columns: Sequence[tuple[str, type]], params: list, descending: bool = False) -> str | None:
+        """Return the condition selecting rows after the cursor, if any.
+
+        ``columns`` are ``(expression, type)`` pairs matching the ORDER BY of
+        the query, all ascending or all descending; the expressions must not
+        be NULL.  The cursor values are checked against the types and appended
+        to ``params``.
+        """
+        values = self.cursor_values([kind for _, kind in columns])
+        if values is None:
+            return None
+        placeholders = []
+        for value in values:
+            params.append(value)
+            placeholders.append(f"${len(params)}")
+        op = "<" if descending else ">"
+        return f"({', '.join(column for column, _ in columns)}) {op} ({', '.join(placeholders)})"
+
+    def limit_clause(self, params: list) -> str:
+        """Fetch one extra row so we know whether another page exists."""
+        params.append(self.limit + 1)
+        return f"LIMIT ${len(params)}"
+
+
+Pagination = Annotated[PageParams, Depends()]
+
+
+def paginate(rows: Sequence[Any], page: PageParams, response: Response, key: Callable[[Any], tuple]) -> list:
+    """Trim the extra row and advertise the next cursor on ``response``."""
+    items = list(rows[: page.limit])
+    if len(rows) > page.limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(*key(items[-1]))
+    return items
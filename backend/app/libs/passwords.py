@@ -0,0 +1,48 @@
+import os
+from functools import lru_cache
+from app.libs.workers import WorkerPoolSaturated, pool_from_env
+
+# bcrypt releases the GIL, so a small thread pool is enough to keep hashing
+# off the event loop.  Requests beyond workers + queue get a fast 503.
+password_pool = pool_from_env(
+    "PASSWORD_HASH",
+    default_workers=min(4, os.cpu_count() or 1),
+    default_queue=32,
+)
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    """Build the passlib context on first use.
+
+    passlib and its bcrypt backend are slow to import, and most workers only
+    need them once somebody logs in, so they are kept out of startup.
+    """
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def hash_password(password: str) -> str:
+    """Hash a plaintext password."""
+    return get_pwd_context().hash(password)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """Verify a plaintext password against a hash."""
+    return get_pwd_context().verify(password, hashed)
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the password worker pool."""
+    return await password_pool.run(hash_password, password)
+
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    """Verify a password on the password worker pool."""
+    return await password_pool.run(verify_password, password, hashed)
+
+
+def shutdown_password_pool() -> None:
+    password_pool.shutdown()
+
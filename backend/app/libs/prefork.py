@@ -0,0 +1,226 @@
+"""Pre-fork supervisor running several uvicorn workers on one listening socket.
+
+The supervisor binds the socket once and hands it to ``workers`` spawned
+processes, each running its own event loop, connection pool and background
+tasks.  It replaces workers that die and handles signals:
+
+* ``SIGHUP`` restarts the workers one at a time.  A replacement is started
+  and must finish its startup before the worker it replaces is stopped, so
+  the port never goes unserved.
+* ``SIGTERM`` / ``SIGINT`` stop every worker and exit.
+
+A stopped worker stops accepting connections, lets in-flight requests finish
+(for at most ``timeout_graceful_shutdown`` seconds) and then runs the app's
+shutdown handlers, which flush buffered profile views and stop the outbox
+dispatcher before closing the pool.
+
+The database connection budget is split here too: ``pool_size_per_worker``
+leaves room for the one extra worker that runs during a rolling restart.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from multiprocessing.context import SpawnProcess
+from multiprocessing.synchronize import Event
+
+import uvicorn
+
+multiprocessing.allow_connection_pickling()
+spawn = multiprocessing.get_context("spawn")
+
+# A replacement worker that has not started serving by then is abandoned
+WORKER_READY_TIMEOUT = float(os.getenv("WORKER_READY_TIMEOUT", "60"))
+# Minimum time between two starts of the same worker slot, to avoid spinning
+# on a worker that crashes at startup
+MIN_RESPAWN_INTERVAL = 1.0
+
+
+def available_cpus() -> list[int]:
+    """CPUs this process may run on (respects taskset and cgroup cpusets)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def worker_count(requested: int | None, cpus: int) -> int:
+    """Number of workers to run: ``requested`` capped to ``cpus``, else one per CPU."""
+    if requested is None:
+        return cpus
+    if requested < 1:
+        raise ValueError("At least one worker is required")
+    return min(requested, cpus)
+
+
+def pool_size_per_worker(budget: int, workers: int, reserved_per_worker: int = 0) -> int:
+    """Largest pool each worker may open without exceeding ``budget`` connections.
+
+    ``reserved_per_worker`` counts connections a worker opens outside its pool
+    (the catalog LISTEN connection).  One worker more than ``workers`` is
+    budgeted for because a rolling restart briefly runs a replacement next to
+    the worker it replaces.
+    """
+    size = budget // (workers + 1) - reserved_per_worker
+    if size < 1:
+        raise ValueError(
+            f"A budget of {budget} database connections is too small for {workers} workers "
+            f"({reserved_per_worker} reserved per worker)"
+        )
+    return size
+
+
+def pool_sizes(
+    workers: int,
+    budget: int | None,
+    replica_budget: int | None = None,
+    has_replica: bool = False,
+    same_server: bool = False,
+    reserved_per_worker: int = 0,
+) -> tuple[int | None, int | None]:
+    """Per-worker ``(primary, replica)`` pool sizes, ``None`` where there is no budget.
+
+    The replica is normally a separate server, so its budget defaults to the
+    primary's.  When it is the primary itself (``same_server``) and has no
+    budget of its own, the two pools split the primary's budget in half.
+    """
+    if not has_replica:
+        replica_budget = None
+    elif replica_budget is None:
+        if budget and same_server:
+            budget //= 2
+        replica_budget = budget
+    primary_size = pool_size_per_worker(budget, workers, reserved_per_worker) if budget else None
+    replica_size = pool_size_per_worker(replica_budget, workers) if replica_budget else None
+    return primary_size, replica_size
+
+
+def serve_worker(config: uvicorn.Config, sockets: list[socket.socket], ready: Event, cpu: int | None) -> None:
+    """Worker process entry point: serve ``config.app`` until told to stop."""
+    if cpu is not None:
+        os.sched_setaffinity(0, {cpu})
+    # Logging has to be configured again in the spawned process
+    config.configure_logging()
+    config.setup_event_loop()
+    server = uvicorn.Server(config)
+
+    async def serve() -> None:
+        serving = asyncio.create_task(server.serve(sockets=sockets))
+        while not server.started and not serving.done():
+            await asyncio.sleep(0.05)
+        if server.started:
+            ready.set()
+        await serving
+
+    asyncio.run(serve())
+
+
+class Worker:
+    __slots__ = ("slot", "process", "ready", "started_at")
+
+    def __init__(self, slot: int, process: SpawnProcess, ready: Event) -> None:
+        self.slot = slot
+        self.process = process
+        self.ready = ready
+        self.started_at = time.monotonic()
+
+
+class Supervisor:
+    def __init__(self, config: uvicorn.Config, workers: int, cpus: list[int] | None = None) -> None:
+        self.config = config
+        self.workers_count = workers
+        # When set, worker slot i is pinned to cpus[i % len(cpus)]
+        self.cpus = cpus
+        self.workers: list[Worker] = []
+        self.sockets: list[socket.socket] = []
+        self._restart = False
+        self._stop = False
+        self._wakeup = threading.Event()
+
+    def _cpu(self, slot: int) -> int | None:
+        return self.cpus[slot % len(self.cpus)] if self.cpus else None
+
+    def spawn_worker(self, slot: int) -> Worker:
+        ready = spawn.Event()
+        process = spawn.Process(
+            target=serve_worker,
+            args=(self.config, self.sockets, ready, self._cpu(slot)),
+            name=f"worker-{slot}",
+        )
+        process.start()
+        return Worker(slot, process, ready)
+
+    def stop_worker(self, worker: Worker) -> None:
+        """Ask a worker to drain and exit, killing it if it takes too long."""
+        if worker.process.is_alive():
+            os.kill(worker.process.pid, signal.SIGTERM)
+        # Requests get timeout_graceful_shutdown, shutdown handlers a little more
+        worker.process.join((self.config.timeout_graceful_shutdown or 30) + 10)
+        if worker.process.is_alive():
+            print(f"Worker {worker.process.pid} did not stop in time, killing it")
+            worker.process.kill()
+            worker.process.join()
+
+    def wait_ready(self, worker: Worker) -> bool:
+        deadline = time.monotonic() + WORKER_READY_TIMEOUT
+        while not worker.ready.wait(0.1):
+            if not worker.process.is_alive() or time.monotonic() > deadline or self._stop:
+                return False
+        return True
+
+    def rolling_restart(self) -> None:
+        print(f"Restarting {len(self.workers)} workers")
+        for index, old in enumerate(list(self.workers)):
+            new = self.spawn_worker(old.slot)
+            if not self.wait_ready(new):
+                print(f"Replacement for worker {old.process.pid} failed to start; keeping the old workers")
+                self.stop_worker(new)
+                return
+            self.workers[index] = new
+            self.stop_worker(old)
+        print("Restart complete")
+
+    def respawn_dead_workers(self) -> None:
+        for index, worker in enumerate(self.workers):
+            if worker.process.is_alive():
+                continue
+            if time.monotonic() - worker.started_at < MIN_RESPAWN_INTERVAL:
+                continue
+            print(f"Worker {worker.process.pid} exited with code {worker.process.exitcode}, starting a new one")
+            self.workers[index] = self.spawn_worker(worker.slot)
+
+    def handle_signal(self, signum, frame) -> None:
+        if signum == signal.SIGHUP:
+            self._restart = True
+        else:
+            self._stop = True
+        self._wakeup.set()
+
+    def run(self) -> None:
+        self.sockets = [self.config.bind_socket()]
+        for signum in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.handle_signal)
+
+        self.workers = [self.spawn_worker(slot) for slot in range(self.workers_count)]
+        print(f"Supervisor {os.getpid()} started {self.workers_count} workers")
+        try:
+            while not self._stop:
+                self._wakeup.wait(0.5)
+                self._wakeup.clear()
+                if self._restart and not self._stop:
+                    self._restart = False
+                    self.rolling_restart()
+                if not self._stop:
+                    self.respawn_dead_workers()
+        finally:
+            print("Stopping workers")
+            for worker in self.workers:
+                if worker.process.is_alive():
+                    os.kill(worker.process.pid, signal.SIGTERM)
+            for worker in self.workers:
+                self.stop_worker(worker)
+            for sock in self.sockets:
+                sock.close()
@@ -0,0 +1,96 @@
+import os
+import time
+from collections import OrderedDict
+from typing import NamedTuple
+import asyncpg
+
+
+class Principal(NamedTuple):
+    role: str | None
+    company_id: int | None
+
+
+PRINCIPAL_QUERY = """
+    SELECT ur.role_name, u.company_id
+    FROM users u
+    LEFT JOIN user_roles ur ON u.role_id = ur.id
+    WHERE u.id = $1
+"""
+
+
+class PrincipalCache:
+    """Bounded LRU of ``(role, company_id)`` per user with a TTL.
+
+    Explicit invalidation only reaches the current worker; the TTL bounds
+    how long other workers may keep serving a user's previous role or company.
+    """
+
+    def __init__(self, ttl: float = 60.0, max_size: int = 10_000) -> None:
+        self.ttl = ttl
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[Principal, float]] = OrderedDict()
+
+    def get(self, user_id: str) -> Principal | None:
+        entry = self._entries.get(user_id)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, user_id: str, principal: Principal) -> None:
+        if self.max_size <= 0:
+            return
+        self._entries[user_id] = (principal, time.monotonic() + self.ttl)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+principal_cache = PrincipalCache(
+    ttl=float(os.getenv("PRINCIPAL_CACHE_TTL", "60")),
+    max_size=int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000")),
+)
+
+
+async def resolve_principal(db: asyncpg.Connection, user_id: str) -> Principal | None:
+    """Return the role and company of ``user_id``, or ``None`` for unknown users."""
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    return await load_principal(db, user_id)
+
+
+async def load_principal(db: asyncpg.Connection, user_id: str) -> Principal | None:
+    """Look ``user_id`` up in the database, bypassing and then filling the cache."""
+    record = await db.fetchrow(PRINCIPAL_QUERY, user_id)
+    if record is None:
+        # Not cached: the user may be registered a moment later
+        return None
+    principal = Principal(role=record["role_name"], company_id=record["company_id"])
+    principal_cache.put(user_id, principal)
+    return principal
+
+
+async def resolve_company_id(db: asyncpg.Connection, user_id: str) -> int | None:
+    principal = await resolve_principal(db, user_id)
+    return principal.company_id if principal else None
+
+
+def invalidate_principal(user_id: str) -> None:
+    """Forget a cached principal after changing the user's role or company."""
+    principal_cache.invalidate(user_id)
@@ -0,0 +1,157 @@
+import asyncio
+import os
+from datetime import date, datetime
+import asyncpg
+from app.libs import database
+
+# Rows for companies deleted while their views sat in the buffer are dropped
+# by the join instead of failing the whole batch on the foreign key.
+FLUSH_QUERY = """
+    INSERT INTO profile_views (company_id, viewed_at)
+    SELECT v.company_id, v.viewed_at
+    FROM unnest($1::int[], $2::timestamp[]) AS v(company_id, viewed_at)
+    JOIN companies c ON c.id = v.company_id
+"""
+
+
+async def rebuild_daily_rollup(conn: asyncpg.Connection, since: date | None = None) -> int:
+    """Recompute ``profile_view_daily`` from raw ``profile_views``.
+
+    Only days on or after ``since`` are rebuilt when it is given.  New views
+    are blocked for the duration so the trigger and the rebuild never count
+    the same row twice.  Returns the number of rollup rows written.
+    """
+    async with conn.transaction():
+        await conn.execute("LOCK TABLE profile_views IN SHARE ROW EXCLUSIVE MODE")
+        await conn.execute(
+            "DELETE FROM profile_view_daily WHERE $1::date IS NULL OR day >= $1::date",
+            since,
+        )
+        result = await conn.execute(
+            """
+            INSERT INTO profile_view_daily (company_id, day, views)
+            SELECT company_id, viewed_at::date, COUNT(*)
+            FROM profile_views
+            WHERE $1::date IS NULL OR viewed_at >= $1::date
+            GROUP BY company_id, viewed_at::date
+            """,
+            since,
+        )
+    return int(result.split()[-1])
+
+
+class ProfileViewBuffer:
+    """Collect profile views in memory and write them in batches.
+
+    ``record`` never touches the database, so serving a profile stays a pure
+    read.  A background task calls ``flush`` every ``flush_interval`` seconds
+    (or sooner once ``flush_threshold`` views are waiting).  When more than
+    ``max_buffered`` views are pending, new ones are dropped and counted.
+    """
+
+    def __init__(
+        self,
+        max_buffered: int = 100_000,
+        flush_interval: float = 5.0,
+        flush_threshold: int = 5_000,
+    ) -> None:
+        self.max_buffered = max_buffered
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.flushed = 0
+        self.dropped = 0
+        self._views: list[tuple[int, datetime]] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def buffered(self) -> int:
+        return len(self._views)
+
+    def stats(self) -> dict:
+        return {"buffered": self.buffered, "flushed": self.flushed, "dropped": self.dropped}
+
+    def record(self, company_id: int) -> None:
+        if len(self._views) >= self.max_buffered:
+            self.dropped += 1
+            return
+        self._views.append((company_id, datetime.utcnow()))
+        if len(self._views) >= self.flush_threshold:
+            self._wakeup.set()
+
+    async def write(self, conn: asyncpg.Connection, views: list[tuple[int, datetime]]) -> None:
+        await conn.execute(FLUSH_QUERY, [v[0] for v in views], [v[1] for v in views])
+
+    async def flush(self) -> int:
+        """Write every buffered view. Returns the number of views written."""
+        async with self._flush_lock:
+            views, self._views = self._views, []
+            if not views:
+                return 0
+            try:
+                async with database.connection() as conn:
+                    await self.write(conn, views)
+            except asyncio.CancelledError:
+                # Keep the batch for the next flush rather than losing it
+                self._requeue(views)
+                raise
+            except Exception as e:
+                self._requeue(views)
+                print(f"Error flushing {len(views)} profile views: {e}")
+                return 0
+            self.flushed += len(views)
+            return len(views)
+
+    def _requeue(self, views: list[tuple[int, datetime]]) -> None:
+        """Put a batch back in front of newer views, as far as it fits."""
+        room = max(self.max_buffered - len(self._views), 0)
+        self._views[:0] = views[-room:] if room else []
+        self.dropped += len(views) - min(room, len(views))
+
+    async def run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Stop the background task and write whatever is still buffered.
+
+        The task is not cancelled: a flush in progress runs to completion, so
+        its batch is neither lost nor written twice.
+        """
+        task, self._task = self._task, None
+        if task is not None:
+            self._stopping = True
+            self._wakeup.set()
+            await task
+        await self.flush()
+
+
+view_buffer = ProfileViewBuffer(
+    max_buffered=int(os.getenv("PROFILE_VIEWS_MAX_BUFFERED", "100000")),
+    flush_interval=float(os.getenv("PROFILE_VIEWS_FLUSH_INTERVAL", "5")),
+    flush_threshold=int(os.getenv("PROFILE_VIEWS_FLUSH_THRESHOLD", "5000")),
+)
+
+
+def record_profile_view(company_id: int) -> None:
+    view_buffer.record(company_id)
+
+
+async def start_profile_view_flusher() -> None:
+    view_buffer.start()
+
+
+async def stop_profile_view_flusher() -> None:
+    await view_buffer.stop()
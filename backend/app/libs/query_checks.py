@@ -0,0 +1,70 @@
+"""Slow-query log and repeated-statement (N+1) detection for request queries.
+
+``InstrumentedConnection`` calls ``check_query`` after every statement run
+while handling a request:
+
+* statements slower than ``DB_SLOW_QUERY_SECONDS`` are logged with their
+  normalized SQL and the route;
+* a request running the same statement shape more than
+  ``DB_REPEATED_QUERY_LIMIT`` times (typically a query inside a loop) is
+  logged once, or fails with ``RepeatedQueryError`` when ``DB_QUERY_CHECKS``
+  is ``raise``.  The test suite runs in that mode so N+1 regressions fail
+  the tests that exercise them.
+"""
+
+import os
+import re
+from functools import lru_cache
+from app.libs.metrics import RequestStats
+
+DB_SLOW_QUERY_SECONDS = float(os.getenv("DB_SLOW_QUERY_SECONDS", "0.5"))
+DB_REPEATED_QUERY_LIMIT = int(os.getenv("DB_REPEATED_QUERY_LIMIT", "10"))
+# off, warn (log only) or raise
+DB_QUERY_CHECKS = os.getenv("DB_QUERY_CHECKS", "warn")
+
+MAX_LOGGED_SQL = 300
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"(?<![\w$.])\d+(?:\.\d+)?\b")
+_WHITESPACE = re.compile(r"\s+")
+
+
+class RepeatedQueryError(RuntimeError):
+    """A request ran the same statement more than ``DB_REPEATED_QUERY_LIMIT`` times."""
+
+
+@lru_cache(maxsize=1024)
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and replace literals with ``?`` so equivalent statements compare equal."""
+    sql = _STRING_LITERAL.sub("?", sql)
+    sql = _NUMBER_LITERAL.sub("?", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def _route(stats: RequestStats) -> str:
+    scope = stats.scope or {}
+    route = scope.get("route")
+    return getattr(route, "path", None) or scope.get("path", "?")
+
+
+def _shorten(sql: str) -> str:
+    return sql if len(sql) <= MAX_LOGGED_SQL else sql[:MAX_LOGGED_SQL] + "..."
+
+
+def check_query(stats: RequestStats, sql: str, elapsed: float) -> None:
+    if DB_QUERY_CHECKS == "off":
+        return
+    shape = normalize_sql(sql)
+    if elapsed >= DB_SLOW_QUERY_SECONDS:
+        print(f"Slow query ({elapsed * 1000:.0f} ms) on {_route(stats)}: {_shorten(shape)}")
+
+    count = stats.statements.get(shape, 0) + 1
+    stats.statements[shape] = count
+    if count == DB_REPEATED_QUERY_LIMIT + 1:
+        message = (
+            f"{_route(stats)} ran the same statement more than {DB_REPEATED_QUERY_LIMIT} times "
+            f"(N+1 query?): {_shorten(shape)}"
+        )
+        if DB_QUERY_CHECKS == "raise":
+            raise RepeatedQueryError(message)
+        print(message)
@@ -0,0 +1,159 @@
+"""Per-route request metrics, exposed in the Prometheus text format.
+
+``MetricsMiddleware`` times every HTTP request and, through the
+``InstrumentedConnection`` yielded by ``get_db_connection``, the database
+queries it runs.  Series are labelled with the route template (for example
+``/routes/products/{product_id}``) rather than the raw path, so their number
+stays bounded; requests that match no route share ``route="unmatched"``.
+
+Metrics are kept per process: with several workers each one reports its own
+series and Prometheus should scrape every worker (or sum them).
+"""
+
+import hmac
+import os
+import time
+from fastapi import Header, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.libs import database
+from app.libs.metrics import (
+    Histogram,
+    RequestStats,
+    current_request,
+    format_labels,
+    histogram_samples,
+    metric_header,
+)
+
+# GET /metrics requires "Authorization: Bearer <METRICS_TOKEN>".  Without a
+# token it is refused unless METRICS_PUBLIC opts in to serving it openly,
+# which is only safe when the port is not reachable from outside.
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "").lower() in ("1", "true", "yes")
+
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+UNMATCHED_ROUTE = "unmatched"
+
+
+class RouteMetrics:
+    __slots__ = ("latency", "db_time", "queries", "statuses")
+
+    def __init__(self) -> None:
+        self.latency = Histogram()
+        self.db_time = Histogram()
+        self.queries = Histogram(QUERY_COUNT_BUCKETS)
+        self.statuses: dict[int, int] = {}
+
+
+class RequestMetrics:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+
+    def observe(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        metrics = self.routes.get((method, route))
+        if metrics is None:
+            metrics = self.routes[(method, route)] = RouteMetrics()
+        metrics.latency.observe(seconds)
+        metrics.db_time.observe(stats.db_time)
+        metrics.queries.observe(stats.queries)
+        metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+
+    def clear(self) -> None:
+        self.routes.clear()
+
+
+request_metrics = RequestMetrics()
+
+
+class MetricsMiddleware:
+    """ASGI middleware feeding ``request_metrics``.
+
+    Latency runs until the last byte of the response is sent, so streamed
+    responses are timed in full.
+    """
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope)
+        token = current_request.set(stats)
+        status = 500  # Unless the app sends a response before failing
+
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        request_metrics.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            request_metrics.in_flight -= 1
+            current_request.reset(token)
+            # Set by the router once a route matched
+            route = scope.get("route")
+            path = getattr(route, "path", None) or UNMATCHED_ROUTE
+            request_metrics.observe(scope["method"], path, status, elapsed, stats)
+
+
+def render_metrics() -> str:
+    lines = metric_header("http_requests_in_flight", "gauge", "HTTP requests being handled.")
+    lines.append(f"http_requests_in_flight {request_metrics.in_flight}")
+
+    routes = sorted(request_metrics.routes.items())
+    lines += metric_header("http_requests_total", "counter", "HTTP requests by route and status.")
+    for (method, route), metrics in routes:
+        for status, count in sorted(metrics.statuses.items()):
+            labels = format_labels({"method": method, "route": route, "status": status})
+            lines.append(f"http_requests_total{labels} {count}")
+
+    for name, attribute, help in (
+        ("http_request_duration_seconds", "latency", "Time to handle an HTTP request."),
+        ("http_request_db_seconds", "db_time", "Time spent in database queries per HTTP request."),
+        ("http_request_db_queries", "queries", "Database queries per HTTP request."),
+    ):
+        lines += metric_header(name, "histogram", help)
+        for (method, route), metrics in routes:
+            lines += histogram_samples(name, {"method": method, "route": route}, getattr(metrics, attribute))
+
+    stats = database.pool_stats()
+    for name, key, help in (
+        ("db_pool_size", "size", "Connections in the pool."),
+        ("db_pool_idle", "idle", "Idle connections in the pool."),
+        ("db_pool_waiting", "waiting", "Callers waiting for a connection."),
+    ):
+        if key in stats:
+            lines += metric_header(name, "gauge", help)
+            lines.append(f"{name} {stats[key]}")
+    lines += metric_header("db_pool_acquire_timeouts_total", "counter", "Connection acquires that timed out.")
+    lines.append(f"db_pool_acquire_timeouts_total {stats['acquire_timeouts']}")
+    lines += metric_header("db_pool_acquire_wait_seconds", "histogram", "Time waited for a pooled connection.")
+    lines += histogram_samples("db_pool_acquire_wait_seconds", {}, database.pool_metrics.acquire_wait)
+
+    replica = stats.get("replica")
+    if replica is not None:
+        if replica["lag_seconds"] is not None:
+            lines += metric_header("db_replica_lag_seconds", "gauge", "Seconds the read replica is behind the primary.")
+            lines.append(f"db_replica_lag_seconds {replica['lag_seconds']}")
+        lines += metric_header("db_read_connections_total", "counter", "Connections handed to read-only handlers.")
+        for target in ("replica", "primary"):
+            lines.append(f"db_read_connections_total{format_labels({'target': target})} {replica[target + '_reads']}")
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_endpoint(authorization: str | None = Header(None)) -> PlainTextResponse:
+    if METRICS_TOKEN:
+        if not hmac.compare_digest(authorization or "", f"Bearer {METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    elif not METRICS_PUBLIC:
+        raise HTTPException(status_code=401, detail="Set METRICS_TOKEN to enable metrics")
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,78 @@
+"""Route manifest: the API modules ``main.py`` mounts, resolved ahead of time.
+
+Discovering APIs at boot means globbing ``app/apis`` and reading
+``routers.json`` in every worker.  ``route_manifest.json`` records the result
+once, so a starting worker only imports the modules it lists.  Regenerate it
+after adding or removing an API package or editing ``routers.json``:
+
+    python -m scripts.generate_route_manifest
+
+The test suite fails while the committed manifest is stale.  Without a
+manifest the app falls back to discovery.
+"""
+
+import json
+import os
+import pathlib
+from typing import NamedTuple
+
+BACKEND_PATH = pathlib.Path(__file__).resolve().parents[2]
+APIS_PATH = BACKEND_PATH / "app" / "apis"
+MANIFEST_PATH = pathlib.Path(os.getenv("ROUTE_MANIFEST", BACKEND_PATH / "route_manifest.json"))
+
+
+class ApiEntry(NamedTuple):
+    name: str
+    disable_auth: bool = False
+
+
+def get_router_config() -> dict | None:
+    """Return router configuration if available.
+
+    If the configuration file cannot be read, ``None`` is returned.  The rest
+    of the application should continue to function using default values.
+    """
+    try:
+        # Note: This file is not available to the agent
+        cfg = json.loads(open("routers.json").read())
+    except Exception:
+        return None
+    return cfg
+
+
+def is_auth_disabled(router_config: dict | None, name: str) -> bool:
+    """Determine whether authentication is disabled for a router.
+
+    When ``router_config`` is ``None`` (e.g. configuration file missing) or the
+    router entry does not exist, authentication remains enabled by default.
+    """
+
+    if router_config is None:
+        # Default behaviour: authentication is enabled
+        return False
+
+    try:
+        return router_config["routers"][name].get("disableAuth", False)
+    except Exception:
+        return False
+
+
+def discover_apis(router_config: dict | None) -> list[ApiEntry]:
+    """Find the API packages under ``app/apis`` and their auth setting."""
+    names = sorted(p.parent.name for p in APIS_PATH.glob("*/__init__.py"))
+    return [ApiEntry(name, is_auth_disabled(router_config, name)) for name in names]
+
+
+def load_manifest(path: pathlib.Path | None = None) -> list[ApiEntry] | None:
+    """Return the manifest entries, or ``None`` when there is no manifest."""
+    try:
+        data = json.loads((path or MANIFEST_PATH).read_text())
+    except FileNotFoundError:
+        return None
+    # Entries without the flag keep authentication enabled
+    return [ApiEntry(api["name"], api.get("disableAuth", False) is True) for api in data["apis"]]
+
+
+def render_manifest(entries: list[ApiEntry]) -> str:
+    apis = [{"name": entry.name, "disableAuth": entry.disable_auth} for entry in entries]
+    return json.dumps({"apis": apis}, indent=2) + "\n"
@@ -0,0 +1,74 @@
+"""Serialize trusted database rows straight to JSON.
+
+Usage:
+
+    from app.libs.row_response import rows_response
+
+    @router.get("/things", response_model=List[Thing])
+    async def list_things(response: Response, db = Depends(get_db_connection)):
+        rows = await db.fetch("SELECT ... FROM things")
+        return rows_response(rows, Thing, response)
+
+Building a model per row and letting FastAPI validate and serialize the list
+again through ``response_model`` costs far more CPU than the query for large
+lists.  Rows that come from our own queries already have the column types
+the models describe, so they are projected onto the model's fields and
+encoded with orjson in one pass.  ``response_model`` stays on the route and
+keeps documenting the response in the OpenAPI schema.
+"""
+
+from decimal import Decimal
+from functools import cache
+from typing import Any, Iterable, Mapping
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    # NUMERIC columns; the models declare them as float
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+_REQUIRED = object()
+
+
+@cache
+def _model_fields(model: type[BaseModel]) -> tuple[tuple[str, Any], ...]:
+    """Return ``(name, default)`` per field in declaration order; ``_REQUIRED`` marks required ones."""
+    return tuple(
+        (name, _REQUIRED if field.is_required() else field.get_default(call_default_factory=True))
+        for name, field in model.model_fields.items()
+    )
+
+
+def project_rows(rows: Iterable[Mapping[str, Any]], model: type[BaseModel]) -> list[dict]:
+    """Keep the model's fields of each row, filling in defaults for missing columns."""
+    fields = _model_fields(model)
+    return [
+        {name: row[name] if default is _REQUIRED else row.get(name, default) for name, default in fields}
+        for row in rows
+    ]
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+class RowsJSONResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def rows_response(rows: Iterable[Mapping[str, Any]], model: type[BaseModel], response: Response) -> Response:
+    """Encode ``rows`` as a JSON array of ``model``, keeping headers set on ``response``.
+
+    Only pass rows of our own queries; they are not validated.
+    """
+    encoded = RowsJSONResponse(project_rows(rows, model), status_code=response.status_code or 200)
+    encoded.raw_headers.extend(response.headers.raw)
+    return encoded
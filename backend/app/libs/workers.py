@@ -0,0 +1,85 @@
+import asyncio
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+
+class WorkerPoolSaturated(Exception):
+    """Raised when a job is submitted while every worker and queue slot is taken."""
+
+
+class BoundedWorkerPool:
+    """Run blocking callables off the event loop with admission control.
+
+    At most ``max_workers`` jobs execute at once and at most ``max_queue`` more
+    may wait for a worker.  Anything beyond that is rejected immediately with
+    :class:`WorkerPoolSaturated` so callers can shed load instead of queueing
+    without bound.
+
+    ``kind`` selects the executor: ``"thread"`` (default, suitable for
+    libraries that release the GIL such as bcrypt), ``"process"`` or
+    ``"inline"`` which runs the callable directly on the event loop and is
+    only meant for debugging and benchmarks.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, kind: str = "thread") -> None:
+        if kind not in ("thread", "process", "inline"):
+            raise ValueError(f"Unknown worker pool kind: {kind}")
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor: Executor | None = None
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+
+    def _release(self, _future: Any = None) -> None:
+        self.in_flight -= 1
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` on the pool and return its result."""
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise WorkerPoolSaturated(
+                f"Worker pool saturated ({self.in_flight}/{self.capacity} jobs)"
+            )
+
+        if self.kind == "inline":
+            return fn(*args)
+
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is only freed once the job really finished, even if the
+        # awaiting request was cancelled in the meantime.
+        future.add_done_callback(lambda f: loop.call_soon_threadsafe(self._release, f))
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def pool_from_env(prefix: str, default_workers: int, default_queue: int) -> BoundedWorkerPool:
+    """Build a pool configured by ``<prefix>_WORKERS``, ``_QUEUE`` and ``_EXECUTOR``."""
+    return BoundedWorkerPool(
+        max_workers=int(os.getenv(f"{prefix}_WORKERS", str(default_workers))),
+        max_queue=int(os.getenv(f"{prefix}_QUEUE", str(default_queue))),
+        kind=os.getenv(f"{prefix}_EXECUTOR", "thread"),
+    )
@@ -0,0 +1,84 @@
+"""Measure get_authorized_user throughput with and without the token cache.
+
+Usage (from the ``backend`` directory):
+
+    python -m benchmarks.auth_cache --requests 5000
+
+Signing keys are served from memory so the numbers only reflect RS256
+verification and payload validation, not JWKS fetching.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+from starlette.requests import Request
+
+from databutton_app.mw import auth_mw
+
+AUDIENCE = "solar-sync"
+
+
+class BenchState:
+    pass
+
+
+def make_request(app: BenchState, token: str) -> Request:
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"authorization", f"Bearer {token}".encode())],
+        "app": app,
+    }
+    return Request(scope)
+
+
+async def run(cache: auth_mw.TokenCache, request: Request, requests: int) -> float:
+    auth_mw.token_cache = cache
+    start = time.perf_counter()
+    for _ in range(requests):
+        await auth_mw.get_authorized_user(request)
+    return requests / (time.perf_counter() - start)
+
+
+async def fake_signing_key(key):
+    return key.public_key(), "RS256"
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    auth_mw.get_signing_key = lambda url, token: fake_signing_key(key)
+    token = jwt.encode(
+        {"sub": "bench-user", "aud": AUDIENCE, "exp": int(time.time()) + 3600},
+        key,
+        algorithm="RS256",
+    )
+
+    app = BenchState()
+    app.state = BenchState()
+    app.state.auth_config = auth_mw.AuthConfig(
+        jwks_url="http://jwks.invalid", audience=AUDIENCE, header="authorization"
+    )
+    request = make_request(app, token)
+
+    # Authentication logs every verified user; keep the output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        uncached = await run(auth_mw.TokenCache(max_size=0), request, args.requests)
+        cache = auth_mw.TokenCache()
+        cached = await run(cache, request, args.requests)
+
+    print(f"without cache: {uncached:,.0f} req/s")
+    print(f"   with cache: {cached:,.0f} req/s ({cached / uncached:.1f}x) {cache.stats()}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
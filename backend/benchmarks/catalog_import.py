@@ -0,0 +1,72 @@
+"""Time the bulk product import for a generated CSV.
+
+Usage (from the ``backend`` directory, with ``DATABASE_URL`` pointing at a
+database with ``migrations/013_product_sku.sql`` applied):
+
+    python -m benchmarks.catalog_import --rows 100000
+
+A scratch supplier imports the same number of rows three times: all new,
+all changed and all unchanged.  Everything runs in one transaction that is
+rolled back at the end, so no data is kept and no change notification is
+sent.  The CSV is generated while it is read, as a streamed request body is.
+"""
+
+import argparse
+import asyncio
+import resource
+import time
+from typing import AsyncIterator
+
+import asyncpg
+import dotenv
+
+dotenv.load_dotenv()
+
+from app.libs.catalog_import import import_products
+from app.libs.database import DATABASE_URL
+
+CHUNK_ROWS = 500  # Rows per body chunk, about 64 KB
+
+
+async def csv_body(rows: int, price_offset: int) -> AsyncIterator[bytes]:
+    lines = ["sku,name,description,price,brand\n"]
+    for i in range(rows):
+        lines.append(
+            f'BENCH-{i},"Painel solar {400 + i % 200}W, mono","Módulo monocristalino\n'
+            f'garantia de 12 anos",{899.90 + i % 1000 + price_offset:.2f},Acme\n'
+        )
+        if len(lines) >= CHUNK_ROWS:
+            yield "".join(lines).encode()
+            lines = []
+    yield "".join(lines).encode()
+
+
+def max_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL, command_timeout=None)
+    transaction = conn.transaction()
+    await transaction.start()
+    try:
+        supplier_id = await conn.fetchval("INSERT INTO companies (name) VALUES ('Import benchmark') RETURNING id")
+        for label, price_offset in (("new", 0), ("changed", 1), ("unchanged", 1)):
+            rss = max_rss_mb()
+            start = time.perf_counter()
+            report = await import_products(conn, supplier_id, csv_body(args.rows, price_offset))
+            elapsed = time.perf_counter() - start
+            print(f"{label:<10} {elapsed:6.2f}s  {args.rows / elapsed:>9,.0f} rows/s   "
+                  f"inserted {report.inserted}  updated {report.updated}  unchanged {report.unchanged}  "
+                  f"errors {report.error_count}   max RSS +{max_rss_mb() - rss:.1f} MB")
+    finally:
+        await transaction.rollback()
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
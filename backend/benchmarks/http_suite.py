@@ -0,0 +1,363 @@
+"""Load the hot endpoints in-process and compare the results with a baseline.
+
+Usage (from the ``backend`` directory):
+
+    python -m benchmarks.http_suite --save baseline.json
+    python -m benchmarks.http_suite --compare baseline.json --threshold 0.2
+    python -m benchmarks.http_suite --backend postgres
+
+Requests go through the real ``create_app()`` over the httpx ASGI transport,
+without sockets, from ``--concurrency`` concurrent clients.  Users are
+authenticated from the verified-token cache, as repeat requests are in
+production.  Scenarios: the
+company profile, the product list, the supplier dashboard, lead creation and
+login (bcrypt bound, so it runs ``--login-requests`` requests only).
+
+The ``fake`` backend (default) answers every query from memory after
+``--db-latency`` milliseconds, standing in for the network round-trip; it
+measures the application's own overhead and its number of round-trips.  The
+``postgres`` backend uses ``DATABASE_URL`` (migrated schema), starts the
+catalog cache listener, seeds a scratch supplier with products and two users,
+and deletes them afterwards.
+
+Throughput and p50/p95/p99 latency are printed per scenario.  ``--save``
+writes them to a JSON file; ``--compare`` reads such a file and exits with
+status 1 when any scenario's p95 grew, or its throughput dropped, by more
+than ``--threshold`` (a fraction) of the baseline.  Baselines are only
+comparable on the same machine and with the same options.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from decimal import Decimal
+from typing import NamedTuple
+
+import dotenv
+
+dotenv.load_dotenv()
+
+import httpx
+
+from app.libs import database, passwords
+from app.libs.catalog_cache import start_catalog_listener, stop_catalog_listener
+from app.libs.principals import principal_cache
+from databutton_app.mw import auth_mw
+from main import create_app
+
+PASSWORD = "bench-password"
+
+
+class Fixture(NamedTuple):
+    company_id: int
+    supplier_id: str  # User ids
+    installer_id: str
+    login_email: str
+
+
+class Scenario(NamedTuple):
+    method: str
+    path: str
+    user: str
+    body: dict | None = None
+
+
+def scenarios(fixture: Fixture) -> dict[str, Scenario]:
+    lead = {
+        "supplier_id": fixture.company_id,
+        "project_description": "Sistema residencial de 6 kWp em telhado cerâmico",
+        "contact_email": "installer@example.com",
+        "estimated_budget": 28000,
+    }
+    return {
+        "company_profile": Scenario("GET", f"/routes/companies/{fixture.company_id}", fixture.installer_id),
+        "product_list": Scenario("GET", "/routes/products/?limit=50", fixture.installer_id),
+        "dashboard_analytics": Scenario("GET", "/routes/dashboard/analytics", fixture.supplier_id),
+        "create_lead": Scenario("POST", "/routes/leads/", fixture.installer_id, lead),
+        "login": Scenario("POST", "/routes/login", fixture.installer_id, {"email": fixture.login_email, "password": PASSWORD}),
+    }
+
+
+class BenchDB:
+    """In-memory answers to the scenarios' queries, each after a simulated round-trip."""
+
+    def __init__(self, latency: float, password_hash: str) -> None:
+        self.latency = latency
+        now = datetime(2025, 6, 1, 12, 0)
+        self.company = {
+            "id": 1, "name": "Solar Acme", "description": "Distribuidora de equipamentos solares",
+            "city": "Campinas", "state": "SP", "email": "vendas@solaracme.example", "created_at": now, "updated_at": now,
+        }
+        self.products = [
+            {
+                "id": i, "name": f"Painel solar {400 + i}W", "description": "Módulo monocristalino",
+                "price": Decimal("899.90") + i, "category": "Painéis", "supplier_id": 1, "sku": f"PS-{i}",
+                "rating_count": 3, "rating_sum": 13, "rating_average": Decimal("4.33"), "rating_histogram": [0, 0, 0, 2, 1],
+                "created_at": now, "updated_at": now,
+            }
+            for i in range(1, 52)
+        ]
+        self.principals = {"bench-supplier": ("supplier", 1), "bench-installer": ("installer", None)}
+        self.login_user = {
+            "id": "bench-installer", "email": "installer@example.com", "full_name": "Bench Installer",
+            "role_id": 1, "company_id": None, "password_hash": password_hash,
+        }
+        self.lead = {
+            "id": 1, "installer_id": "bench-installer", "supplier_id": 1, "project_description": "6 kWp",
+            "contact_email": "installer@example.com", "status": "pending", "created_at": now, "updated_at": now,
+        }
+        self.analytics = {
+            "total_views": 1200, "views_past_30_days": 300,
+            "daily_views": json.dumps([{"date": f"2025-05-{d:02d}", "views": 10} for d in range(1, 31)]),
+            "total_leads": 40, "pending_leads": 5,
+            "recent_leads": json.dumps([dict(self.lead, created_at=now.isoformat(), updated_at=now.isoformat())] * 5),
+        }
+
+    async def round_trip(self) -> None:
+        await asyncio.sleep(self.latency)
+
+    async def fetchrow(self, query, *args):
+        await self.round_trip()
+        if "FROM users u" in query:
+            role, company_id = self.principals[args[0]]
+            return {"role_name": role, "company_id": company_id}
+        if "FROM users WHERE email" in query:
+            return self.login_user
+        if "FROM companies WHERE id" in query:
+            return self.company
+        if "FROM profile_view_daily" in query:
+            return self.analytics
+        if "INSERT INTO leads" in query:
+            return self.lead
+        raise NotImplementedError(query)
+
+    async def fetch(self, query, *args):
+        await self.round_trip()
+        if "FROM products WHERE supplier_id" in query:
+            return self.products[:20]
+        if "FROM products p" in query:
+            return self.products[:args[-1]]
+        raise NotImplementedError(query)
+
+    async def fetchval(self, query, *args):
+        await self.round_trip()
+        if "SELECT role_name FROM user_roles" in query:
+            return "installer"
+        raise NotImplementedError(query)
+
+    async def execute(self, query, *args):
+        await self.round_trip()
+        if "INSERT INTO email_outbox" not in query:
+            raise NotImplementedError(query)
+
+    @asynccontextmanager
+    async def transaction(self):
+        await self.round_trip()
+        yield
+        await self.round_trip()
+
+
+SEED_QUERIES = {
+    "company": """
+        INSERT INTO companies (name, description, city, state, email)
+        VALUES ('HTTP benchmark supplier', 'Scratch data of benchmarks.http_suite', 'Campinas', 'SP', 'bench@example.com')
+        RETURNING id
+    """,
+    "products": """
+        INSERT INTO products (name, description, price, category, brand, supplier_id)
+        SELECT 'Painel solar ' || (400 + i) || 'W', 'Módulo monocristalino', 899.90 + i, 'Painéis', 'Acme', $1
+        FROM generate_series(1, 50) i
+    """,
+    "user": """
+        INSERT INTO users (email, full_name, role_id, company_id, password_hash)
+        VALUES ($1, $2, (SELECT id FROM user_roles WHERE role_name = $3), $4, $5)
+        RETURNING id::text
+    """,
+}
+
+CLEANUP_QUERIES = [
+    "DELETE FROM leads WHERE supplier_id = $1",
+    "DELETE FROM profile_view_daily WHERE company_id = $1",
+    "DELETE FROM users WHERE company_id = $1 OR email = 'bench-installer@example.com'",
+    "DELETE FROM products WHERE supplier_id = $1",
+    "DELETE FROM companies WHERE id = $1",
+]
+
+
+async def seed_postgres() -> Fixture:
+    password_hash = passwords.hash_password(PASSWORD)
+    async with database.connection() as conn:
+        async with conn.transaction():
+            company_id = await conn.fetchval(SEED_QUERIES["company"])
+            await conn.execute(SEED_QUERIES["products"], company_id)
+            supplier_id = await conn.fetchval(
+                SEED_QUERIES["user"], "bench-supplier@example.com", "Bench Supplier", "supplier", company_id, password_hash
+            )
+            installer_id = await conn.fetchval(
+                SEED_QUERIES["user"], "bench-installer@example.com", "Bench Installer", "installer", None, password_hash
+            )
+    return Fixture(company_id, supplier_id, installer_id, "bench-installer@example.com")
+
+
+async def cleanup_postgres(fixture: Fixture) -> None:
+    async with database.connection() as conn:
+        async with conn.transaction():
+            for query in CLEANUP_QUERIES:
+                await conn.execute(query, fixture.company_id)
+
+
+class BenchPool:
+    """Hands out the fake connection, so requests take the real ``get_db_connection`` path."""
+
+    def __init__(self, conn: BenchDB) -> None:
+        self.conn = conn
+
+    async def acquire(self, timeout: float | None = None) -> BenchDB:
+        return self.conn
+
+    async def release(self, conn: BenchDB) -> None:
+        pass
+
+    def get_size(self) -> int:
+        return 1
+
+    get_idle_size = get_min_size = get_max_size = get_size
+
+
+AUTH_CONFIG = auth_mw.AuthConfig(jwks_url="https://bench.invalid/jwks", audience="bench", header="authorization")
+
+
+def bench_token(user_id: str) -> str:
+    """Bearer token of ``user_id``, stored in the verified-token cache as a signed-in user's would be."""
+    token = f"bench-token-{user_id}"
+    key = auth_mw.TokenCache.key(token, AUTH_CONFIG.audience)
+    auth_mw.token_cache.put(key, auth_mw.User(sub=user_id), time.time() + 3600)
+    return token
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    remaining = requests
+    headers = {"Authorization": f"Bearer {bench_token(scenario.user)}"}
+
+    async def worker() -> None:
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            response = await client.request(scenario.method, scenario.path, json=scenario.body, headers=headers)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": requests / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+async def run_suite(args: argparse.Namespace) -> dict[str, dict]:
+    # No dependency overrides: FastAPI analyzes those again on every request
+    app = create_app()
+    app.state.auth_config = AUTH_CONFIG
+    principal_cache.clear()
+
+    if args.backend == "fake":
+        database.pool = BenchPool(BenchDB(args.db_latency / 1000, passwords.hash_password(PASSWORD)))
+        fixture = Fixture(1, "bench-supplier", "bench-installer", "installer@example.com")
+    else:
+        await database.init_db_pool()
+        await start_catalog_listener()
+        fixture = await seed_postgres()
+
+    results = {}
+    try:
+        async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+            for name, scenario in scenarios(fixture).items():
+                if args.scenarios and name not in args.scenarios:
+                    continue
+                requests = args.login_requests if name == "login" else args.requests
+                # Warm up caches and statement preparation
+                await run_scenario(client, scenario, min(requests, args.concurrency), args.concurrency)
+                results[name] = await run_scenario(client, scenario, requests, args.concurrency)
+                result = results[name]
+                print(
+                    f"{name:<20} {result['rps']:>8,.0f} req/s   p50 {result['p50']:7.2f}ms   "
+                    f"p95 {result['p95']:7.2f}ms   p99 {result['p99']:7.2f}ms   errors {result['errors']}"
+                )
+    finally:
+        if args.backend == "postgres":
+            await cleanup_postgres(fixture)
+            await stop_catalog_listener()
+            await database.close_db_pool()
+        passwords.shutdown_password_pool()
+    return results
+
+
+def regressions(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    found = []
+    for name, result in results.items():
+        if result["errors"]:
+            found.append(f"{name}: {result['errors']} of {result['requests']} requests failed")
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result["p95"] > before["p95"] * (1 + threshold):
+            found.append(f"{name}: p95 {before['p95']:.2f}ms -> {result['p95']:.2f}ms")
+        if result["rps"] < before["rps"] * (1 - threshold):
+            found.append(f"{name}: throughput {before['rps']:,.0f} -> {result['rps']:,.0f} req/s")
+    return found
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backend", choices=["fake", "postgres"], default="fake")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per scenario")
+    parser.add_argument("--login-requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--db-latency", type=float, default=1.0, help="fake backend round-trip, in ms")
+    parser.add_argument("--scenarios", nargs="+", help="run only these scenarios")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare the results with")
+    parser.add_argument("--threshold", type=float, default=0.2, help="tolerated regression, as a fraction")
+    args = parser.parse_args()
+
+    results = await run_suite(args)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"options": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+                       "results": results}, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        found = regressions(results, baseline, args.threshold)
+        for line in found:
+            print(f"REGRESSION {line}")
+        if found:
+            return 1
+        print(f"No regression beyond {args.threshold:.0%} of {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,120 @@
+"""Measure latency of an unrelated endpoint while a login storm is running.
+
+Usage (from the ``backend`` directory):
+
+    python -m benchmarks.login_storm --logins 200 --probes 200
+
+The benchmark runs twice: once with bcrypt executed inline on the event loop
+(the old behaviour) and once on the bounded password pool, and prints the
+p50/p95/p99 latency of ``GET /routes/products/{id}`` for each run.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+from app.libs import database, passwords
+from app.libs.workers import BoundedWorkerPool
+from databutton_app.mw import auth_mw
+from main import create_app
+
+
+class StormDB:
+    """Just enough of a connection for login and product lookups."""
+
+    def __init__(self, password_hash: str):
+        self.user = {
+            "id": "storm-user",
+            "email": "storm@example.com",
+            "full_name": "Storm User",
+            "role_id": 1,
+            "company_id": None,
+            "password_hash": password_hash,
+        }
+        self.product = {"id": 1, "name": "Panel", "supplier_id": 1}
+
+    async def fetchrow(self, query, *args):
+        if "FROM users WHERE email" in query:
+            return self.user
+        if "FROM products WHERE id" in query:
+            return self.product
+        raise NotImplementedError(query)
+
+    async def fetchval(self, query, *args):
+        if "SELECT role_name FROM user_roles" in query:
+            return "installer"
+        raise NotImplementedError(query)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def run_storm(pool: BoundedWorkerPool, logins: int, probes: int) -> dict:
+    passwords.password_pool = pool
+    db = StormDB(passwords.hash_password("secret"))
+
+    async def override_get_db_connection():
+        yield db
+
+    app = create_app()
+    app.dependency_overrides[database.get_db_connection] = override_get_db_connection
+    app.dependency_overrides[auth_mw.get_authorized_user] = lambda: auth_mw.User(sub="bench")
+
+    latencies: list[float] = []
+    statuses: dict[int, int] = {}
+
+    async with httpx.AsyncClient(app=app, base_url="http://bench") as client:
+
+        async def login() -> None:
+            resp = await client.post(
+                "/routes/login",
+                json={"email": "storm@example.com", "password": "secret"},
+            )
+            statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+
+        async def probe() -> None:
+            for _ in range(probes):
+                start = time.perf_counter()
+                await client.get("/routes/products/1")
+                latencies.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0)
+
+        await asyncio.gather(probe(), *(login() for _ in range(logins)))
+
+    pool.shutdown()
+    return {
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+        "login_statuses": statuses,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--probes", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=passwords.password_pool.max_workers)
+    parser.add_argument("--queue", type=int, default=passwords.password_pool.max_queue)
+    args = parser.parse_args()
+
+    runs = {
+        "inline (before)": BoundedWorkerPool(args.workers, args.logins, kind="inline"),
+        "pool (after)": BoundedWorkerPool(args.workers, args.queue, kind="thread"),
+    }
+    for label, pool in runs.items():
+        result = await run_storm(pool, args.logins, args.probes)
+        print(
+            f"{label:>16}: p50={result['p50']:.1f}ms p95={result['p95']:.1f}ms "
+            f"p99={result['p99']:.1f}ms logins={result['login_statuses']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
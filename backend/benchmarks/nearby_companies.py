@@ -0,0 +1,149 @@
+"""Time the nearby company search as the number of companies grows.
+
+Usage (from the ``backend`` directory, with ``DATABASE_URL`` pointing at a
+scratch database):
+
+    python -m benchmarks.nearby_companies --sizes 10000,100000,300000
+
+Companies are generated in a separate ``nearby_bench`` schema with
+``migrations/014_company_location.sql`` applied, which is dropped afterwards
+unless ``--keep`` is given.  Most are clustered around large Brazilian cities
+and the rest spread over the country, so searches from a city center see the
+densest data.  After loading each size, the first page and a deep page
+(``--deep-page``, 20 by default) of ``GET /routes/companies/nearby`` are
+timed from city centers and from the countryside, both ranking every company
+in the radius and with the KNN scan the endpoint uses.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from pathlib import Path
+
+import asyncpg
+import dotenv
+
+dotenv.load_dotenv()
+
+from app.apis.companies import DEFAULT_RADIUS_KM, fetch_nearby_companies, nearby_companies_query
+from app.libs.database import DATABASE_URL
+from app.libs.pagination import PageParams, encode_cursor
+
+SCHEMA = "nearby_bench"
+MIGRATION = Path(__file__).resolve().parent.parent / "migrations" / "014_company_location.sql"
+
+# (name, latitude, longitude)
+CITIES = [
+    ("São Paulo", -23.55, -46.63), ("Rio de Janeiro", -22.91, -43.17), ("Belo Horizonte", -19.92, -43.94),
+    ("Brasília", -15.79, -47.88), ("Salvador", -12.97, -38.50), ("Fortaleza", -3.73, -38.52),
+    ("Curitiba", -25.43, -49.27), ("Recife", -8.05, -34.88), ("Porto Alegre", -30.03, -51.23),
+    ("Goiânia", -16.68, -49.25),
+]
+COUNTRYSIDE = [("Mato Grosso", -12.6, -55.7), ("Piauí interior", -7.7, -42.5), ("Oeste paulista", -21.7, -51.1)]
+
+SCHEMA_SQL = """
+    CREATE TABLE companies (
+        id SERIAL PRIMARY KEY, name VARCHAR(255) NOT NULL, description TEXT, address TEXT,
+        city TEXT, state TEXT, phone TEXT, email TEXT, website TEXT,
+        created_at TIMESTAMP DEFAULT NOW(), updated_at TIMESTAMP DEFAULT NOW()
+    );
+"""
+
+# 70% within roughly 30 km of a city center, 30% anywhere in Brazil's bounding box
+LOAD_COMPANIES = """
+    INSERT INTO companies (name, city, latitude, longitude)
+    SELECT 'Solar ' || i, city,
+           CASE WHEN clustered THEN ($3::float8[])[c] + spread_lat ELSE -33 + random() * 38 END,
+           CASE WHEN clustered THEN ($4::float8[])[c] + spread_lng ELSE -73 + random() * 38 END
+    FROM (
+        SELECT i, ($2::text[])[c] AS city, c, random() < 0.7 AS clustered,
+               (random() + random() + random() - 1.5) * 0.5 AS spread_lat,
+               (random() + random() + random() - 1.5) * 0.5 AS spread_lng
+        FROM (SELECT i, 1 + (i % array_length($2::text[], 1)) AS c FROM generate_series($1 + 1, $5) AS i) ids
+    ) generated
+"""
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def timed(search, repeat: int) -> tuple[list[float], int]:
+    rows = await search()  # warm the cache
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await search()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples, len(rows)
+
+
+def report(label: str, samples: list[float], rows: int) -> None:
+    print(f"  {label:<40} {rows:>3} rows   p50 {statistics.median(samples):7.2f} ms"
+          f"   p95 {percentile(samples, 95):7.2f} ms")
+
+
+async def page_cursor(conn, lat: float, lng: float, radius_km: float, limit: int, number: int) -> str | None:
+    """Cursor of page ``number`` (1-based), or ``None`` when there are fewer pages."""
+    cursor = None
+    for _ in range(number - 1):
+        rows = await fetch_nearby_companies(conn, lat, lng, radius_km, PageParams(cursor, limit))
+        if len(rows) <= limit:
+            return None
+        cursor = encode_cursor(rows[limit - 1]["distance_km"], rows[limit - 1]["id"])
+    return cursor
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,100000,300000", help="comma separated company counts")
+    parser.add_argument("--radius-km", type=float, default=DEFAULT_RADIUS_KM)
+    parser.add_argument("--limit", type=int, default=20, help="page size")
+    parser.add_argument("--deep-page", type=int, default=20, help="page number timed besides the first")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs per query")
+    parser.add_argument("--keep", action="store_true", help=f"keep the {SCHEMA} schema")
+    args = parser.parse_args()
+    sizes = sorted(int(size) for size in args.sizes.split(","))
+
+    conn = await asyncpg.connect(DATABASE_URL, command_timeout=None)
+    try:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+        await conn.execute(f"SET search_path = {SCHEMA}, public")
+        await conn.execute(SCHEMA_SQL)
+        await conn.execute(MIGRATION.read_text())
+        await conn.execute("SELECT setseed(0.42)")
+
+        loaded = 0
+        for size in sizes:
+            start = time.perf_counter()
+            await conn.execute(
+                LOAD_COMPANIES, loaded,
+                [city[0] for city in CITIES], [city[1] for city in CITIES], [city[2] for city in CITIES], size,
+            )
+            await conn.execute("ANALYZE companies")
+            loaded = size
+            print(f"{size} companies (loaded in {time.perf_counter() - start:.1f} s), "
+                  f"{args.radius_km:g} km radius, first {args.limit}:")
+
+            for name, lat, lng in CITIES[:3] + COUNTRYSIDE:
+                for number in (1, args.deep_page):
+                    cursor = await page_cursor(conn, lat, lng, args.radius_km, args.limit, number)
+                    if number > 1 and cursor is None:
+                        continue
+                    page = PageParams(cursor, args.limit)
+                    query, params = nearby_companies_query(lat, lng, args.radius_km, page, None)
+                    report(f"{name} page {number} (whole radius)",
+                           *await timed(lambda: conn.fetch(query, *params), args.repeat))
+                    report(f"{name} page {number} (KNN)", *await timed(
+                        lambda: fetch_nearby_companies(conn, lat, lng, args.radius_km, page), args.repeat))
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
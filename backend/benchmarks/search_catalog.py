@@ -0,0 +1,158 @@
+"""Compare catalog search before and after the search indexes on a synthetic catalog.
+
+Usage (from the ``backend`` directory, with ``DATABASE_URL`` pointing at a
+scratch database; the pg_trgm and unaccent extensions must be available):
+
+    python -m benchmarks.search_catalog --products 1000000
+
+The catalog is generated in a separate ``search_bench`` schema, which is
+dropped afterwards unless ``--keep`` is given.  The ILIKE filters used by the
+list endpoints are timed on the bare tables, then
+``migrations/009_search_indexes.sql`` is applied and the same filters and the
+ranked ``/search`` queries are timed again.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from pathlib import Path
+
+import asyncpg
+import dotenv
+
+dotenv.load_dotenv()
+
+from app.apis.search import (
+    COMPANY_HEADLINE_OPTIONS,
+    PRODUCT_HEADLINE_OPTIONS,
+    SEARCH_COMPANIES_QUERY,
+    SEARCH_PRODUCTS_QUERY,
+)
+from app.libs.database import DATABASE_URL
+
+SCHEMA = "search_bench"
+MIGRATION = Path(__file__).resolve().parent.parent / "migrations" / "009_search_indexes.sql"
+
+BRANDS = ["Canadian", "Jinko", "Trina", "Growatt", "Fronius", "Deye", "WEG", "BYD", "Longi", "Sungrow"]
+KINDS = ["Painel solar", "Inversor", "Microinversor", "Bateria", "Estrutura", "Cabo solar", "String box", "Controlador"]
+WORDS = [
+    "monocristalino", "policristalino", "eficiência", "telhado", "garantia", "híbrido",
+    "trifásico", "monofásico", "lítio", "alumínio", "conector", "proteção", "residencial",
+    "comercial", "fotovoltaico", "bifacial", "potência", "módulo", "instalação", "solo",
+]
+CITIES = ["São Paulo", "Campinas", "Belo Horizonte", "Recife", "Curitiba", "Fortaleza", "Goiânia", "Brasília"]
+
+SCHEMA_SQL = """
+    CREATE TABLE companies (
+        id SERIAL PRIMARY KEY, name VARCHAR(255) NOT NULL, city TEXT, state TEXT
+    );
+    CREATE TABLE products (
+        id SERIAL PRIMARY KEY, name TEXT NOT NULL, description TEXT, price NUMERIC(12, 2),
+        category TEXT, brand TEXT, supplier_id INT NOT NULL REFERENCES companies(id)
+    );
+"""
+
+LOAD_COMPANIES = """
+    INSERT INTO companies (name, city, state)
+    SELECT 'Solar ' || ($2::text[])[1 + i % array_length($2, 1)] || ' ' || i,
+           ($3::text[])[1 + i % array_length($3, 1)], 'SP'
+    FROM generate_series(1, $1) AS i
+"""
+
+LOAD_PRODUCTS = """
+    INSERT INTO products (name, description, price, brand, supplier_id)
+    SELECT ($2::text[])[1 + i % array_length($2, 1)] || ' ' || (100 + i % 900) || 'W MX' || (i % 50000),
+           (SELECT string_agg(($3::text[])[1 + ((i::bigint * 7919 + w * 104729) % 1000003) % array_length($3, 1)], ' ')
+            FROM generate_series(1, 8) AS w),
+           10 + i % 5000,
+           ($4::text[])[1 + (i / 7) % array_length($4, 1)],
+           1 + i % $5
+    FROM generate_series(1, $1) AS i
+"""
+
+# Selective patterns: a sequential scan cannot stop early at the LIMIT
+ILIKE_QUERIES = {
+    "product name ILIKE": ("SELECT id FROM products WHERE name ILIKE $1 ORDER BY id LIMIT 50", "%mx4242%"),
+    "product brand ILIKE": ("SELECT id FROM products WHERE brand ILIKE $1 ORDER BY id LIMIT 50", "%sungrou%"),
+    "company city ILIKE": (
+        "SELECT id FROM companies WHERE city ILIKE $1 ORDER BY name, id LIMIT 50", "%goiania%"
+    ),
+}
+
+# Broad terms match a large share of the catalog; model codes are selective
+SEARCH_TERMS = ["inversor híbrido", "painel bifacial", "bateria litio", "growat", "mx4242", "inversor mx777"]
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+async def timed(conn: asyncpg.Connection, query: str, *args, repeat: int) -> list[float]:
+    await conn.fetch(query, *args)  # warm the cache
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await conn.fetch(query, *args)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(label: str, samples: list[float]) -> None:
+    print(f"  {label:<40} p50 {statistics.median(samples):8.2f} ms   p95 {percentile(samples, 95):8.2f} ms")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=1_000_000)
+    parser.add_argument("--companies", type=int, default=5_000)
+    parser.add_argument("--repeat", type=int, default=10, help="timed runs per query")
+    parser.add_argument("--migration", type=Path, default=MIGRATION)
+    parser.add_argument("--keep", action="store_true", help=f"keep the {SCHEMA} schema")
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL, command_timeout=None)
+    try:
+        await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE; CREATE SCHEMA {SCHEMA}")
+        await conn.execute(f"SET search_path = {SCHEMA}, public")
+        await conn.execute(SCHEMA_SQL)
+
+        start = time.perf_counter()
+        await conn.execute(LOAD_COMPANIES, args.companies, BRANDS, CITIES)
+        await conn.execute(LOAD_PRODUCTS, args.products, KINDS, WORDS, BRANDS, args.companies)
+        await conn.execute("ANALYZE")
+        print(f"Loaded {args.products} products and {args.companies} companies "
+              f"in {time.perf_counter() - start:.1f} s")
+
+        print("Without search indexes:")
+        for label, (query, value) in ILIKE_QUERIES.items():
+            report(label, await timed(conn, query, value, repeat=args.repeat))
+
+        start = time.perf_counter()
+        await conn.execute(args.migration.read_text())
+        await conn.execute("ANALYZE")
+        print(f"Applied {args.migration.name} in {time.perf_counter() - start:.1f} s")
+
+        print("With search indexes:")
+        for label, (query, value) in ILIKE_QUERIES.items():
+            report(label, await timed(conn, query, value, repeat=args.repeat))
+        for term in SEARCH_TERMS:
+            report(f"/search products {term!r}", await timed(
+                conn, SEARCH_PRODUCTS_QUERY, term, 20, PRODUCT_HEADLINE_OPTIONS, repeat=args.repeat))
+        report("/search companies 'campinas'", await timed(
+            conn, SEARCH_COMPANIES_QUERY, "campinas", 20, COMPANY_HEADLINE_OPTIONS, repeat=args.repeat))
+
+        plan = await conn.fetch("EXPLAIN " + SEARCH_PRODUCTS_QUERY, SEARCH_TERMS[0], 20, PRODUCT_HEADLINE_OPTIONS)
+        print("Plan of the product search:")
+        for row in plan:
+            print("  " + row[0])
+    finally:
+        if not args.keep:
+            await conn.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
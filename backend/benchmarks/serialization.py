@@ -0,0 +1,91 @@
+"""Measure rows serialized per second for the products and leads lists.
+
+Usage (from the ``backend`` directory):
+
+    python -m benchmarks.serialization --rows 100 10000
+
+For each list two paths are timed: building a Pydantic model per row and
+letting FastAPI validate and serialize them through ``response_model`` (the
+old handlers), and ``rows_response`` encoding the rows directly with orjson.
+Rows are plain dicts shaped like the asyncpg records of the handlers.
+"""
+
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, List
+
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.apis.leads import LeadWithSupplierInfo
+from app.libs.models import Product
+from app.libs.row_response import rows_response
+
+
+def product_rows(count: int) -> list[dict]:
+    now = datetime(2025, 6, 1, 12, 0)
+    return [
+        {
+            "id": i, "name": f"Painel solar {400 + i % 200}W", "description": "Módulo monocristalino " * 4,
+            "price": Decimal("899.90") + i, "category": "Painéis", "supplier_id": 1 + i % 50,
+            "created_at": now - timedelta(minutes=i), "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+def lead_rows(count: int) -> list[dict]:
+    now = datetime(2025, 6, 1, 12, 0)
+    return [
+        {
+            "id": i, "installer_id": f"user-{i % 1000}", "supplier_id": 1 + i % 50, "supplier_name": "Solar Acme",
+            "project_description": "Instalação residencial de 5 kWp no telhado", "project_type": "residential",
+            "estimated_budget": Decimal("25000.00"), "location": "Campinas, SP", "contact_email": "a@example.com",
+            "contact_phone": "+55 19 99999-0000", "preferred_contact_method": "email", "timeline": "3 months",
+            "status": "pending", "notes": None, "created_at": now - timedelta(minutes=i), "updated_at": now,
+        }
+        for i in range(count)
+    ]
+
+
+async def pydantic_body(rows: list[dict], model) -> bytes:
+    field = create_response_field(name="Response", type_=List[model])
+    content = await serialize_response(field=field, response_content=[model(**dict(r)) for r in rows])
+    return JSONResponse(content).body
+
+
+async def rows_body(rows: list[dict], model) -> bytes:
+    return rows_response(rows, model, Response()).body
+
+
+async def rows_per_second(encode: Callable, rows: list[dict], model, min_seconds: float = 1.0) -> float:
+    await encode(rows, model)
+    done = 0
+    start = time.perf_counter()
+    while (elapsed := time.perf_counter() - start) < min_seconds:
+        await encode(rows, model)
+        done += len(rows)
+    return done / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100, 10_000], help="rows per response")
+    args = parser.parse_args()
+
+    for name, make_rows, model in (("products", product_rows, Product), ("leads", lead_rows, LeadWithSupplierInfo)):
+        for count in args.rows:
+            rows = make_rows(count)
+            before = await rows_per_second(pydantic_body, rows, model)
+            after = await rows_per_second(rows_body, rows, model)
+            print(f"{name:<8} {count:>6} rows/response   pydantic {before:>10,.0f} rows/s   "
+                  f"rows_response {after:>10,.0f} rows/s   x{after / before:.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
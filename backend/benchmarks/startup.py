@@ -0,0 +1,85 @@
+"""Measure worker cold start and the import time of each API module.
+
+Usage (from the ``backend`` directory):
+
+    python -m benchmarks.startup --runs 5
+
+Every measurement runs in a fresh interpreter.  For each API module the
+report shows its cumulative import time while ``main`` boots (modules
+imported first pay for dependencies they share with later ones) and when
+imported alone on top of FastAPI.  It also lists slow optional dependencies
+that were imported at boot although they should load on first use, and
+compares the time to ``import main`` with the route manifest against
+discovering APIs without it.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from app.libs.route_manifest import BACKEND_PATH, discover_apis
+
+# Only needed once somebody logs in, sends email or fetches signing keys
+LAZY_DEPENDENCIES = ("passlib", "aiosmtplib", "httpx")
+
+
+def run_python(code: str, *flags: str, env: dict | None = None) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=BACKEND_PATH,
+        env={**os.environ, **(env or {})},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_times(code: str) -> dict[str, int]:
+    """Cumulative import time in microseconds of each module imported by ``code``."""
+    times = {}
+    for line in run_python(code, "-X", "importtime").stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def cold_start(runs: int, env: dict | None = None) -> float:
+    """Median wall time in seconds of a fresh ``import main``."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        run_python("import main", env=env)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5, help="cold starts per configuration")
+    args = parser.parse_args()
+
+    boot = import_times("import main")
+    print(f"{'API module':<14}{'at boot ms':>12}{'alone ms':>10}")
+    for api in discover_apis(None):
+        module = f"app.apis.{api.name}"
+        alone = import_times(f"import fastapi; import {module}")[module]
+        print(f"{api.name:<14}{boot.get(module, 0) / 1000:>12.1f}{alone / 1000:>10.1f}")
+    print(f"{'main (total)':<14}{boot['main'] / 1000:>12.1f}")
+
+    eager = [name for name in LAZY_DEPENDENCIES if name in boot]
+    print(f"\nImported at boot but needed later: {', '.join(eager) if eager else 'none'}")
+
+    with_manifest = cold_start(args.runs)
+    without_manifest = cold_start(args.runs, {"ROUTE_MANIFEST": os.devnull + ".missing"})
+    print(f"\nimport main, median of {args.runs}:")
+    print(f"  route manifest   {with_manifest * 1000:8.1f} ms")
+    print(f"  discovery        {without_manifest * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
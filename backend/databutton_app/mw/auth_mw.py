@@ -1,13 +1,20 @@
+import asyncio
 import functools
+import hashlib
+import os
+import time
+from collections import OrderedDict
 from http import HTTPStatus
-from typing import Annotated, Callable
+from typing import TYPE_CHECKING, Annotated, Callable
 import jwt
 from fastapi import Depends, HTTPException, WebSocket, WebSocketException, status
 from fastapi.requests import HTTPConnection
-from jwt import PyJWKClient
 from pydantic import BaseModel
 from starlette.requests import Request
 
+if TYPE_CHECKING:
+    import httpx
+
 
 class AuthConfig(BaseModel):
     jwks_url: str
@@ -26,6 +33,57 @@ class User(BaseModel):
     email: str | None = None
 
 
+class TokenCache:
+    """Bounded LRU of validated users keyed by a digest of the token.
+
+    Entries live until the token's ``exp`` claim minus ``skew`` seconds, so a
+    token presented many times during its lifetime is only verified once.
+    """
+
+    def __init__(self, max_size: int = 10_000, skew: float = 30.0) -> None:
+        self.max_size = max_size
+        self.skew = skew
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[bytes, tuple[User, float]] = OrderedDict()
+
+    @staticmethod
+    def key(token: str, audience: str) -> bytes:
+        return hashlib.sha256(f"{audience}:{token}".encode()).digest()
+
+    def get(self, key: bytes) -> User | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.time():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: bytes, user: User, exp: float) -> None:
+        expires_at = exp - self.skew
+        if self.max_size <= 0 or expires_at <= time.time():
+            return
+        self._entries[key] = (user, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+token_cache = TokenCache(
+    max_size=int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000")),
+    skew=float(os.getenv("AUTH_TOKEN_CACHE_SKEW", "30")),
+)
+
+
 def get_auth_config(request: HTTPConnection) -> AuthConfig:
     auth_config: AuthConfig | None = request.app.state.auth_config
 
@@ -46,16 +104,16 @@ def get_audit_log(request: HTTPConnection) -> Callable[[str], None] | None:
 AuditLogDep = Annotated[Callable[[str], None] | None, Depends(get_audit_log)]
 
 
-def get_authorized_user(
+async def get_authorized_user(
     request: HTTPConnection,
 ) -> User:
     auth_config = get_auth_config(request)
 
     try:
         if isinstance(request, WebSocket):
-            user = authorize_websocket(request, auth_config)
+            user = await authorize_websocket(request, auth_config)
         elif isinstance(request, Request):
-            user = authorize_request(request, auth_config)
+            user = await authorize_request(request, auth_config)
         else:
             raise ValueError("Unexpected request type")
 
@@ -75,15 +133,130 @@ def get_authorized_user(
         )
 
 
+class JWKSKeyStore:
+    """Signing keys for one JWKS url, fetched without blocking the event loop.
+
+    Keys are prefetched on startup (``start``) and refreshed by a background
+    task before the document's ``Cache-Control: max-age`` runs out.  A token
+    with an unknown key id triggers at most one refresh per
+    ``min_refresh_interval``, shared by all concurrent requests.  If a refresh
+    fails the last-known keys keep being served.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        refresh_interval: float = 3600.0,
+        min_refresh_interval: float = 30.0,
+        timeout: float = 5.0,
+    ) -> None:
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.refreshes = 0
+        self.refresh_failures = 0
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._last_attempt: float | None = None
+        self._next_refresh = 0.0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def _ttl(self, response: "httpx.Response") -> float:
+        for directive in response.headers.get("cache-control", "").split(","):
+            name, _, value = directive.strip().partition("=")
+            if name == "max-age" and value.isdigit():
+                # Refresh well before the published keys go stale, but no
+                # more often than min_refresh_interval (max-age=0 would spin)
+                ttl = min(self.refresh_interval, int(value) * 0.8)
+                return max(ttl, self.min_refresh_interval)
+        return self.refresh_interval
+
+    async def _refresh(self) -> bool:
+        # httpx is only needed for the key fetch; importing it lazily keeps it
+        # out of worker startup
+        import httpx
+
+        self._last_attempt = time.monotonic()
+        try:
+            async with httpx.AsyncClient(timeout=self.timeout) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+            jwk_set = jwt.PyJWKSet.from_dict(response.json())
+        except Exception as e:
+            self.refresh_failures += 1
+            self._next_refresh = time.monotonic() + self.min_refresh_interval
+            print(f"Failed to refresh JWKS from {self.url}, keeping last-known keys: {e}")
+            return False
+
+        self._keys = {key.key_id: key for key in jwk_set.keys if key.key_id}
+        self._next_refresh = time.monotonic() + self._ttl(response)
+        self.refreshes += 1
+        return True
+
+    async def refresh(self) -> bool:
+        async with self._lock:
+            return await self._refresh()
+
+    async def get_signing_key(self, kid: str | None) -> jwt.PyJWK:
+        key = self._keys.get(kid)
+        if key is None:
+            async with self._lock:
+                key = self._keys.get(kid)
+                recently_refreshed = (
+                    self._last_attempt is not None
+                    and time.monotonic() - self._last_attempt < self.min_refresh_interval
+                )
+                if key is None and not recently_refreshed:
+                    await self._refresh()
+                    key = self._keys.get(kid)
+        if key is None:
+            raise jwt.PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+        return key
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(max(self._next_refresh - time.monotonic(), 0))
+            await self.refresh()
+
+    async def start(self) -> None:
+        """Fetch the keys now and keep them fresh in the background."""
+        await self.refresh()
+        if self._task is None:
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+
 @functools.cache
-def get_jwks_client(url: str):
-    """Reuse client cached by its url, client caches keys by default."""
-    return PyJWKClient(url, cache_keys=True)
+def get_jwks_store(url: str) -> JWKSKeyStore:
+    """Reuse one key store per JWKS url."""
+    return JWKSKeyStore(
+        url, refresh_interval=float(os.getenv("AUTH_JWKS_REFRESH_INTERVAL", "3600"))
+    )
+
 
+async def start_jwks_store(auth_config: AuthConfig | None) -> None:
+    if auth_config is not None:
+        await get_jwks_store(auth_config.jwks_url).start()
 
-def get_signing_key(url: str, token: str) -> tuple[str, str]:
-    client = get_jwks_client(url)
-    signing_key = client.get_signing_key_from_jwt(token)
+
+async def stop_jwks_store(auth_config: AuthConfig | None) -> None:
+    if auth_config is not None:
+        await get_jwks_store(auth_config.jwks_url).stop()
+
+
+async def get_signing_key(url: str, token: str) -> tuple[str, str]:
+    store = get_jwks_store(url)
+    kid = jwt.get_unverified_header(token).get("kid")
+    signing_key = await store.get_signing_key(kid)
     key = signing_key.key
     alg = signing_key.algorithm_name
     if alg != "RS256":
@@ -91,7 +264,7 @@ def get_signing_key(url: str, token: str) -> tuple[str, str]:
     return (key, alg)
 
 
-def authorize_websocket(
+async def authorize_websocket(
     request: WebSocket,
     auth_config: AuthConfig,
 ) -> User | None:
@@ -114,10 +287,10 @@ def authorize_websocket(
         print(f"Missing bearer {prefix}.<token> in protocols")
         return None
 
-    return authorize_token(token, auth_config)
+    return await authorize_token(token, auth_config)
 
 
-def authorize_request(
+async def authorize_request(
     request: Request,
     auth_config: AuthConfig,
 ) -> User | None:
@@ -131,20 +304,25 @@ def authorize_request(
         print(f"Missing bearer token in '{auth_config.header}'")
         return None
 
-    return authorize_token(token, auth_config)
+    return await authorize_token(token, auth_config)
 
 
-def authorize_token(
+async def authorize_token(
     token: str,
     auth_config: AuthConfig,
 ) -> User | None:
+    cache_key = TokenCache.key(token, auth_config.audience)
+    cached_user = token_cache.get(cache_key)
+    if cached_user is not None:
+        return cached_user
+
     # Audience and jwks url to get signing key from based on the users config
     jwks_urls = [(auth_config.audience, auth_config.jwks_url)]
 
     payload = None
     for audience, jwks_url in jwks_urls:
         try:
-            key, alg = get_signing_key(jwks_url, token)
+            key, alg = await get_signing_key(jwks_url, token)
         except Exception as e:
             print(f"Failed to get signing key {e}")
             continue
@@ -163,7 +341,11 @@ def authorize_token(
     try:
         user = User.model_validate(payload)
         print(f"User {user.sub} authenticated")
-        return user
     except Exception as e:
         print(f"Failed to parse token payload {e}")
         return None
+
+    # jwt.decode has already rejected expired tokens, so exp is in the future
+    if "exp" in payload:
+        token_cache.put(cache_key, user, payload["exp"])
+    return user
@@ -1,84 +1,60 @@
 import os
-import pathlib
 import json
 import dotenv
 from fastapi import FastAPI, APIRouter, Depends
 
 dotenv.load_dotenv()
 
-from databutton_app.mw.auth_mw import AuthConfig, get_authorized_user
-from app.libs.database import init_db_pool, close_db_pool
+from databutton_app.mw.auth_mw import AuthConfig, get_authorized_user, start_jwks_store, stop_jwks_store
+from app.libs.database import (
+    ReadYourWritesMiddleware,
+    close_db_pool,
+    init_db_pool,
+    start_replica_monitor,
+    stop_replica_monitor,
+)
+from app.libs.passwords import shutdown_password_pool
+from app.libs.outbox import start_outbox_dispatcher, stop_outbox_dispatcher
+from app.libs.profile_views import start_profile_view_flusher, stop_profile_view_flusher
+from app.libs.catalog_cache import start_catalog_listener, stop_catalog_listener
+from app.libs.request_metrics import MetricsMiddleware, metrics_endpoint
+from app.libs.route_manifest import discover_apis, get_router_config, load_manifest
 
 
-def get_router_config() -> dict | None:
-    """Return router configuration if available.
-
-    If the configuration file cannot be read, ``None`` is returned.  The rest
-    of the application should continue to function using default values.
-    """
-    try:
-        # Note: This file is not available to the agent
-        cfg = json.loads(open("routers.json").read())
-    except Exception:
-        return None
-    return cfg
+# Set to print every mounted route at startup
+LOG_ROUTES = os.getenv("LOG_ROUTES", "").lower() in ("1", "true", "yes")
 
 
-def is_auth_disabled(router_config: dict | None, name: str) -> bool:
-    """Determine whether authentication is disabled for a router.
+def import_api_routers() -> APIRouter:
+    """Create top level router including all user defined endpoints.
 
-    When ``router_config`` is ``None`` (e.g. configuration file missing) or the
-    router entry does not exist, authentication remains enabled by default.
+    The API modules come from ``route_manifest.json``; without one they are
+    discovered from ``app/apis`` and ``routers.json``.
     """
-
-    if router_config is None:
-        # Default behaviour: authentication is enabled
-        return False
-
-    try:
-        return router_config["routers"][name].get("disableAuth", False)
-    except Exception:
-        return False
-
-
-def import_api_routers() -> APIRouter:
-    """Create top level router including all user defined endpoints."""
     routes = APIRouter(prefix="/routes")
 
-    router_config = get_router_config()
-
-    src_path = pathlib.Path(__file__).parent
-
-    # Import API routers from "src/app/apis/*/__init__.py"
-    apis_path = src_path / "app" / "apis"
-
-    api_names = [
-        p.relative_to(apis_path).parent.as_posix()
-        for p in apis_path.glob("*/__init__.py")
-    ]
+    apis = load_manifest()
+    if apis is None:
+        print("No route manifest, discovering APIs (run python -m scripts.generate_route_manifest)")
+        apis = discover_apis(get_router_config())
 
     api_module_prefix = "app.apis."
 
-    for name in api_names:
-        print(f"Importing API: {name}")
+    for name, disable_auth in apis:
+        if LOG_ROUTES:
+            print(f"Importing API: {name}")
         try:
             api_module = __import__(api_module_prefix + name, fromlist=[name])
             api_router = getattr(api_module, "router", None)
             if isinstance(api_router, APIRouter):
                 routes.include_router(
                     api_router,
-                    dependencies=(
-                        []
-                        if is_auth_disabled(router_config, name)
-                        else [Depends(get_authorized_user)]
-                    ),
+                    dependencies=[] if disable_auth else [Depends(get_authorized_user)],
                 )
         except Exception as e:
             print(e)
             continue
 
-    print(routes.routes)
-
     return routes
 
 
@@ -96,12 +72,17 @@ def get_firebase_config() -> dict | None:
 def create_app() -> FastAPI:
     """Create the app. This is called by uvicorn with the factory option to construct the app object."""
     app = FastAPI()
+    app.add_middleware(ReadYourWritesMiddleware)
+    app.add_middleware(MetricsMiddleware)
     app.include_router(import_api_routers())
+    # Prometheus scrape target, outside /routes and its user authentication
+    app.add_api_route("/metrics", metrics_endpoint, methods=["GET"], include_in_schema=False)
 
-    for route in app.routes:
-        if hasattr(route, "methods"):
-            for method in route.methods:
-                print(f"{method} {route.path}")
+    if LOG_ROUTES:
+        for route in app.routes:
+            if hasattr(route, "methods"):
+                for method in route.methods:
+                    print(f"{method} {route.path}")
 
     firebase_config = get_firebase_config()
 
@@ -127,8 +108,19 @@ app = create_app()
 @app.on_event("startup")
 async def on_startup() -> None:
     await init_db_pool()
+    await start_replica_monitor()
+    await start_jwks_store(app.state.auth_config)
+    await start_outbox_dispatcher()
+    await start_profile_view_flusher()
+    await start_catalog_listener()
 
 
 @app.on_event("shutdown")
 async def on_shutdown() -> None:
+    await stop_jwks_store(app.state.auth_config)
+    await stop_outbox_dispatcher()
+    await stop_profile_view_flusher()
+    await stop_catalog_listener()
+    await stop_replica_monitor()
     await close_db_pool()
+    shutdown_password_pool()
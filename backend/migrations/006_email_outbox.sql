@@ -0,0 +1,21 @@
+-- Migration to add a durable outbox for notification emails
+-- Emails are written in the same transaction as the row that triggers them
+-- (e.g. a new lead) and delivered later by the background dispatcher.
+
+CREATE TABLE IF NOT EXISTS email_outbox (
+    id BIGSERIAL PRIMARY KEY,
+    lead_id INTEGER REFERENCES leads(id) ON DELETE CASCADE,
+    to_email VARCHAR(255) NOT NULL,
+    subject VARCHAR(255) NOT NULL,
+    body TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    last_error TEXT,
+    sent_at TIMESTAMP,
+    created_at TIMESTAMP DEFAULT NOW()
+);
+
+-- Only undelivered messages are ever polled, keep that index small
+CREATE INDEX IF NOT EXISTS idx_email_outbox_pending
+    ON email_outbox(next_attempt_at)
+    WHERE sent_at IS NULL;
@@ -0,0 +1,36 @@
+-- Migration to add a per-day rollup of company profile views
+-- The supplier dashboard reads from this table so its cost depends on the
+-- number of days shown rather than on a company's whole view history.
+
+CREATE TABLE IF NOT EXISTS profile_view_daily (
+    company_id INTEGER NOT NULL REFERENCES companies(id) ON DELETE CASCADE,
+    day DATE NOT NULL,
+    views BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (company_id, day)
+);
+
+-- Keep the rollup current as views arrive.  A statement-level trigger sees
+-- every batch written by the profile view flusher as one transition table,
+-- so each flush costs one upsert per (company, day) instead of one per view.
+CREATE OR REPLACE FUNCTION rollup_profile_views()
+RETURNS TRIGGER AS $$
+BEGIN
+    INSERT INTO profile_view_daily (company_id, day, views)
+    SELECT company_id, viewed_at::date, COUNT(*)
+    FROM new_views
+    GROUP BY company_id, viewed_at::date
+    ON CONFLICT (company_id, day)
+    DO UPDATE SET views = profile_view_daily.views + EXCLUDED.views;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS rollup_profile_views ON profile_views;
+
+CREATE TRIGGER rollup_profile_views
+    AFTER INSERT ON profile_views
+    REFERENCING NEW TABLE AS new_views
+    FOR EACH STATEMENT
+    EXECUTE FUNCTION rollup_profile_views();
+
+-- Existing views are loaded with scripts/backfill_profile_view_daily.py
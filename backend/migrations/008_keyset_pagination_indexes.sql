@@ -0,0 +1,19 @@
+-- Migration to add indexes matching the ORDER BY of the paginated list endpoints
+-- Each page is then a single index range scan starting at the cursor.
+
+CREATE INDEX IF NOT EXISTS idx_companies_name_id ON companies(name, id);
+
+CREATE INDEX IF NOT EXISTS idx_reviews_product_created_at
+    ON reviews(product_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_leads_installer_created_at
+    ON leads(installer_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_leads_supplier_created_at
+    ON leads(supplier_id, created_at DESC, id DESC);
+
+-- Row comparisons with a NULL created_at are never true, so such rows would
+-- silently drop out of the keyset pages.  Every insert sets it already.
+UPDATE reviews SET created_at = NOW() WHERE created_at IS NULL;
+ALTER TABLE reviews ALTER COLUMN created_at SET NOT NULL;
+UPDATE leads SET created_at = COALESCE(updated_at, NOW()) WHERE created_at IS NULL;
+ALTER TABLE leads ALTER COLUMN created_at SET NOT NULL;
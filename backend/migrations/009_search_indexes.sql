@@ -0,0 +1,38 @@
+-- Migration to add full-text and trigram indexes for catalog search
+-- search_vector columns back the ranked /search endpoint; the trigram
+-- indexes serve typo-tolerant name matches and the ILIKE filters of the
+-- product and company list endpoints.
+-- The text search configuration must match SEARCH_CONFIG in app/apis/search.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE EXTENSION IF NOT EXISTS unaccent;
+
+-- Portuguese stemming that ignores accents, so "eficiencia" finds "eficiência"
+DO $$
+BEGIN
+    IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = 'catalog_search') THEN
+        CREATE TEXT SEARCH CONFIGURATION catalog_search (COPY = portuguese);
+        ALTER TEXT SEARCH CONFIGURATION catalog_search ALTER MAPPING FOR hword, hword_part, word WITH unaccent, portuguese_stem;
+    END IF;
+END $$;
+
+ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('catalog_search', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('catalog_search', coalesce(brand, '')), 'B') ||
+        setweight(to_tsvector('catalog_search', coalesce(description, '')), 'C')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_products_search_vector ON products USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_products_name_trgm ON products USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_products_brand_trgm ON products USING GIN (brand gin_trgm_ops);
+
+ALTER TABLE companies ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('catalog_search', coalesce(name, '')), 'A') ||
+        setweight(to_tsvector('catalog_search', coalesce(city, '')), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_companies_search_vector ON companies USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_companies_name_trgm ON companies USING GIN (name gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_companies_city_trgm ON companies USING GIN (city gin_trgm_ops);
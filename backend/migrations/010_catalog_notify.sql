@@ -0,0 +1,33 @@
+-- Migration to notify API workers of catalog changes
+-- Each worker LISTENs on catalog_changes and drops cached entries for the
+-- changed table and row.  Identical payloads within one transaction are
+-- delivered once, and only after it commits.
+
+CREATE OR REPLACE FUNCTION notify_catalog_change()
+RETURNS TRIGGER AS $$
+DECLARE
+    changed RECORD;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        changed := OLD;
+    ELSE
+        changed := NEW;
+    END IF;
+    PERFORM pg_notify('catalog_changes', TG_TABLE_NAME || ':' || changed.id);
+    -- An update that moves a row to another id invalidates the old one too
+    IF TG_OP = 'UPDATE' AND OLD.id IS DISTINCT FROM NEW.id THEN
+        PERFORM pg_notify('catalog_changes', TG_TABLE_NAME || ':' || OLD.id);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS products_notify_catalog_change ON products;
+CREATE TRIGGER products_notify_catalog_change
+    AFTER INSERT OR UPDATE OR DELETE ON products
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change();
+
+DROP TRIGGER IF EXISTS companies_notify_catalog_change ON companies;
+CREATE TRIGGER companies_notify_catalog_change
+    AFTER INSERT OR UPDATE OR DELETE ON companies
+    FOR EACH ROW EXECUTE FUNCTION notify_catalog_change();
@@ -0,0 +1,70 @@
+-- Migration to keep rating aggregates on products
+-- rating_histogram[n] counts the reviews with rating n (1-5).  The trigger
+-- updates the aggregates in the same transaction as the review change, so
+-- they never drift from the reviews table.
+
+ALTER TABLE products ADD COLUMN IF NOT EXISTS rating_count INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS rating_sum INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS rating_histogram INTEGER[] NOT NULL DEFAULT '{0,0,0,0,0}';
+ALTER TABLE products ADD COLUMN IF NOT EXISTS rating_average NUMERIC(3, 2)
+    GENERATED ALWAYS AS (
+        CASE WHEN rating_count > 0 THEN round(rating_sum::numeric / rating_count, 2) END
+    ) STORED;
+
+-- Backs list_products?sort=rating (unrated products sort last)
+CREATE INDEX IF NOT EXISTS idx_products_rating
+    ON products ((COALESCE(rating_average, 0)) DESC, id DESC);
+
+CREATE OR REPLACE FUNCTION update_product_rating()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.rating BETWEEN 1 AND 5 THEN
+        UPDATE products
+        SET rating_count = rating_count - 1,
+            rating_sum = rating_sum - OLD.rating,
+            rating_histogram[OLD.rating] = rating_histogram[OLD.rating] - 1
+        WHERE id = OLD.product_id;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.rating BETWEEN 1 AND 5 THEN
+        UPDATE products
+        SET rating_count = rating_count + 1,
+            rating_sum = rating_sum + NEW.rating,
+            rating_histogram[NEW.rating] = rating_histogram[NEW.rating] + 1
+        WHERE id = NEW.product_id;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Reviews written while the backfill runs would be counted twice or lost
+BEGIN;
+LOCK TABLE reviews IN SHARE ROW EXCLUSIVE MODE;
+
+DROP TRIGGER IF EXISTS reviews_update_product_rating ON reviews;
+CREATE TRIGGER reviews_update_product_rating
+    AFTER INSERT OR DELETE OR UPDATE OF rating, product_id ON reviews
+    FOR EACH ROW EXECUTE FUNCTION update_product_rating();
+
+-- Backfill from the existing reviews
+UPDATE products p
+SET rating_count = r.rating_count,
+    rating_sum = r.rating_sum,
+    rating_histogram = r.rating_histogram
+FROM (
+    SELECT product_id,
+           count(*) AS rating_count,
+           sum(rating) AS rating_sum,
+           ARRAY[
+               count(*) FILTER (WHERE rating = 1),
+               count(*) FILTER (WHERE rating = 2),
+               count(*) FILTER (WHERE rating = 3),
+               count(*) FILTER (WHERE rating = 4),
+               count(*) FILTER (WHERE rating = 5)
+           ]::integer[] AS rating_histogram
+    FROM reviews
+    WHERE rating BETWEEN 1 AND 5
+    GROUP BY product_id
+) r
+WHERE p.id = r.product_id;
+
+COMMIT;
@@ -0,0 +1,7 @@
+-- Migration to identify products by the supplier's own SKU
+-- The bulk import (POST /routes/products/import) upserts on (supplier_id, sku).
+-- Products created before the migration keep a NULL sku and are never matched.
+
+ALTER TABLE products ADD COLUMN IF NOT EXISTS sku TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_products_supplier_sku ON products (supplier_id, sku);
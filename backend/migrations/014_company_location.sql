@@ -0,0 +1,19 @@
+-- Migration to store company coordinates for the nearby search
+-- latitude and longitude are WGS84 degrees, both set or both NULL.  location
+-- mirrors them as a point (x = longitude, y = latitude); its GiST index
+-- returns GET /routes/companies/nearby candidates nearest first (KNN), which
+-- are then ranked by exact great-circle distance.
+
+ALTER TABLE companies ADD COLUMN IF NOT EXISTS latitude DOUBLE PRECISION;
+ALTER TABLE companies ADD COLUMN IF NOT EXISTS longitude DOUBLE PRECISION;
+ALTER TABLE companies ADD COLUMN IF NOT EXISTS location POINT
+    GENERATED ALWAYS AS (point(longitude, latitude)) STORED;
+
+ALTER TABLE companies DROP CONSTRAINT IF EXISTS companies_coordinates_check;
+ALTER TABLE companies ADD CONSTRAINT companies_coordinates_check CHECK (
+    (latitude IS NULL) = (longitude IS NULL)
+    AND latitude BETWEEN -90 AND 90
+    AND longitude BETWEEN -180 AND 180
+);
+
+CREATE INDEX IF NOT EXISTS idx_companies_location ON companies USING GIST (location);
@@ -0,0 +1,41 @@
+"""Backfill the profile_view_daily rollup from raw profile_views.
+
+Usage (from the ``backend`` directory, after running
+``migrations/007_profile_view_daily.sql``):
+
+    python -m scripts.backfill_profile_view_daily
+    python -m scripts.backfill_profile_view_daily --since 2025-01-01
+
+Without ``--since`` the whole rollup is rebuilt.  The command is safe to run
+repeatedly; inserts into profile_views wait until it has finished.
+"""
+
+import argparse
+import asyncio
+from datetime import date
+
+import asyncpg
+import dotenv
+
+dotenv.load_dotenv()
+
+from app.libs.database import DATABASE_URL
+from app.libs.profile_views import rebuild_daily_rollup
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--since", type=date.fromisoformat, default=None,
+                        help="only rebuild days on or after this date (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    conn = await asyncpg.connect(DATABASE_URL)
+    try:
+        rows = await rebuild_daily_rollup(conn, args.since)
+    finally:
+        await conn.close()
+    print(f"Wrote {rows} profile_view_daily rows")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,41 @@
+"""Regenerate route_manifest.json from app/apis and routers.json.
+
+Usage (from the ``backend`` directory):
+
+    python -m scripts.generate_route_manifest
+    python -m scripts.generate_route_manifest --check
+
+Run it after adding or removing an API package or editing ``routers.json``.
+With ``--check`` nothing is written and the command exits with status 1 when
+the manifest is out of date.
+"""
+
+import argparse
+import sys
+
+from app.libs.route_manifest import MANIFEST_PATH, discover_apis, get_router_config, render_manifest
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--check", action="store_true",
+                        help="fail instead of writing when the manifest is stale")
+    args = parser.parse_args()
+
+    entries = discover_apis(get_router_config())
+    manifest = render_manifest(entries)
+    current = MANIFEST_PATH.read_text() if MANIFEST_PATH.exists() else None
+    if args.check:
+        if current != manifest:
+            print(f"{MANIFEST_PATH.name} is out of date; run python -m scripts.generate_route_manifest")
+            return 1
+        print(f"{MANIFEST_PATH.name} is up to date")
+        return 0
+
+    MANIFEST_PATH.write_text(manifest)
+    print(f"Wrote {len(entries)} APIs to {MANIFEST_PATH.name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
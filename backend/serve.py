@@ -0,0 +1,97 @@
+"""Production entry point: several pre-forked uvicorn workers behind one port.
+
+Usage (from the ``backend`` directory):
+
+    python serve.py
+    python serve.py --workers 4 --port 8000 --db-connection-budget 80
+
+Workers default to one per available CPU (``WEB_CONCURRENCY`` or
+``--workers`` ask for fewer; asking for more is capped).  When a database
+connection budget is given (``DB_CONNECTION_BUDGET``), it is split between the
+workers and sets their ``DB_POOL_MAX_SIZE``.  With a read replica, its own
+budget (``DB_REPLICA_CONNECTION_BUDGET``, by default the same number) sets
+``DB_REPLICA_POOL_MAX_SIZE`` the same way.
+
+``kill -HUP <pid>`` restarts the workers one by one without dropping
+requests; ``kill -TERM <pid>`` drains them and exits.
+"""
+
+import argparse
+import os
+
+import dotenv
+
+dotenv.load_dotenv()
+
+import uvicorn
+
+from app.libs.catalog_cache import catalog_cache
+from app.libs.prefork import Supervisor, available_cpus, pool_sizes, worker_count
+
+
+def env_int(name: str) -> int | None:
+    value = os.getenv(name)
+    return int(value) if value else None
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=env_int("WEB_CONCURRENCY"),
+                        help="worker processes (default: one per available CPU)")
+    parser.add_argument("--db-connection-budget", type=int, default=env_int("DB_CONNECTION_BUDGET"),
+                        help="Postgres connections all workers may hold together")
+    parser.add_argument("--db-replica-connection-budget", type=int, default=env_int("DB_REPLICA_CONNECTION_BUDGET"),
+                        help="read replica connections all workers may hold together (default: the primary's budget)")
+    parser.add_argument("--pin-cpus", action="store_true",
+                        default=os.getenv("WORKER_PIN_CPUS", "").lower() in ("1", "true", "yes"),
+                        help="pin each worker to its own CPU")
+    parser.add_argument("--graceful-timeout", type=float,
+                        default=float(os.getenv("WORKER_GRACEFUL_TIMEOUT", "30")),
+                        help="seconds a stopping worker waits for in-flight requests")
+    parser.add_argument("--app", default="main:app")
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    workers = worker_count(args.workers, len(cpus))
+    if args.workers and workers < args.workers:
+        print(f"Only {len(cpus)} CPUs available, running {workers} workers instead of {args.workers}")
+
+    replica_url = os.getenv("DATABASE_REPLICA_URL")
+    # The catalog cache listens for changes on a connection of its own
+    reserved = 1 if catalog_cache.max_size > 0 else 0
+    pool_size, replica_pool_size = pool_sizes(
+        workers,
+        args.db_connection_budget,
+        args.db_replica_connection_budget,
+        has_replica=bool(replica_url),
+        same_server=replica_url == os.getenv("DATABASE_URL"),
+        reserved_per_worker=reserved,
+    )
+
+    # Inherited by the spawned workers, which read them when importing database
+    if replica_pool_size:
+        os.environ["DB_REPLICA_POOL_MAX_SIZE"] = str(replica_pool_size)
+        print(f"Replica pool of {replica_pool_size} per worker")
+    if pool_size:
+        os.environ["DB_POOL_MAX_SIZE"] = str(pool_size)
+        min_size = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+        os.environ["DB_POOL_MIN_SIZE"] = str(min(min_size, pool_size))
+        print(
+            f"Database pool of {pool_size} per worker for {workers} workers, "
+            f"{reserved} reserved each, room for one restarting worker"
+        )
+
+    config = uvicorn.Config(
+        args.app,
+        host=args.host,
+        port=args.port,
+        timeout_graceful_shutdown=args.graceful_timeout,
+        proxy_headers=True,
+    )
+    Supervisor(config, workers, cpus if args.pin_cpus else None).run()
+
+
+if __name__ == "__main__":
+    main()
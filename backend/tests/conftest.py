@@ -1,8 +1,9 @@
 import pytest
 import uuid
 import httpx
-from backend.main import create_app
-from app.libs import database
+from main import create_app
+from app.libs import database, query_checks
+from app.libs.principals import principal_cache
 from databutton_app.mw import auth_mw
 
 
@@ -59,24 +60,31 @@ class FakeDB:
         raise NotImplementedError(query)
 
 
+@pytest.fixture(autouse=True)
+def fail_on_repeated_queries(monkeypatch):
+    """Turn N+1 patterns on instrumented connections into test failures."""
+    monkeypatch.setattr(query_checks, "DB_QUERY_CHECKS", "raise")
+
+
 @pytest.fixture
 def fake_db():
     return FakeDB()
 
 
 @pytest.fixture
-def app(fake_db, monkeypatch):
+def app(fake_db):
     async def override_get_db_connection():
-        yield fake_db
+        yield database.InstrumentedConnection(fake_db)
 
-    monkeypatch.setattr(database, "get_db_connection", override_get_db_connection)
-
-    def dummy_get_authorized_user(request):
+    def dummy_get_authorized_user():
         return auth_mw.User(sub="test-user")
 
-    monkeypatch.setattr(auth_mw, "get_authorized_user", dummy_get_authorized_user)
-
-    return create_app()
+    principal_cache.clear()
+    app = create_app()
+    app.dependency_overrides[database.get_db_connection] = override_get_db_connection
+    app.dependency_overrides[database.get_read_connection] = override_get_db_connection
+    app.dependency_overrides[auth_mw.get_authorized_user] = dummy_get_authorized_user
+    return app
 
 
 @pytest.fixture
@@ -0,0 +1,24 @@
+"""Test doubles shared by several test modules."""
+
+import asyncio
+
+
+class LatencyDB:
+    """Wrap a fake connection and add a fixed delay to every round-trip."""
+
+    def __init__(self, inner, delay):
+        self.inner = inner
+        self.delay = delay
+        self.round_trips = 0
+
+    def __getattr__(self, name):
+        method = getattr(self.inner, name)
+        if name not in ("fetch", "fetchrow", "fetchval", "execute", "executemany"):
+            return method
+
+        async def delayed(*args, **kwargs):
+            self.round_trips += 1
+            await asyncio.sleep(self.delay)
+            return await method(*args, **kwargs)
+
+        return delayed
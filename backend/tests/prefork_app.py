@@ -0,0 +1,23 @@
+"""Minimal ASGI app served by the supervisor in ``test_prefork``.
+
+Every response body is the pid of the worker that served it; ``/slow`` takes
+``SLOW_SECONDS`` to answer.
+"""
+
+import asyncio
+import os
+
+SLOW_SECONDS = 2.0
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            await send({"type": message["type"] + ".complete"})
+            if message["type"] == "lifespan.shutdown":
+                return
+    if scope["path"] == "/slow":
+        await asyncio.sleep(SLOW_SECONDS)
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+    await send({"type": "http.response.body", "body": str(os.getpid()).encode()})
@@ -0,0 +1,154 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from databutton_app.mw import auth_mw
+
+AUDIENCE = "solar-sync"
+
+
+@pytest.fixture(scope="module")
+def rsa_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def signing_calls(rsa_key, monkeypatch):
+    calls = []
+
+    async def fake_get_signing_key(url, token):
+        calls.append(token)
+        return rsa_key.public_key(), "RS256"
+
+    monkeypatch.setattr(auth_mw, "get_signing_key", fake_get_signing_key)
+    auth_mw.token_cache.clear()
+    return calls
+
+
+def make_token(rsa_key, sub="user-1", lifetime=3600):
+    claims = {"sub": sub, "aud": AUDIENCE, "exp": int(time.time()) + lifetime}
+    return jwt.encode(claims, rsa_key, algorithm="RS256", headers={"kid": "test"})
+
+
+@pytest.mark.asyncio
+async def test_verified_token_is_cached_until_expiry(rsa_key, signing_calls):
+    config = auth_mw.AuthConfig(jwks_url="http://jwks", audience=AUDIENCE, header="authorization")
+    token = make_token(rsa_key)
+    hits = auth_mw.token_cache.hits
+
+    for _ in range(3):
+        assert (await auth_mw.authorize_token(token, config)).sub == "user-1"
+
+    assert len(signing_calls) == 1
+    assert auth_mw.token_cache.hits - hits == 2
+
+
+@pytest.mark.asyncio
+async def test_token_expiring_within_skew_is_not_cached(rsa_key, signing_calls):
+    config = auth_mw.AuthConfig(jwks_url="http://jwks", audience=AUDIENCE, header="authorization")
+    token = make_token(rsa_key, lifetime=5)
+
+    await auth_mw.authorize_token(token, config)
+    await auth_mw.authorize_token(token, config)
+
+    assert len(signing_calls) == 2
+
+
+def test_cache_evicts_least_recently_used():
+    cache = auth_mw.TokenCache(max_size=2, skew=0)
+    exp = time.time() + 60
+    for name in ("a", "b", "c"):
+        cache.put(name.encode(), auth_mw.User(sub=name), exp)
+
+    assert cache.get(b"a") is None
+    assert cache.get(b"c").sub == "c"
+    assert cache.stats()["size"] == 2
+
+
+class JWKSServer:
+    """Local HTTP stand-in serving a JWKS document."""
+
+    def __init__(self):
+        self.keys = []
+        self.fail = False
+        self.requests = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                server.requests += 1
+                if server.fail:
+                    self.send_response(503)
+                    self.end_headers()
+                    return
+                body = json.dumps({"keys": server.keys}).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Cache-Control", "public, max-age=100")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/jwks"
+
+    def publish(self, kid, key):
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+        self.keys = [dict(jwk, kid=kid, alg="RS256", use="sig")]
+
+
+@pytest.fixture
+def jwks_server():
+    server = JWKSServer()
+    thread = threading.Thread(target=server.httpd.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.httpd.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_jwks_store_prefetches_and_follows_rotation(rsa_key, jwks_server):
+    jwks_server.publish("old", rsa_key)
+    store = auth_mw.JWKSKeyStore(jwks_server.url, min_refresh_interval=0)
+    await store.start()
+    try:
+        assert store.refreshes == 1
+        assert (await store.get_signing_key("old")).key_id == "old"
+        assert jwks_server.requests == 1
+
+        new_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        jwks_server.publish("new", new_key)
+        assert (await store.get_signing_key("new")).key_id == "new"
+        assert jwks_server.requests == 2
+    finally:
+        await store.stop()
+
+
+@pytest.mark.asyncio
+async def test_jwks_store_keeps_last_known_keys_when_refresh_fails(rsa_key, jwks_server):
+    jwks_server.publish("current", rsa_key)
+    store = auth_mw.JWKSKeyStore(jwks_server.url, min_refresh_interval=60)
+    await store.refresh()
+
+    jwks_server.fail = True
+    assert await store.refresh() is False
+    assert store.refresh_failures == 1
+    assert (await store.get_signing_key("current")).key_id == "current"
+
+    # Unknown key ids cannot force another fetch within min_refresh_interval
+    with pytest.raises(jwt.PyJWKClientError):
+        await store.get_signing_key("unknown")
+    assert jwks_server.requests == 2
+
+
+@pytest.mark.parametrize("cache_control, ttl", [("max-age=0", 30), ("max-age=100", 80), ("no-store", 3600)])
+def test_jwks_refresh_interval_follows_max_age_within_bounds(cache_control, ttl):
+    store = auth_mw.JWKSKeyStore("http://jwks.invalid", refresh_interval=3600, min_refresh_interval=30)
+    response = httpx.Response(200, headers={"Cache-Control": cache_control})
+    assert store._ttl(response) == ttl
@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from app.apis import admin
+from app.libs.catalog_cache import CatalogCache
+from app.libs.principals import Principal, principal_cache
+
+
+class CatalogDB:
+    def __init__(self):
+        self.products = {1: {"id": 1, "name": "Panel"}, 2: {"id": 2, "name": "Inverter"}}
+        self.queries = 0
+
+    async def fetch(self, query, *args):
+        self.queries += 1
+        await asyncio.sleep(0.01)
+        return list(self.products.values())
+
+    async def fetchrow(self, query, product_id):
+        self.queries += 1
+        return self.products.get(product_id)
+
+
+def enabled_cache(**kwargs):
+    cache = CatalogCache(**kwargs)
+    cache.enabled = True
+    return cache
+
+
+@pytest.mark.asyncio
+async def test_notification_drops_lists_and_changed_row_only():
+    db = CatalogDB()
+    cache = enabled_cache()
+    query = "SELECT id, name FROM products WHERE id = $1"
+
+    await cache.fetch(db, ("products",), "SELECT id, name FROM products")
+    await cache.fetchrow(db, ("products:1",), query, 1)
+    await cache.fetchrow(db, ("products:2",), query, 2)
+    await cache.fetchrow(db, ("products:1",), query, 1)
+    assert db.queries == 3
+    assert cache.stats()["hits"] == 1
+
+    db.products[1] = {"id": 1, "name": "Panel 550W"}
+    cache.handle_notification("products:1")
+    assert cache.stats()["invalidations"] == 2
+
+    assert (await cache.fetchrow(db, ("products:1",), query, 1))["name"] == "Panel 550W"
+    await cache.fetchrow(db, ("products:2",), query, 2)
+    assert db.queries == 4
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_query_and_lru_evicts():
+    db = CatalogDB()
+    cache = enabled_cache(max_size=1)
+
+    results = await asyncio.gather(*(cache.fetch(db, ("products",), "SELECT 1") for _ in range(5)))
+    assert db.queries == 1
+    assert all(r == results[0] for r in results)
+
+    await cache.fetch(db, ("products",), "SELECT 2")
+    assert cache.stats()["evictions"] == 1
+    await cache.fetch(db, ("products",), "SELECT 1")
+    assert db.queries == 3
+
+
+@pytest.mark.asyncio
+async def test_load_racing_an_invalidation_is_not_stored():
+    db = CatalogDB()
+    cache = enabled_cache()
+
+    load = asyncio.create_task(cache.fetch(db, ("products",), "SELECT 1"))
+    await asyncio.sleep(0)
+    cache.handle_notification("products:1")
+    await load
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.asyncio
+async def test_disabled_cache_reads_through_and_entries_expire():
+    db = CatalogDB()
+    cache = CatalogCache(ttl=0)
+
+    await cache.fetch(db, ("products",), "SELECT 1")
+    await cache.fetch(db, ("products",), "SELECT 1")
+    assert db.queries == 2
+    assert cache.stats()["misses"] == 0
+
+    cache.enabled = True
+    await cache.fetch(db, ("products",), "SELECT 1")
+    await cache.fetch(db, ("products",), "SELECT 1")
+    assert db.queries == 4
+    assert cache.stats()["expirations"] == 1
+
+
+@pytest.mark.asyncio
+async def test_cache_metrics_do_not_need_a_connection_for_cached_admins(monkeypatch, client):
+    def no_connection():
+        raise AssertionError("the admin check acquired a connection")
+
+    monkeypatch.setattr(admin, "request_connection", no_connection)
+    principal_cache.put("test-user", Principal("admin", None))
+    response = await client.get("/routes/admin/metrics/catalog-cache")
+    assert response.status_code == 200
+    assert "hits" in response.json()
@@ -0,0 +1,101 @@
+from contextlib import asynccontextmanager
+from decimal import Decimal
+import pytest
+from app.apis import products
+from app.libs import catalog_import
+from app.libs.catalog_import import read_records
+from app.libs.principals import invalidate_principal
+
+
+async def body(data: bytes, size: int):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+
+class ImportDB:
+    def __init__(self, role="supplier"):
+        self.role = role
+        self.copied = []
+        self.merged_for = None
+        self.executed = []
+
+    async def fetch(self, query, *args):
+        assert "FROM product_categories" in query
+        return [{"id": 4, "name": "Inversores"}]
+
+    async def fetchrow(self, query, *args):
+        if "FROM users u" in query:
+            return {"role_name": self.role, "company_id": 7}
+        assert "INSERT INTO products" in query
+        self.merged_for = args[0]
+        skus = {record[1] for record in self.copied}
+        return {"staged": len(self.copied), "distinct_skus": len(skus), "inserted": 1, "updated": 0}
+
+    async def execute(self, query, *args):
+        self.executed.append(query.split("(")[0].strip())
+
+    async def copy_records_to_table(self, table, records, columns):
+        assert table == "product_import" and columns == catalog_import.STAGING_COLUMNS
+        self.copied.extend(records)
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+CSV = (
+    "﻿SKU,name,price,category,notes\r\n"
+    "INV-1,\"Inversor 5 kW, \"\"híbrido\"\"\",4999.90,Inversores,\"two\r\nlines\"\r\n"
+    "INV-2,,10,,\r\n"
+    "INV-3,Inversor 3 kW,-1,,\r\n"
+    "\r\n"
+    "INV-4,Cabo,,Cabos,\r\n"
+    "INV-1,Inversor 5 kW,4899.90,,\r\n"
+    "INV-5,Conector"
+).encode()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("size", [1, 7, len(CSV)])
+async def test_records_are_split_at_newlines_outside_quotes_whatever_the_chunks(size):
+    records = [record async for chunk in read_records(body(CSV, size)) for record in chunk]
+    assert [line for line, _ in records] == [1, 2, 4, 5, 6, 7, 8, 9]
+    assert records[1][1].endswith('"two\r\nlines"\r')
+    assert records[0][1].startswith("SKU")
+
+
+@pytest.mark.asyncio
+async def test_import_stages_valid_rows_and_reports_the_others():
+    db = ImportDB()
+    report = await catalog_import.import_products(db, 7, body(CSV, 5))
+
+    assert db.merged_for == 7
+    assert db.executed == ["CREATE TEMP TABLE product_import", "DROP TABLE product_import"]
+    assert [record[:2] for record in db.copied] == [(2, "INV-1"), (8, "INV-1")]
+    assert db.copied[0] == (2, "INV-1", 'Inversor 5 kW, "híbrido"', None, Decimal("4999.90"), "Inversores", 4, None)
+    assert [(e.line, e.error) for e in report.errors] == [
+        (4, "name is required"),
+        (5, "Price must be between 0 and 9999999999.99"),
+        (7, "Unknown category: 'Cabos'"),
+        (9, "Expected 5 fields, found 2"),
+    ]
+    assert (report.rows, report.error_count, report.duplicates) == (6, 4, 1)
+    assert (report.inserted, report.updated, report.unchanged) == (1, 0, 0)
+
+
+@pytest.mark.asyncio
+async def test_import_endpoint_is_for_suppliers_and_rejects_bad_headers(app, client):
+    db = ImportDB(role="installer")
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[products.get_db_connection] = override
+    response = await client.post("/routes/products/import", content=b"sku,name\nA,B\n")
+    assert response.status_code == 403
+
+    db.role = "supplier"
+    invalidate_principal("test-user")
+    response = await client.post("/routes/products/import", content=b"name,price\nA,1\n")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Missing required columns: sku"
@@ -0,0 +1,162 @@
+import math
+import random
+import pytest
+from app.apis import companies
+from app.libs.geo import EARTH_RADIUS_KM, bounding_box, haversine_km, min_distance_km
+from app.libs.pagination import encode_cursor
+
+
+class LocatedCompaniesDB:
+    """Evaluates the nearby query's candidates, radius, cursor and limit in Python."""
+
+    def __init__(self, points):
+        self.rows = [
+            {"id": i + 1, "name": f"Solar {i + 1}", "latitude": lat, "longitude": lng}
+            for i, (lat, lng) in enumerate(points)
+        ]
+        self.candidates = []
+
+    async def fetch(self, query, *args):
+        lat, lng, radius, min_planar, *rest = args
+        if "<@ box" in query:
+            min_lng, min_lat, max_lng, max_lat, *rest = rest
+            candidates = [
+                row for row in self.rows
+                if min_lng <= row["longitude"] <= max_lng and min_lat <= row["latitude"] <= max_lat
+            ]
+            self.candidates.append(None)
+        else:
+            count, *rest = rest
+            candidates = sorted(self.rows, key=lambda r: math.hypot(r["longitude"] - lng, r["latitude"] - lat))
+            candidates = [r for r in candidates if math.hypot(r["longitude"] - lng, r["latitude"] - lat) >= min_planar]
+            candidates = candidates[:count]
+            self.candidates.append(count)
+        after = tuple(rest[:2]) if "(distance_km, id) >" in query else None
+        limit = rest[-1]
+        scan = {
+            "scanned": len(candidates),
+            "reach": max((math.hypot(r["longitude"] - lng, r["latitude"] - lat) for r in candidates), default=None),
+        }
+        rows = []
+        for row in candidates:
+            distance = haversine_km(lat, lng, row["latitude"], row["longitude"])
+            if distance <= radius and (after is None or (distance, row["id"]) > after):
+                rows.append(dict(row, distance_km=distance, **scan))
+        rows = sorted(rows, key=lambda r: (r["distance_km"], r["id"]))[:limit]
+        return rows or [dict(id=None, **scan)]
+
+
+def test_bounding_box_holds_the_whole_circle():
+    random.seed(7)
+    for lat, lng, radius in ((-23.55, -46.63, 50), (64.1, -21.9, 300), (0.0, 179.9, 40), (89.8, 0.0, 50)):
+        min_lng, min_lat, max_lng, max_lat = bounding_box(lat, lng, radius)
+        for _ in range(2000):
+            point_lat = max(-90.0, min(90.0, lat + random.uniform(-6, 6)))
+            point_lng = (lng + random.uniform(-30, 30) + 180) % 360 - 180
+            if haversine_km(lat, lng, point_lat, point_lng) <= radius:
+                assert min_lat <= point_lat <= max_lat and min_lng <= point_lng <= max_lng
+
+
+
+def test_planar_distance_bounds_the_great_circle_distance():
+    random.seed(11)
+    for _ in range(5000):
+        lat, lng = random.uniform(-58, 58), random.uniform(-170, 170)
+        point_lat, point_lng = lat + random.uniform(-5, 5), lng + random.uniform(-9, 9)
+        planar = math.hypot(point_lat - lat, point_lng - lng)
+        distance = haversine_km(lat, lng, point_lat, point_lng)
+        assert min_distance_km(lat, planar) <= distance <= EARTH_RADIUS_KM * math.radians(planar) + 1e-9
+
+@pytest.mark.asyncio
+async def test_nearby_pages_through_companies_by_distance(app, client):
+    random.seed(3)
+    center = (-23.55, -46.63)
+    points = [(center[0] + random.gauss(0, 0.3), center[1] + random.gauss(0, 0.3)) for _ in range(60)]
+    db = LocatedCompaniesDB(points)
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[companies.get_read_connection] = override
+    params = {"lat": center[0], "lng": center[1], "radius_km": 40, "limit": 7}
+    seen = []
+    while True:
+        response = await client.get("/routes/companies/nearby", params=params)
+        assert response.status_code == 200
+        seen += response.json()
+        if "x-next-cursor" not in response.headers:
+            break
+        params["cursor"] = response.headers["x-next-cursor"]
+
+    expected = sorted((haversine_km(*center, *p), i + 1) for i, p in enumerate(points) if haversine_km(*center, *p) <= 40)
+    assert [(c["distance_km"], c["id"]) for c in seen] == expected
+    assert {"latitude", "longitude", "distance_km"} <= set(seen[0])
+    # Twice the page size of candidates answers each page in one query
+    assert len(db.candidates) == len(seen) // 7 + 1
+    assert set(db.candidates) == {companies.NEARBY_CANDIDATES_FACTOR * 8}
+
+
+@pytest.mark.asyncio
+async def test_nearby_validates_coordinates(client):
+    response = await client.get("/routes/companies/nearby", params={"lat": 91, "lng": 0})
+    assert response.status_code == 422
+    response = await client.get("/routes/companies/nearby", params={"lat": 0, "lng": 0, "radius_km": 501})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("values", [("x", 1), (-1.5, 1), (float("nan"), 1), (float("inf"), 1), (2.5, "1")])
+async def test_nearby_rejects_tampered_cursors(app, client, values):
+    db = LocatedCompaniesDB([(-23.55, -46.63)])
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[companies.get_read_connection] = override
+    params = {"lat": -23.55, "lng": -46.63, "cursor": encode_cursor(*values)}
+    response = await client.get("/routes/companies/nearby", params=params)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+    assert db.candidates == []
+
+
+@pytest.mark.asyncio
+async def test_nearby_reads_more_candidates_when_planar_order_is_misleading(app, client):
+    # Near 55 degrees south a degree of longitude is 0.57 degrees of latitude.
+    # On this ring the planar order runs from north to east, the opposite of
+    # the real one, so the first candidates cannot rank the page.
+    center = (-55.0, -68.0)
+    points = [
+        (center[0] + r * math.sin(angle), center[1] + r * math.cos(angle))
+        for r, angle in ((0.1 + 0.0005 * i, math.radians(90 - 3.75 * i)) for i in range(25))
+    ]
+    db = LocatedCompaniesDB(points)
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[companies.get_read_connection] = override
+    params = {"lat": center[0], "lng": center[1], "radius_km": 20, "limit": 5}
+    response = await client.get("/routes/companies/nearby", params=params)
+    assert response.status_code == 200
+
+    expected = sorted((haversine_km(*center, *p), i + 1) for i, p in enumerate(points))[:5]
+    assert [(c["distance_km"], c["id"]) for c in response.json()] == expected
+    assert db.candidates == [12, 48]
+
+
+@pytest.mark.asyncio
+async def test_nearby_ranks_the_whole_box_across_the_antimeridian(app, client):
+    center = (-16.0, 179.95)
+    points = [(-16.0, -179.95), (-16.0, 179.5), (-16.3, 179.95)]
+    db = LocatedCompaniesDB(points)
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[companies.get_read_connection] = override
+    params = {"lat": center[0], "lng": center[1], "radius_km": 40}
+    response = await client.get("/routes/companies/nearby", params=params)
+    assert response.status_code == 200
+    assert [c["id"] for c in response.json()] == [1, 3]
+    assert db.candidates == [None]
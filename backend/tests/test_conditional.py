@@ -0,0 +1,61 @@
+from datetime import datetime
+import pytest
+from app.apis import products
+
+
+class ProductDB:
+    def __init__(self):
+        self.product = {
+            "id": 1, "name": "Panel", "description": None, "price": 899.0, "category": None,
+            "supplier_id": 3, "created_at": None, "updated_at": datetime(2025, 6, 1, 12, 0, 0, 500000),
+        }
+
+    async def fetchrow(self, query, product_id):
+        assert "FROM products WHERE id" in query
+        return self.product
+
+
+@pytest.fixture
+def product_db(app):
+    db = ProductDB()
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[products.get_read_connection] = override
+    return db
+
+
+@pytest.mark.asyncio
+async def test_unchanged_product_is_not_modified(client, product_db):
+    response = await client.get("/routes/products/1")
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+    assert response.headers["last-modified"] == "Sun, 01 Jun 2025 12:00:00 GMT"
+    assert response.headers["cache-control"] == "public, max-age=60"
+
+    response = await client.get("/routes/products/1", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+
+    response = await client.get(
+        "/routes/products/1", headers={"If-Modified-Since": "Sun, 01 Jun 2025 12:00:00 GMT"}
+    )
+    assert response.status_code == 304
+
+
+@pytest.mark.asyncio
+async def test_updated_product_is_sent_again(client, product_db):
+    etag = (await client.get("/routes/products/1")).headers["etag"]
+    product_db.product = {**product_db.product, "updated_at": datetime(2025, 6, 1, 12, 0, 1)}
+
+    response = await client.get(
+        "/routes/products/1",
+        # If-None-Match wins over a still-matching If-Modified-Since
+        headers={"If-None-Match": etag, "If-Modified-Since": "Sun, 01 Jun 2025 12:00:05 GMT"},
+    )
+    assert response.status_code == 200
+    assert response.json()["id"] == 1
+    assert response.headers["etag"] != etag
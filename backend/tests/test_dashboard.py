@@ -0,0 +1,93 @@
+import json
+import time
+from datetime import date, datetime, timedelta
+import pytest
+from app.libs import database
+from tests.helpers import LatencyDB
+
+NETWORK_DELAY = 0.05
+# get_analytics used to await seven queries one after another
+PREVIOUS_ROUND_TRIPS = 7
+
+
+class DashboardDB:
+    def __init__(self):
+        self.analytics_args = None
+
+    async def fetchrow(self, query, *args):
+        if "FROM users u" in query:
+            return {"role_name": "supplier", "company_id": 1}
+        if "FROM profile_view_daily" not in query:
+            raise NotImplementedError(query)
+        self.analytics_args = args
+        return {
+            "total_views": 120,
+            "views_past_30_days": 30,
+            "daily_views": json.dumps([{"date": "2025-06-01", "views": 30}]),
+            "total_leads": 2,
+            "pending_leads": 1,
+            "recent_leads": json.dumps([
+                {
+                    "id": 1,
+                    "installer_id": "installer",
+                    "supplier_id": 1,
+                    "project_description": "Rooftop array",
+                    "contact_email": "installer@example.com",
+                    "status": "pending",
+                    "created_at": "2025-06-01T12:00:00",
+                }
+            ]),
+        }
+
+
+@pytest.mark.asyncio
+async def test_analytics_is_a_single_round_trip(app, client):
+    db = LatencyDB(DashboardDB(), NETWORK_DELAY)
+
+    async def override_get_db_connection():
+        yield db
+
+    app.dependency_overrides[database.get_db_connection] = override_get_db_connection
+
+    # Warm up so the measurement does not include one-off start-up costs or
+    # the principal lookup, which is cached per user
+    await client.get("/routes/dashboard/analytics")
+    db.round_trips = 0
+
+    start = time.perf_counter()
+    resp = await client.get("/routes/dashboard/analytics")
+    elapsed = time.perf_counter() - start
+
+    assert resp.status_code == 200
+    data = resp.json()
+    assert data["total_views"] == 120
+    assert data["daily_views"] == [{"date": "2025-06-01", "views": 30}]
+    assert data["recent_leads"][0]["project_description"] == "Rooftop array"
+
+    assert db.round_trips == 1
+    # The simulated delay is paid once instead of once per query.  The upper
+    # bound leaves several round-trips of slack for a slow test machine.
+    previous = PREVIOUS_ROUND_TRIPS * NETWORK_DELAY
+    assert db.round_trips * NETWORK_DELAY <= elapsed < previous / 2
+
+
+@pytest.mark.asyncio
+async def test_analytics_window_covers_today_and_the_30_days_before(app, client):
+    db = DashboardDB()
+
+    async def override_get_db_connection():
+        yield db
+
+    app.dependency_overrides[database.get_db_connection] = override_get_db_connection
+
+    before = datetime.utcnow().date()
+    resp = await client.get("/routes/dashboard/analytics")
+    after = datetime.utcnow().date()
+
+    assert resp.status_code == 200
+    company_id, window_start = db.analytics_args
+    assert company_id == 1
+    assert isinstance(window_start, date)
+    # ``day >= $2`` over the rollup: 31 calendar days including today.  Both
+    # ends are accepted in case the request straddles midnight UTC.
+    assert window_start in {before - timedelta(days=30), after - timedelta(days=30)}
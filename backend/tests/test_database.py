@@ -0,0 +1,70 @@
+import asyncio
+import pytest
+from fastapi import HTTPException
+from app.libs import database
+from app.libs.metrics import Histogram
+from app.libs.principals import Principal, principal_cache
+
+
+class ExhaustedPool:
+    async def acquire(self, timeout=None):
+        await asyncio.sleep(timeout)
+        raise asyncio.TimeoutError
+
+    def get_size(self):
+        return 2
+
+    def get_idle_size(self):
+        return 0
+
+    def get_min_size(self):
+        return 1
+
+    def get_max_size(self):
+        return 2
+
+
+@pytest.mark.asyncio
+async def test_acquire_timeout_returns_503(monkeypatch):
+    monkeypatch.setattr(database, "pool", ExhaustedPool())
+    monkeypatch.setattr(database, "DB_POOL_ACQUIRE_TIMEOUT", 0.01)
+    monkeypatch.setattr(database, "pool_metrics", database.PoolMetrics())
+
+    with pytest.raises(HTTPException) as exc:
+        await database.get_db_connection().__anext__()
+    assert exc.value.status_code == 503
+
+    stats = database.pool_stats()
+    assert stats["acquire_timeouts"] == 1
+    assert stats["waiting"] == 0
+    assert stats["size"] == 2 and stats["idle"] == 0
+    assert stats["acquire_wait_seconds"]["count"] == 1
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5.0):
+        histogram.observe(value)
+
+    assert histogram.cumulative() == [("0.1", 2), ("1.0", 3), ("+Inf", 4)]
+    assert histogram.count == 4
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_answer_cached_admins_while_the_pool_is_exhausted(monkeypatch, client):
+    monkeypatch.setattr(database, "pool", ExhaustedPool())
+    monkeypatch.setattr(database, "DB_POOL_ACQUIRE_TIMEOUT", 0.01)
+    monkeypatch.setattr(database, "pool_metrics", database.PoolMetrics())
+
+    # Not cached: the role lookup needs a connection
+    response = await client.get("/routes/admin/metrics/db-pool")
+    assert response.status_code == 503
+
+    principal_cache.put("test-user", Principal("admin", None))
+    response = await client.get("/routes/admin/metrics/db-pool")
+    assert response.status_code == 200
+    assert response.json()["acquire_timeouts"] == 1
+
+    principal_cache.put("test-user", Principal("installer", None))
+    response = await client.get("/routes/admin/metrics/db-pool")
+    assert response.status_code == 403
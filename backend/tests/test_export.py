@@ -0,0 +1,104 @@
+import json
+from contextlib import asynccontextmanager
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from app.libs import database, export
+from app.libs.models import Lead
+from app.libs.principals import Principal, principal_cache
+
+
+class CursorConn:
+    def __init__(self, rows):
+        self.rows = rows
+        self.transactions = []
+        self.released = False
+        self.fail_after = None
+
+    @asynccontextmanager
+    async def transaction(self, **options):
+        self.transactions.append(options)
+        yield
+
+    async def cursor(self, query, *args, prefetch=None):
+        assert args == (3,) and prefetch == export.EXPORT_PREFETCH
+        for index, row in enumerate(self.rows):
+            if index == self.fail_after:
+                raise ConnectionResetError("connection lost")
+            yield row
+
+
+class CursorPool:
+    def __init__(self, conn):
+        self.conn = conn
+        self.held = 0
+        self.max_held = 0
+
+    async def acquire(self, timeout=None):
+        self.held += 1
+        self.max_held = max(self.max_held, self.held)
+        return self.conn
+
+    async def release(self, conn):
+        self.held -= 1
+        conn.released = True
+
+
+@pytest.fixture
+def conn(monkeypatch):
+    rows = [
+        {"id": i, "installer_id": "user-1", "supplier_id": 3, "project_description": "Roof, 5 kWp",
+         "estimated_budget": Decimal("15000.50"), "contact_email": "a@example.com", "status": "pending",
+         "created_at": datetime(2025, 6, i)}
+        for i in range(1, 6)
+    ]
+    conn = CursorConn(rows)
+    monkeypatch.setattr(database, "pool", CursorPool(conn))
+    monkeypatch.setattr(export, "EXPORT_CHUNK_ROWS", 2)
+    return conn
+
+
+async def collect(format):
+    return [chunk async for chunk in export.export_chunks("SELECT", [3], Lead, format)]
+
+
+@pytest.mark.asyncio
+async def test_ndjson_is_streamed_in_chunks_from_a_snapshot(conn):
+    chunks = await collect("ndjson")
+    assert len(chunks) == 3
+    lines = b"".join(chunks).decode().splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [1, 2, 3, 4, 5]
+    assert json.loads(lines[0])["estimated_budget"] == 15000.5
+    assert conn.transactions == [{"isolation": "repeatable_read", "readonly": True}]
+    assert conn.released
+
+
+@pytest.mark.asyncio
+async def test_csv_has_a_header_and_quotes_values(conn):
+    body = b"".join(await collect("csv")).decode()
+    lines = body.splitlines()
+    assert lines[0].split(",") == list(Lead.model_fields)
+    assert len(lines) == 6
+    assert '"Roof, 5 kWp"' in lines[1]
+    assert "2025-06-01T00:00:00" in lines[1]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("format, marker", [("ndjson", b'{"error":'), ("csv", b"#error,")])
+async def test_failure_mid_stream_ends_with_an_error_marker(conn, format, marker):
+    conn.fail_after = 3
+    chunks = await collect(format)
+    assert chunks[-1].startswith(marker)
+    assert b"".join(chunks[:-1]).count(b"2025-06-") == 2
+    assert conn.released
+
+
+@pytest.mark.asyncio
+async def test_export_endpoint_streams_on_a_single_connection(conn, app, client):
+    # Handlers taking the real dependency would hold a second connection
+    del app.dependency_overrides[database.get_db_connection]
+    principal_cache.put("test-user", Principal("supplier", 3))
+    response = await client.get("/routes/leads/received/export")
+    assert response.status_code == 200
+    assert len(response.text.splitlines()) == 5
+    assert database.pool.max_held == 1 and database.pool.held == 0
@@ -0,0 +1,30 @@
+import argparse
+import pytest
+from app.libs import database
+from benchmarks import http_suite
+
+
+@pytest.mark.asyncio
+async def test_every_scenario_succeeds_against_the_fake_backend(monkeypatch):
+    monkeypatch.setattr(database, "pool", None)
+    args = argparse.Namespace(
+        backend="fake", requests=5, login_requests=1, concurrency=2, db_latency=0.0, scenarios=None
+    )
+    results = await http_suite.run_suite(args)
+
+    assert set(results) == set(http_suite.scenarios(http_suite.Fixture(1, "s", "i", "e")))
+    assert all(result["errors"] == 0 for result in results.values())
+
+
+def test_regressions_beyond_the_threshold_are_reported():
+    baseline = {"a": {"rps": 1000, "p95": 10.0}, "b": {"rps": 1000, "p95": 10.0}}
+    results = {
+        "a": {"rps": 850, "p95": 11.9, "errors": 0, "requests": 100},
+        "b": {"rps": 700, "p95": 12.5, "errors": 2, "requests": 100},
+        "c": {"rps": 1, "p95": 1000.0, "errors": 0, "requests": 100},
+    }
+    assert http_suite.regressions(results, baseline, 0.2) == [
+        "b: 2 of 100 requests failed",
+        "b: p95 10.00ms -> 12.50ms",
+        "b: throughput 1,000 -> 700 req/s",
+    ]
@@ -0,0 +1,83 @@
+from contextlib import asynccontextmanager
+import pytest
+from app.apis import leads
+from tests.helpers import LatencyDB
+
+
+class LeadsDB:
+    def __init__(self, supplier_ids):
+        self.companies = {i: {"id": i, "name": f"Supplier {i}", "email": f"s{i}@example.com"} for i in supplier_ids}
+        self.companies[supplier_ids[0]]["email"] = None
+        self.leads = []
+        self.outbox = []
+
+    async def fetchrow(self, query, *args):
+        assert "FROM users u" in query
+        return {"role_name": "installer", "company_id": None}
+
+    async def fetch(self, query, *args):
+        if "FROM companies WHERE id = ANY" in query:
+            return [self.companies[i] for i in args[0] if i in self.companies]
+        assert "FROM unnest($2::int[]) WITH ORDINALITY" in query
+        installer_id, supplier_ids, description = args[:3]
+        rows = [
+            {"id": len(self.leads) + n, "installer_id": installer_id, "supplier_id": supplier_id,
+             "project_description": description, "contact_email": args[6], "status": "pending"}
+            for n, supplier_id in enumerate(supplier_ids, 1)
+        ]
+        self.leads.extend(rows)
+        return rows
+
+    async def execute(self, query, *args):
+        assert "INSERT INTO email_outbox" in query
+        self.outbox.extend(zip(*args))
+
+    @asynccontextmanager
+    async def transaction(self):
+        yield
+
+
+def lead_body(supplier_ids):
+    return {"supplier_ids": supplier_ids, "project_description": "5 kWp", "contact_email": "i@example.com"}
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("count", [2, leads.MAX_LEAD_SUPPLIERS - 1])
+async def test_fan_out_costs_the_same_round_trips_for_any_number_of_suppliers(app, client, count):
+    supplier_ids = list(range(100, 100 + count))
+    db = LatencyDB(LeadsDB(supplier_ids), delay=0)
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[leads.get_db_connection] = override
+    response = await client.post("/routes/leads/bulk", json=lead_body(supplier_ids + supplier_ids[:1]))
+
+    assert response.status_code == 200
+    assert [lead["supplier_id"] for lead in response.json()] == supplier_ids
+    # Principal, suppliers, leads and outbox
+    assert db.round_trips == 4
+    outbox = db.inner.outbox
+    assert [to_email for _, to_email, _, _ in outbox] == [f"s{i}@example.com" for i in supplier_ids[1:]]
+    assert [lead_id for lead_id, *_ in outbox] == [lead["id"] for lead in response.json()[1:]]
+
+
+@pytest.mark.asyncio
+async def test_fan_out_creates_nothing_when_a_supplier_is_unknown(app, client):
+    db = LeadsDB([1, 2])
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[leads.get_db_connection] = override
+    response = await client.post("/routes/leads/bulk", json=lead_body([1, 7, 2, 9]))
+
+    assert response.status_code == 404
+    assert response.json()["detail"] == "Suppliers not found: 7, 9"
+    assert db.leads == [] and db.outbox == []
+
+
+@pytest.mark.asyncio
+async def test_fan_out_is_limited(client):
+    response = await client.post("/routes/leads/bulk", json=lead_body(list(range(leads.MAX_LEAD_SUPPLIERS + 1))))
+    assert response.status_code == 422
@@ -0,0 +1,108 @@
+import socket
+import pytest
+from app.libs.outbox import OutboxDispatcher, SMTPSender
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+
+class RecordingHandler:
+    def __init__(self):
+        self.messages = []
+        self.sessions = set()
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(id(session))
+        self.messages.append(envelope)
+        return "250 OK"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    port = free_port()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    try:
+        yield handler, port
+    finally:
+        controller.stop()
+
+
+class FakeOutboxDB:
+    """String-matching stand-in for the outbox queries."""
+
+    def __init__(self, rows):
+        self.rows = {r["id"]: dict(r, attempts=0, sent=False, last_error=None) for r in rows}
+
+    async def fetch(self, query, limit, max_attempts, lease):
+        if "UPDATE email_outbox" not in query:
+            raise NotImplementedError(query)
+        claimed = []
+        for row in self.rows.values():
+            if not row["sent"] and row["attempts"] < max_attempts and len(claimed) < limit:
+                row["attempts"] += 1
+                claimed.append(dict(row))
+        return claimed
+
+    async def execute(self, query, *args):
+        if "SET sent_at = NOW()" in query:
+            for row_id in args[0]:
+                self.rows[row_id]["sent"] = True
+        elif "SET last_error" in query:
+            for row_id, error, delay in zip(*args):
+                self.rows[row_id]["last_error"] = error
+                self.rows[row_id]["delay"] = delay
+        else:
+            raise NotImplementedError(query)
+
+
+def outbox_rows(count):
+    return [
+        {"id": i, "to_email": f"supplier{i}@example.com", "subject": "New lead received", "body": "hi"}
+        for i in range(1, count + 1)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_sends_batch_over_one_connection(smtp_server):
+    handler, port = smtp_server
+    sender = SMTPSender("127.0.0.1", port, start_tls=False)
+    dispatcher = OutboxDispatcher(sender, batch_size=10)
+    db = FakeOutboxDB(outbox_rows(3))
+
+    assert await dispatcher.dispatch_once(db) == 3
+    assert await dispatcher.dispatch_once(db) == 0
+    await sender.close()
+
+    assert [m.rcpt_tos for m in handler.messages] == [
+        ["supplier1@example.com"],
+        ["supplier2@example.com"],
+        ["supplier3@example.com"],
+    ]
+    assert sender.connections_opened == 1
+    assert len(handler.sessions) == 1
+    assert all(row["sent"] for row in db.rows.values())
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_backs_off_when_smtp_is_down():
+    # Nothing listens on port 1, every send fails to connect
+    sender = SMTPSender("127.0.0.1", 1, start_tls=False, timeout=1)
+    dispatcher = OutboxDispatcher(sender, batch_size=10, base_backoff=30, max_backoff=100)
+    db = FakeOutboxDB(outbox_rows(2))
+
+    await dispatcher.dispatch_once(db)
+    assert dispatcher.failed == 2
+    assert [row["delay"] for row in db.rows.values()] == [30, 30]
+    assert all(row["last_error"] for row in db.rows.values())
+
+    await dispatcher.dispatch_once(db)
+    await dispatcher.dispatch_once(db)
+    assert [row["delay"] for row in db.rows.values()] == [100, 100]
+    assert not any(row["sent"] for row in db.rows.values())
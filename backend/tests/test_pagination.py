@@ -0,0 +1,51 @@
+from datetime import datetime
+from decimal import Decimal
+import pytest
+from fastapi import HTTPException, Response
+from app.libs.pagination import PageParams, decode_cursor, encode_cursor, paginate
+
+
+def test_cursor_round_trips_sort_keys():
+    values = [datetime(2025, 6, 1, 12, 30), Decimal("10.50"), "Acme", 42]
+    assert decode_cursor(encode_cursor(*values), 4) == values
+
+
+@pytest.mark.parametrize("cursor", ["garbage", encode_cursor(1, 2)])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, 3)
+    assert exc.value.status_code == 400
+
+
+def test_keyset_condition_and_next_cursor():
+    page = PageParams(cursor=encode_cursor("Acme", 7), limit=2)
+    params = ["SP"]
+    assert page.keyset([("name", str), ("id", int)], params) == "(name, id) > ($2, $3)"
+    assert page.limit_clause(params) == "LIMIT $4"
+    assert params == ["SP", "Acme", 7, 3]
+
+    rows = [{"name": "B", "id": 1}, {"name": "C", "id": 2}, {"name": "D", "id": 3}]
+    response = Response()
+    items = paginate(rows, page, response, lambda r: (r["name"], r["id"]))
+    assert items == rows[:2]
+    assert decode_cursor(response.headers["x-next-cursor"], 2) == ["C", 2]
+
+    response = Response()
+    paginate(rows[:2], page, response, lambda r: (r["name"], r["id"]))
+    assert "x-next-cursor" not in response.headers
+
+
+@pytest.mark.parametrize("values", [(7, "Acme"), ("Acme", True), ("Acme", None)])
+def test_cursor_of_the_wrong_types_is_rejected(values):
+    page = PageParams(cursor=encode_cursor(*values), limit=2)
+    with pytest.raises(HTTPException) as exc:
+        page.keyset([("name", str), ("id", int)], [])
+    assert exc.value.status_code == 400
+
+
+def test_cursor_numbers_are_converted_to_the_column_type():
+    page = PageParams(cursor=encode_cursor(0, 5, 9), limit=2)
+    params = []
+    page.keyset([("rating", Decimal), ("distance", float), ("id", int)], params)
+    assert params == [Decimal(0), 5.0, 9]
+    assert isinstance(params[1], float)
@@ -0,0 +1,119 @@
+import pathlib
+import signal
+import socket
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+import httpx
+import pytest
+from app.libs.prefork import pool_size_per_worker, pool_sizes, worker_count
+from tests import prefork_app
+
+
+def test_worker_count_defaults_to_and_is_capped_by_available_cpus():
+    assert worker_count(None, 8) == 8
+    assert worker_count(4, 8) == 4
+    assert worker_count(16, 8) == 8
+    with pytest.raises(ValueError):
+        worker_count(0, 8)
+
+
+def test_connection_budget_leaves_room_for_a_restarting_worker():
+    # 4 workers plus a replacement, each with its LISTEN connection
+    size = pool_size_per_worker(100, 4, reserved_per_worker=1)
+    assert size == 19
+    assert (4 + 1) * (size + 1) <= 100
+    with pytest.raises(ValueError, match="too small"):
+        pool_size_per_worker(8, 4, reserved_per_worker=1)
+
+
+def test_replica_pool_gets_a_budget_of_its_own_unless_it_is_the_primary():
+    assert pool_sizes(4, 100, reserved_per_worker=1) == (19, None)
+    assert pool_sizes(4, 100, has_replica=True, reserved_per_worker=1) == (19, 20)
+    assert pool_sizes(4, 100, 50, has_replica=True) == (20, 10)
+    # One server standing in for both: the budget is split between the pools
+    assert pool_sizes(4, 100, has_replica=True, same_server=True) == (10, 10)
+    assert pool_sizes(4, 100, 50, has_replica=True, same_server=True) == (20, 10)
+    # Without budgets the pool sizes from the environment are kept
+    assert pool_sizes(1, None, has_replica=True, same_server=True) == (None, None)
+    assert pool_sizes(4, None, 50, has_replica=True) == (None, 10)
+
+
+def worker_pids(supervisor_pid: int) -> set[int]:
+    """Pids of the supervisor's worker processes (not its resource tracker)."""
+    pids = set()
+    for proc in pathlib.Path("/proc").iterdir():
+        if not proc.name.isdigit():
+            continue
+        try:
+            stat = (proc / "stat").read_text()
+            cmdline = (proc / "cmdline").read_bytes()
+        except (FileNotFoundError, ProcessLookupError, PermissionError):
+            continue
+        # The parent pid is the second field after the parenthesized command
+        if int(stat.rsplit(")", 1)[1].split()[1]) == supervisor_pid and b"spawn_main" in cmdline:
+            pids.add(int(proc.name))
+    return pids
+
+
+def wait_for(condition, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        result = condition()
+        if result:
+            return result
+        time.sleep(0.1)
+    raise AssertionError("timed out")
+
+
+@pytest.mark.skipif(not pathlib.Path("/proc/self/stat").exists(), reason="needs /proc")
+def test_sighup_replaces_workers_without_failing_an_in_flight_request():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    # Two workers whatever the number of CPUs here, so the supervisor is
+    # built directly rather than through serve.py
+    script = (
+        "import uvicorn\n"
+        "from app.libs.prefork import Supervisor\n"
+        f"config = uvicorn.Config('tests.prefork_app:app', host='127.0.0.1', port={port},"
+        " timeout_graceful_shutdown=10, log_level='warning')\n"
+        "Supervisor(config, 2).run()\n"
+    )
+    backend = pathlib.Path(__file__).resolve().parent.parent
+    supervisor = subprocess.Popen([sys.executable, "-c", script], cwd=backend)
+    try:
+        base_url = f"http://127.0.0.1:{port}"
+
+        def serving():
+            try:
+                return httpx.get(base_url, timeout=1).status_code == 200
+            except httpx.TransportError:
+                return False
+
+        def workers(excluding: set[int] = frozenset()):
+            pids = worker_pids(supervisor.pid)
+            return pids if len(pids) == 2 and not pids & excluding else None
+
+        wait_for(serving)
+        old_pids = wait_for(workers)
+
+        with ThreadPoolExecutor(1) as executor:
+            slow = executor.submit(httpx.get, f"{base_url}/slow", timeout=30)
+            time.sleep(prefork_app.SLOW_SECONDS / 4)
+            supervisor.send_signal(signal.SIGHUP)
+            response = slow.result()
+        assert response.status_code == 200
+        assert int(response.text) in old_pids
+
+        new_pids = wait_for(lambda: workers(excluding=old_pids))
+        assert int(httpx.get(base_url, timeout=5).text) in new_pids
+    finally:
+        supervisor.send_signal(signal.SIGTERM)
+        try:
+            supervisor.wait(30)
+        except subprocess.TimeoutExpired:
+            supervisor.kill()
+            supervisor.wait()
+    assert supervisor.returncode == 0
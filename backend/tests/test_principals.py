@@ -0,0 +1,48 @@
+import pytest
+from app.libs.principals import Principal, PrincipalCache, principal_cache, invalidate_principal, resolve_principal
+
+
+class UsersDB:
+    def __init__(self):
+        self.users = {"supplier-1": {"role_name": "supplier", "company_id": 7}}
+        self.queries = 0
+
+    async def fetchrow(self, query, user_id):
+        assert "FROM users u" in query
+        self.queries += 1
+        return self.users.get(user_id)
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    principal_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_principal_is_cached_until_invalidated():
+    db = UsersDB()
+
+    assert await resolve_principal(db, "supplier-1") == Principal("supplier", 7)
+    assert await resolve_principal(db, "supplier-1") == Principal("supplier", 7)
+    assert db.queries == 1
+
+    db.users["supplier-1"] = {"role_name": "supplier", "company_id": 8}
+    invalidate_principal("supplier-1")
+    assert await resolve_principal(db, "supplier-1") == Principal("supplier", 8)
+    assert db.queries == 2
+
+
+@pytest.mark.asyncio
+async def test_unknown_users_are_not_cached():
+    db = UsersDB()
+
+    assert await resolve_principal(db, "new-user") is None
+    db.users["new-user"] = {"role_name": "installer", "company_id": None}
+    assert await resolve_principal(db, "new-user") == Principal("installer", None)
+    assert db.queries == 2
+
+
+def test_entries_expire_after_ttl():
+    cache = PrincipalCache(ttl=0)
+    cache.put("user", Principal("admin", None))
+    assert cache.get("user") is None
@@ -0,0 +1,51 @@
+from decimal import Decimal
+import pytest
+from app.apis import products
+from app.libs.pagination import decode_cursor, encode_cursor
+
+
+class RatedProductsDB:
+    def __init__(self):
+        self.queries = []
+
+    async def fetch(self, query, *args):
+        self.queries.append((query, args))
+        return [
+            {"id": 3, "name": "A", "supplier_id": 1, "rating_average": Decimal("4.50"), "updated_at": None},
+            {"id": 1, "name": "B", "supplier_id": 1, "rating_average": None, "updated_at": None},
+            {"id": 2, "name": "C", "supplier_id": 1, "rating_average": None, "updated_at": None},
+        ]
+
+
+@pytest.mark.asyncio
+async def test_products_sorted_by_rating_page_with_a_keyset_cursor(app, client):
+    db = RatedProductsDB()
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[products.get_read_connection] = override
+    response = await client.get(
+        "/routes/products/", params={"sort": "rating", "limit": 2, "cursor": encode_cursor(Decimal("4.8"), 9)}
+    )
+    assert response.status_code == 200
+    assert [p["rating_average"] for p in response.json()] == [4.5, None]
+    assert decode_cursor(response.headers["x-next-cursor"], 2) == [0, 1]
+
+    query, args = db.queries[0]
+    assert "(COALESCE(p.rating_average, 0), p.id) < ($1, $2)" in query
+    assert "ORDER BY COALESCE(p.rating_average, 0) DESC, p.id DESC LIMIT $3" in query
+    assert args == (Decimal("4.8"), 9, 3)
+
+
+@pytest.mark.asyncio
+async def test_review_rating_must_be_one_to_five_stars(client):
+    response = await client.post("/routes/reviews/", json={"product_id": 1, "rating": 6, "comment": "!"})
+    assert response.status_code == 422
+
+
+@pytest.mark.asyncio
+async def test_reviews_reject_a_cursor_that_does_not_match_the_sort_key(client):
+    response = await client.get("/routes/reviews/1", params={"cursor": encode_cursor("yesterday", 5)})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
@@ -0,0 +1,220 @@
+import asyncio
+from collections import Counter
+from datetime import date, datetime
+import pytest
+from app.libs import database
+from app.libs.profile_views import ProfileViewBuffer, rebuild_daily_rollup
+
+
+class FakePool:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.batches = []
+
+    async def acquire(self, timeout=None):
+        return self
+
+    async def release(self, conn):
+        pass
+
+    async def execute(self, query, company_ids, viewed_at):
+        if self.fail:
+            raise OSError("database unavailable")
+        assert "INSERT INTO profile_views" in query
+        self.batches.append(list(company_ids))
+
+
+@pytest.mark.asyncio
+async def test_views_are_written_in_one_batch(monkeypatch):
+    pool = FakePool()
+    monkeypatch.setattr(database, "pool", pool)
+    buffer = ProfileViewBuffer()
+
+    for company_id in (1, 1, 2):
+        buffer.record(company_id)
+    assert buffer.stats() == {"buffered": 3, "flushed": 0, "dropped": 0}
+
+    assert await buffer.flush() == 3
+    assert pool.batches == [[1, 1, 2]]
+    assert buffer.stats() == {"buffered": 0, "flushed": 3, "dropped": 0}
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_drops_and_failed_flush_requeues(monkeypatch):
+    pool = FakePool(fail=True)
+    monkeypatch.setattr(database, "pool", pool)
+    buffer = ProfileViewBuffer(max_buffered=2)
+
+    for company_id in (1, 2, 3):
+        buffer.record(company_id)
+    assert buffer.stats() == {"buffered": 2, "flushed": 0, "dropped": 1}
+
+    assert await buffer.flush() == 0
+    assert buffer.buffered == 2
+
+    pool.fail = False
+    await buffer.stop()
+    assert pool.batches == [[1, 2]]
+    assert buffer.stats() == {"buffered": 0, "flushed": 2, "dropped": 1}
+
+
+class SlowPool(FakePool):
+    def __init__(self):
+        super().__init__()
+        self.writing = asyncio.Event()
+
+    async def execute(self, query, company_ids, viewed_at):
+        self.writing.set()
+        await asyncio.sleep(0.05)
+        await super().execute(query, company_ids, viewed_at)
+
+
+@pytest.mark.asyncio
+async def test_stop_waits_for_a_flush_in_progress(monkeypatch):
+    pool = SlowPool()
+    monkeypatch.setattr(database, "pool", pool)
+    buffer = ProfileViewBuffer(flush_interval=60, flush_threshold=2)
+    buffer.start()
+
+    buffer.record(1)
+    buffer.record(2)
+    await pool.writing.wait()
+    buffer.record(3)
+    await buffer.stop()
+
+    assert pool.batches == [[1, 2], [3]]
+    assert buffer.stats() == {"buffered": 0, "flushed": 3, "dropped": 0}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_flush_keeps_its_batch(monkeypatch):
+    pool = SlowPool()
+    monkeypatch.setattr(database, "pool", pool)
+    buffer = ProfileViewBuffer()
+    buffer.record(1)
+
+    flushing = asyncio.create_task(buffer.flush())
+    await pool.writing.wait()
+    flushing.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await flushing
+    assert buffer.buffered == 1
+
+
+class RollupDB:
+    """Raw views plus the daily rollup, with the statement trigger from
+    migration 007 applied to every profile_views insert."""
+
+    def __init__(self):
+        self.views: list[tuple[int, datetime]] = []
+        self.daily: dict[tuple[int, date], int] = {}
+        self.statements = []
+        self.in_transaction = False
+
+    async def acquire(self, timeout=None):
+        return self
+
+    async def release(self, conn):
+        pass
+
+    def transaction(self):
+        db = self
+
+        class Transaction:
+            async def __aenter__(self):
+                db.statements.append("BEGIN")
+                db.in_transaction = True
+
+            async def __aexit__(self, exc_type, exc, tb):
+                db.statements.append("COMMIT" if exc_type is None else "ROLLBACK")
+                db.in_transaction = False
+
+        return Transaction()
+
+    async def execute(self, query, *args):
+        statement = " ".join(query.split())
+        if statement.startswith("INSERT INTO profile_views"):
+            company_ids, viewed_at = args
+            batch = list(zip(company_ids, viewed_at))
+            self.views.extend(batch)
+            for key, views in Counter((c, v.date()) for c, v in batch).items():
+                self.daily[key] = self.daily.get(key, 0) + views
+            return f"INSERT 0 {len(batch)}"
+
+        self.statements.append((statement.split(" WHERE")[0], *args))
+        if statement.startswith("LOCK TABLE"):
+            assert self.in_transaction
+            return "LOCK TABLE"
+        (since,) = args
+        if statement.startswith("DELETE FROM profile_view_daily"):
+            assert self.in_transaction
+            self.daily = {
+                key: views for key, views in self.daily.items()
+                if since is not None and key[1] < since
+            }
+            return "DELETE"
+        if statement.startswith("INSERT INTO profile_view_daily"):
+            assert self.in_transaction
+            rebuilt = Counter(
+                (c, v.date()) for c, v in self.views
+                if since is None or v.date() >= since
+            )
+            self.daily.update(rebuilt)
+            return f"INSERT 0 {len(rebuilt)}"
+        raise NotImplementedError(query)
+
+
+@pytest.mark.asyncio
+async def test_flushed_views_reach_the_daily_rollup(monkeypatch):
+    db = RollupDB()
+    monkeypatch.setattr(database, "pool", db)
+    buffer = ProfileViewBuffer()
+
+    for company_id in (1, 1, 2):
+        buffer.record(company_id)
+    await buffer.flush()
+    buffer.record(1)
+    await buffer.flush()
+
+    today = datetime.utcnow().date()
+    assert db.daily == {(1, today): 3, (2, today): 1}
+
+
+@pytest.mark.asyncio
+async def test_rebuild_only_replaces_days_since_the_window_start():
+    db = RollupDB()
+    await db.execute("INSERT INTO profile_views", [1, 1, 1, 2], [
+        datetime(2025, 5, 31, 23, 59),
+        datetime(2025, 6, 1, 0, 0),
+        datetime(2025, 6, 2, 12, 0),
+        datetime(2025, 6, 2, 13, 0),
+    ])
+    # Drift the rollup away from the raw views on both sides of the boundary
+    db.daily = {(1, date(2025, 5, 31)): 7, (1, date(2025, 6, 1)): 7, (3, date(2025, 6, 2)): 7}
+    db.statements.clear()
+
+    assert await rebuild_daily_rollup(db, date(2025, 6, 1)) == 3
+    assert db.statements == [
+        "BEGIN",
+        ("LOCK TABLE profile_views IN SHARE ROW EXCLUSIVE MODE",),
+        ("DELETE FROM profile_view_daily", date(2025, 6, 1)),
+        ("INSERT INTO profile_view_daily (company_id, day, views) SELECT company_id, "
+         "viewed_at::date, COUNT(*) FROM profile_views", date(2025, 6, 1)),
+        "COMMIT",
+    ]
+    # Days before ``since`` are left alone; the rest match the raw views
+    assert db.daily == {
+        (1, date(2025, 5, 31)): 7,
+        (1, date(2025, 6, 1)): 1,
+        (1, date(2025, 6, 2)): 1,
+        (2, date(2025, 6, 2)): 1,
+    }
+
+    assert await rebuild_daily_rollup(db) == 4
+    assert [s[1:] for s in db.statements[-3:-1]] == [(None,), (None,)]
+    assert db.daily == {
+        (1, date(2025, 5, 31)): 1,
+        (1, date(2025, 6, 1)): 1,
+        (1, date(2025, 6, 2)): 1,
+        (2, date(2025, 6, 2)): 1,
+    }
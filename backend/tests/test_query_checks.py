@@ -0,0 +1,55 @@
+import pytest
+from fastapi import Depends
+from app.libs import database, query_checks
+from app.libs.database import InstrumentedConnection
+from app.libs.metrics import RequestStats, current_request
+from app.libs.query_checks import RepeatedQueryError, normalize_sql
+
+
+class CompaniesDB:
+    async def fetchrow(self, query, *args):
+        return {"name": "Solar Acme"}
+
+
+def test_statements_differing_only_in_literals_or_spacing_normalize_alike():
+    assert normalize_sql("SELECT *\n   FROM t1 WHERE id = 42 AND name = 'it''s'") == \
+        "SELECT * FROM t1 WHERE id = ? AND name = ?"
+    assert normalize_sql("SELECT $1::int[], 2.5") == "SELECT $1::int[], ?"
+
+
+@pytest.mark.asyncio
+async def test_repeated_statement_is_logged_once_in_warn_mode(monkeypatch, capsys):
+    monkeypatch.setattr(query_checks, "DB_QUERY_CHECKS", "warn")
+    monkeypatch.setattr(query_checks, "DB_REPEATED_QUERY_LIMIT", 3)
+    monkeypatch.setattr(query_checks, "DB_SLOW_QUERY_SECONDS", 0)
+    token = current_request.set(RequestStats({"path": "/routes/things"}))
+    try:
+        db = InstrumentedConnection(CompaniesDB())
+        for company_id in range(6):
+            await db.fetchrow(f"SELECT name FROM companies WHERE id = {company_id}")
+    finally:
+        current_request.reset(token)
+
+    output = capsys.readouterr().out.splitlines()
+    assert output[0].startswith("Slow query (0 ms) on /routes/things: SELECT name FROM companies WHERE id = ?")
+    repeated = [line for line in output if "N+1" in line]
+    assert repeated == [
+        "/routes/things ran the same statement more than 3 times (N+1 query?): "
+        "SELECT name FROM companies WHERE id = ?"
+    ]
+
+
+@pytest.mark.asyncio
+async def test_n_plus_one_in_a_handler_fails_the_request(app, client, monkeypatch):
+    monkeypatch.setattr(query_checks, "DB_REPEATED_QUERY_LIMIT", 10)
+
+    async def companies_one_by_one(db=Depends(database.get_db_connection)):
+        return [await db.fetchrow("SELECT name FROM companies WHERE id = $1", i) for i in range(20)]
+
+    async def override():
+        yield InstrumentedConnection(CompaniesDB())
+
+    app.add_api_route("/n-plus-one", companies_one_by_one)
+    app.dependency_overrides[database.get_db_connection] = override
+    with pytest.raises(RepeatedQueryError, match=r"^/n-plus-one ran the same statement more than 10 times"):
+        await client.get("/n-plus-one")
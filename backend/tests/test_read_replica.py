@@ -0,0 +1,129 @@
+import time
+from contextlib import asynccontextmanager
+import pytest
+from fastapi import Depends
+from app.libs import database
+from app.libs.catalog_cache import CatalogCache
+from app.libs.database import LAST_WRITE_COOKIE, replica_monitor
+
+
+class NamedPool:
+    def __init__(self, name):
+        self.name = name
+        self.in_use = 0
+
+    async def acquire(self, timeout=None):
+        self.in_use += 1
+        return self
+
+    async def release(self, conn):
+        self.in_use -= 1
+
+    async def fetchval(self, query, *args):
+        return self.name
+
+
+@pytest.fixture
+def pools(app, monkeypatch):
+    primary, replica = NamedPool("primary"), NamedPool("replica")
+    monkeypatch.setattr(database, "pool", primary)
+    monkeypatch.setattr(database, "replica_pool", replica)
+    monkeypatch.setattr(database, "DATABASE_REPLICA_URL", "postgresql://replica/solarsync")
+    monkeypatch.setattr(replica_monitor, "lag", 0.2)
+    monkeypatch.setattr(replica_monitor, "replica_reads", 0)
+    monkeypatch.setattr(replica_monitor, "primary_reads", 0)
+
+    async def read(db=Depends(database.get_read_connection)):
+        return await db.fetchval("SELECT current_setting('cluster_name')")
+
+    async def write(db=Depends(database.get_db_connection)):
+        return await db.fetchval("UPDATE companies SET name = name")
+
+    del app.dependency_overrides[database.get_read_connection]
+    del app.dependency_overrides[database.get_db_connection]
+    app.add_api_route("/read", read)
+    app.add_api_route("/write", write, methods=["POST"])
+    yield primary, replica
+    assert primary.in_use == replica.in_use == 0
+
+
+def test_lagging_or_unknown_replica_serves_no_reads(monkeypatch):
+    monkeypatch.setattr(database, "DB_REPLICA_MAX_LAG_SECONDS", 5)
+    monkeypatch.setattr(database, "DB_REPLICA_CHECK_INTERVAL", 1)
+    for lag, served in ((None, False), (0.0, True), (4.9, True), (5.1, False)):
+        monkeypatch.setattr(replica_monitor, "lag", lag)
+        assert replica_monitor.serves(None) is served
+
+    monkeypatch.setattr(replica_monitor, "lag", 2.0)
+    assert not replica_monitor.serves(str(time.time() - 2.5))
+    assert replica_monitor.serves(str(time.time() - 3.5))
+
+
+@pytest.mark.asyncio
+async def test_reads_follow_the_session_last_write(pools, client):
+    assert (await client.get("/read")).json() == "replica"
+
+    response = await client.post("/write")
+    assert response.json() == "primary"
+    assert LAST_WRITE_COOKIE in response.cookies
+    # Not replayed yet as far as this session knows
+    assert (await client.get("/read")).json() == "primary"
+
+    client.cookies.set(LAST_WRITE_COOKIE, str(time.time() - 60))
+    assert (await client.get("/read")).json() == "replica"
+    assert (replica_monitor.replica_reads, replica_monitor.primary_reads) == (2, 1)
+
+
+@pytest.mark.asyncio
+async def test_reads_fall_back_to_the_primary_while_the_replica_lags(pools, client, monkeypatch):
+    monkeypatch.setattr(replica_monitor, "lag", database.DB_REPLICA_MAX_LAG_SECONDS + 1)
+    assert (await client.get("/read")).json() == "primary"
+
+
+@pytest.mark.asyncio
+async def test_replica_rows_are_not_cached_until_it_replayed_the_invalidation(monkeypatch):
+    monkeypatch.setattr(replica_monitor, "lag", 0.5)
+    cache = CatalogCache()
+    cache.enabled = True
+    cache.invalidate("products")
+
+    async def load():
+        return ["row"]
+
+    await cache.get_or_load("recent", ["products"], load, replica=True)
+    await cache.get_or_load("primary", ["products"], load)
+    assert cache.get("recent") == (False, None)
+    assert cache.get("primary") == (True, ["row"])
+
+    monkeypatch.setattr(cache, "_invalidated_at", time.monotonic() - 60)
+    await cache.get_or_load("replayed", ["products"], load, replica=True)
+    assert cache.get("replayed") == (True, ["row"])
+
+
+class LagPool:
+    """Replica pool whose lag query returns ``lag`` (None: not streaming)."""
+
+    def __init__(self, lag):
+        self.lag = lag
+
+    @asynccontextmanager
+    async def acquire(self, timeout=None):
+        yield self
+
+    async def fetchval(self, query, *args, timeout=None):
+        assert query == database.REPLICA_LAG_QUERY
+        return self.lag
+
+
+@pytest.mark.asyncio
+async def test_replica_that_stopped_streaming_serves_no_reads(monkeypatch):
+    monkeypatch.setattr(replica_monitor, "lag", None)
+    monkeypatch.setattr(database, "replica_pool", LagPool(0.0))
+    await replica_monitor.check()
+    assert replica_monitor.usable
+
+    # Caught up with everything it received, but the WAL receiver is down
+    monkeypatch.setattr(database, "replica_pool", LagPool(None))
+    await replica_monitor.check()
+    assert replica_monitor.lag is None
+    assert not replica_monitor.serves(None)
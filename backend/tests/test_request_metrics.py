@@ -0,0 +1,70 @@
+import pytest
+from app.apis import products
+from app.libs import request_metrics
+from app.libs.database import InstrumentedConnection
+from app.libs.request_metrics import request_metrics as registry
+
+
+class ProductDB:
+    def __init__(self):
+        self.queries = 0
+
+    async def fetchrow(self, query, *args):
+        self.queries += 1
+        return {"id": args[0], "name": "Painel", "supplier_id": 1, "updated_at": None}
+
+
+@pytest.fixture(autouse=True)
+def metrics_token(monkeypatch):
+    monkeypatch.setattr(request_metrics, "METRICS_TOKEN", "s3cret")
+    monkeypatch.setattr(request_metrics, "METRICS_PUBLIC", False)
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    registry.clear()
+    yield
+    registry.clear()
+
+
+@pytest.mark.asyncio
+async def test_requests_are_recorded_per_route_template_with_their_queries(app, client):
+    async def override():
+        yield InstrumentedConnection(ProductDB())
+
+    app.dependency_overrides[products.get_read_connection] = override
+    for product_id in (1, 2):
+        assert (await client.get(f"/routes/products/{product_id}")).status_code == 200
+    assert (await client.get("/nowhere")).status_code == 404
+
+    route = registry.routes[("GET", "/routes/products/{product_id}")]
+    assert route.statuses == {200: 2}
+    assert route.latency.count == 2
+    assert route.queries.sum == 2 and route.db_time.sum > 0
+    assert registry.routes[("GET", "unmatched")].statuses == {404: 1}
+    assert registry.in_flight == 0
+
+    body = (await client.get("/metrics", headers={"Authorization": "Bearer s3cret"})).text
+    labels = 'method="GET",route="/routes/products/{product_id}"'
+    assert f'http_requests_total{{{labels},status="200"}} 2' in body
+    assert f'http_request_db_queries_bucket{{{labels},le="1"}} 2' in body
+    assert f"http_request_duration_seconds_count{{{labels}}} 2" in body
+    assert "# TYPE db_pool_acquire_wait_seconds histogram" in body
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_requires_the_token(client):
+    assert (await client.get("/metrics")).status_code == 401
+    assert (await client.get("/metrics", headers={"Authorization": "Bearer guess"})).status_code == 401
+    response = await client.get("/metrics", headers={"Authorization": "Bearer s3cret"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+
+
+@pytest.mark.asyncio
+async def test_metrics_are_refused_without_a_configured_token_unless_public(client, monkeypatch):
+    monkeypatch.setattr(request_metrics, "METRICS_TOKEN", None)
+    assert (await client.get("/metrics")).status_code == 401
+
+    monkeypatch.setattr(request_metrics, "METRICS_PUBLIC", True)
+    assert (await client.get("/metrics")).status_code == 200
@@ -0,0 +1,41 @@
+import json
+import subprocess
+import sys
+import main
+from app.libs import route_manifest
+from app.libs.route_manifest import BACKEND_PATH, discover_apis, get_router_config, render_manifest
+
+
+def api_name(route) -> str:
+    return route.endpoint.__module__.removeprefix("app.apis.")
+
+
+def test_committed_manifest_is_up_to_date(monkeypatch):
+    monkeypatch.chdir(BACKEND_PATH)
+    expected = render_manifest(discover_apis(get_router_config()))
+    assert route_manifest.MANIFEST_PATH.read_text() == expected, \
+        "run python -m scripts.generate_route_manifest"
+
+
+def test_only_manifest_modules_are_mounted(monkeypatch, tmp_path):
+    manifest = tmp_path / "route_manifest.json"
+    manifest.write_text(json.dumps({"apis": [{"name": "search"}, {"name": "users", "disableAuth": True}]}))
+    monkeypatch.setattr(route_manifest, "MANIFEST_PATH", manifest)
+
+    routes = main.import_api_routers().routes
+    assert {api_name(route) for route in routes} == {"search", "users"}
+    # Entries without the flag keep authentication
+    assert all(route.dependencies for route in routes if api_name(route) == "search")
+    assert not any(route.dependencies for route in routes if api_name(route) == "users")
+
+
+def test_missing_manifest_falls_back_to_discovery(monkeypatch, tmp_path):
+    monkeypatch.setattr(route_manifest, "MANIFEST_PATH", tmp_path / "missing.json")
+    names = {api_name(route) for route in main.import_api_routers().routes}
+    assert names == {api.name for api in discover_apis(None)}
+
+
+def test_login_and_email_dependencies_load_on_first_use():
+    code = "import sys, main; print(sorted({'passlib', 'aiosmtplib', 'httpx'} & set(sys.modules)))"
+    result = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_PATH, capture_output=True, text=True, check=True)
+    assert result.stdout.splitlines()[-1] == "[]"
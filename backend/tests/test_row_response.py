@@ -0,0 +1,50 @@
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import List
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from app.apis.leads import LeadWithSupplierInfo
+from app.libs.models import Product
+from app.libs.row_response import rows_response
+
+
+def pydantic_json(rows, model):
+    """What FastAPI sends when handlers return one model per row."""
+    adapter = TypeAdapter(List[model])
+    return jsonable_encoder(adapter.dump_python(adapter.validate_python([model(**dict(r)) for r in rows]), mode="json"))
+
+
+def test_rows_match_the_response_model_output():
+    products = [
+        {"id": 1, "name": "Panel", "description": None, "price": Decimal("899.90"), "category": None,
+         "supplier_id": 3, "created_at": datetime(2025, 6, 1, 12, 0, 0, 500000),
+         "updated_at": datetime(2025, 6, 2), "search_vector": "'panel':1"},
+        # Columns missing from the row fall back to the model defaults
+        {"id": 2, "name": "Inverter", "supplier_id": 3},
+    ]
+    leads = [{
+        "id": 7, "installer_id": "user-1", "supplier_id": 3, "supplier_name": "Acme",
+        "project_description": "Roof", "estimated_budget": Decimal("15000.00"),
+        "contact_email": "a@example.com", "status": "pending",
+        "created_at": datetime(2025, 6, 1), "updated_at": None,
+    }]
+
+    for rows, model in ((products, Product), (leads, LeadWithSupplierInfo)):
+        encoded = rows_response(rows, model, Response())
+        assert json.loads(encoded.body) == pydantic_json(rows, model)
+
+
+def test_headers_set_on_the_injected_response_are_kept():
+    response = Response()
+    del response.headers["content-length"]
+    response.headers["X-Next-Cursor"] = "abc"
+    response.headers.append("Set-Cookie", "a=1")
+    response.headers.append("Set-Cookie", "b=2")
+
+    encoded = rows_response([], Product, response)
+    assert encoded.body == b"[]"
+    assert encoded.headers["x-next-cursor"] == "abc"
+    assert encoded.headers.getlist("set-cookie") == ["a=1", "b=2"]
+    assert encoded.headers["content-type"] == "application/json"
@@ -0,0 +1,47 @@
+import pytest
+from app.apis import search
+
+
+class SearchDB:
+    def __init__(self):
+        self.calls = []
+
+    async def fetch(self, query, q, limit, options):
+        self.calls.append((query, q, limit))
+        if "FROM products p" in query:
+            return [{
+                "id": 1, "name": "Painel <b>550W</b>", "brand": "Canadian", "price": 899.0,
+                "category": None, "supplier_id": 3, "rank": 0.6,
+                "highlight": "\x02Painel\x03 <b>550W</b>",
+            }]
+        if "FROM companies c" in query:
+            return []
+        raise NotImplementedError(query)
+
+
+@pytest.mark.asyncio
+async def test_search_ranks_and_escapes_highlights(app, client):
+    db = SearchDB()
+
+    async def override():
+        yield db
+
+    app.dependency_overrides[search.get_read_connection] = override
+    response = await client.get("/routes/search/", params={"q": "painel", "limit": 5})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["companies"] == []
+    assert data["products"][0]["highlight"] == "<mark>Painel</mark> &lt;b&gt;550W&lt;/b&gt;"
+    assert [call[2] for call in db.calls] == [5, 5]
+
+    response = await client.get("/routes/search/", params={"q": "painel", "scope": "companies"})
+    assert response.json()["products"] == []
+    assert db.calls[-1][2] == search.DEFAULT_LIMIT
+
+
+@pytest.mark.asyncio
+async def test_search_result_size_is_bounded(client):
+    response = await client.get("/routes/search/", params={"q": "painel", "limit": search.MAX_LIMIT + 1})
+    assert response.status_code == 422
+    response = await client.get("/routes/search/", params={"q": "p"})
+    assert response.status_code == 422
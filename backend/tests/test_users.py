@@ -11,14 +11,14 @@ async def test_register_and_login(client):
         "company_name": None,
     }
 
-    resp = await client.post("/routes/users/register", json=register_payload)
+    resp = await client.post("/routes/register", json=register_payload)
     assert resp.status_code == 200
     data = resp.json()
     assert data["email"] == "user@example.com"
     assert data["role"] == "installer"
 
     login_payload = {"email": "user@example.com", "password": "secret"}
-    resp = await client.post("/routes/users/login", json=login_payload)
+    resp = await client.post("/routes/login", json=login_payload)
     assert resp.status_code == 200
     login = resp.json()
     assert login["email"] == "user@example.com"
@@ -34,8 +34,31 @@ async def test_login_invalid_password(client):
         "full_name": "Another User",
         "company_name": None,
     }
-    await client.post("/routes/users/register", json=payload)
+    await client.post("/routes/register", json=payload)
 
     bad_login = {"email": "another@example.com", "password": "wrong"}
-    resp = await client.post("/routes/users/login", json=bad_login)
+    resp = await client.post("/routes/login", json=bad_login)
     assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_login_sheds_load_when_password_pool_saturated(client, monkeypatch):
+    from app.libs import passwords
+
+    payload = {
+        "email": "busy@example.com",
+        "password": "secret",
+        "role": "installer",
+        "full_name": "Busy User",
+        "company_name": None,
+    }
+    await client.post("/routes/register", json=payload)
+
+    pool = passwords.password_pool
+    monkeypatch.setattr(pool, "in_flight", pool.capacity)
+
+    resp = await client.post(
+        "/routes/login", json={"email": "busy@example.com", "password": "secret"}
+    )
+    assert resp.status_code == 503
+    assert resp.headers["retry-after"] == "1"